@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.synthetic import SyntheticCrowd
+from src.target_manager import TargetManager
+from src.turret_controller import TurretController
+from src.frame_cache import FrameContext, FrameBuffers
+from src.visualization import draw_hud, draw_skeleton
+
+STAGES = ('select_targets', 'safe_zone', 'identity', 'draw_hud')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the non-inference stages on synthetic crowds.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1, 5, 10, 25, 50, 100, 200], help="Crowd sizes")
+    parser.add_argument("--frames", type=int, default=300, help="Timed frames per crowd size")
+    parser.add_argument("--warmup", type=int, default=30, help="Untimed frames before measuring")
+    parser.add_argument("--motion", default='walk', choices=SyntheticCrowd.MOTIONS)
+    parser.add_argument("--churn", type=float, default=0.002, help="Per-person per-frame chance of a new track id")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--save-baseline", metavar="JSON", help="Write results as the new baseline")
+    parser.add_argument("--compare", metavar="JSON", help="Compare against a saved baseline (exit 1 on regression)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = +25%%)")
+    parser.add_argument("--plot", metavar="PNG", help="Plot cost and memory vs crowd size (needs matplotlib)")
+    parser.add_argument("--alloc-budget", type=float, metavar="KB",
+                        help="Fail (exit 1) if a steady-state frame allocates more than KB (+ --alloc-per-person) at its peak")
+    parser.add_argument("--alloc-per-person", type=float, default=4.0, metavar="KB",
+                        help="Budget allowance per person (target dicts; identity crops are reported, not budgeted)")
+    return parser.parse_args()
+
+class StageTimer:
+    """Accumulates time spent inside wrapped methods during one frame."""
+    def __init__(self):
+        self.acc = {}
+
+    def wrap(self, obj, method, stage):
+        fn = getattr(obj, method)
+        def timed(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                self.acc[stage] = self.acc.get(stage, 0.0) + time.perf_counter() - t0
+        setattr(obj, method, timed)
+
+    def take(self, stage):
+        return self.acc.pop(stage, 0.0)
+
+def _no_encode(payload):
+    # Inference is out of scope: identity jobs are scheduled and applied, but not encoded
+    return [], payload[1]
+
+def build(args, size):
+    crowd = SyntheticCrowd(size, args.width, args.height, motion=args.motion, seed=args.seed, churn=args.churn)
+    manager = TargetManager(args.width, args.height)
+    manager.id_manager.scheduler.worker_fn = _no_encode
+    return crowd, manager, TurretController()
+
+class CropMeter:
+    """Splits each frame's tracemalloc peak into identity crops and the rest of the loop.
+
+    Crops are fresh by design. The meter holds every crop until the end of a frame in which
+    nothing else references it, so old crops are never freed mid-frame: loop is the largest
+    peak with the crops handed out so far subtracted. The peak is read and reset around each crop.
+    """
+    def __init__(self):
+        self.held = []
+        self.ctx = None
+
+    def begin(self, ctx, before):
+        self.ctx, self.before = ctx, before
+        self.frame = self.loop = 0
+        crop_rgb = ctx.crop_rgb
+        def metered(*a, **kw):
+            cached = ctx.crop_bytes
+            self.mark()
+            crop = crop_rgb(*a, **kw)
+            if ctx.crop_bytes != cached:
+                self.frame = max(self.frame, tracemalloc.get_traced_memory()[1] - self.before)
+                self.held.append(crop)
+                tracemalloc.reset_peak()
+            return crop
+        ctx.crop_rgb = metered
+
+    def mark(self):
+        peak = tracemalloc.get_traced_memory()[1] - self.before
+        self.frame = max(self.frame, peak)
+        self.loop = max(self.loop, peak - self.ctx.crop_bytes)
+
+    def end(self):
+        """Takes the last reading, unhooks the context and releases the crops only the meter holds."""
+        self.mark()
+        del self.ctx.crop_rgb # The hook would keep the context alive in a cycle
+        self.ctx = None
+        self.held = [crop for crop in self.held if sys.getrefcount(crop) > 3] # held, crop, getrefcount arg
+
+def run_size(args, size, trace_memory=False):
+    crowd, manager, turret = build(args, size)
+    timer = StageTimer()
+    timer.wrap(manager, 'is_safe', 'safe_zone')
+    for method in ('get_pid', 'apply_results', 'prune_tracks'):
+        timer.wrap(manager.id_manager, method, 'identity')
+
+    background = crowd.background()
+    canvas = np.empty_like(background)
+    buffers = FrameBuffers()
+    samples = {stage: [] for stage in STAGES}
+    frame_peaks, loop_peaks = [], []
+    meter = CropMeter()
+
+    if trace_memory:
+        tracemalloc.start()
+    for i in range(args.warmup + args.frames):
+        dets = crowd.next_frame()
+        np.copyto(canvas, background) # Fresh frame (not timed)
+        if trace_memory:
+            # Transient allocations of THIS frame's loop body (synthetic input generation excluded)
+            before = tracemalloc.get_traced_memory()[0]
+            if i == args.warmup:
+                base_mem, run_peak = before, before
+            tracemalloc.reset_peak()
+        ctx = FrameContext(canvas, i, buffers=buffers)
+        if trace_memory:
+            meter.begin(ctx, before)
+        ctx.rgb() # MediaPipe input (not timed)
+
+        t0 = time.perf_counter()
+        targets = manager.select_targets(dets, ctx, 2)
+        t1 = time.perf_counter()
+        draw_hud(canvas, turret, targets, manager.primary_target, 2, manager)
+        t2 = time.perf_counter()
+        for kps in dets.keypoints:
+            draw_skeleton(canvas, kps)
+        if trace_memory:
+            meter.end()
+
+        if i >= args.warmup:
+            samples['select_targets'].append(t1 - t0)
+            samples['draw_hud'].append(t2 - t1)
+            samples['safe_zone'].append(timer.take('safe_zone'))
+            samples['identity'].append(timer.take('identity'))
+            if trace_memory:
+                run_peak = max(run_peak, before + meter.frame)
+                frame_peaks.append(meter.frame)
+                loop_peaks.append(meter.loop)
+        else:
+            timer.acc.clear()
+
+    result = {
+        stage: {'mean_ms': float(np.mean(v) * 1000), 'p95_ms': float(np.percentile(v, 95) * 1000)}
+        for stage, v in samples.items()
+    }
+    if trace_memory:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        result = {'peak_kb': (run_peak - base_mem) / 1024, 'retained_kb': (current - base_mem) / 1024,
+                  'frame_kb': max(frame_peaks) / 1024, 'frame_kb_mean': float(np.mean(frame_peaks)) / 1024,
+                  'loop_kb': max(loop_peaks) / 1024}
+    manager.id_manager.scheduler.shutdown()
+    return result
+
+def print_table(results):
+    print(f"{'PEOPLE':>7}" + "".join(f"{s + ' ms':>18}" for s in STAGES) + f"{'PEAK KB':>10}{'FRAME KB':>10}{'LOOP KB':>10}")
+    for size, r in results.items():
+        cols = "".join(f"{r[s]['mean_ms']:>9.3f} ({r[s]['p95_ms']:>6.3f})" for s in STAGES)
+        print(f"{size:>7}{cols}{r['peak_kb']:>10.0f}{r['frame_kb']:>10.1f}{r['loop_kb']:>10.1f}")
+    print("        (mean (p95) per frame; FRAME KB = largest transient allocation peak of one steady-state frame;\n"
+          "         LOOP KB = the same without the identity crops handed to the workers)")
+
+def check_alloc_budget(results, budget_kb, per_person_kb):
+    """
+    Steady-state frames must not allocate frame-sized buffers: only per-person outputs are allowed to grow.
+    Identity crops are excluded (LOOP KB): they are the workers' input, fresh by design (up to
+    ~120 KB each at max_width=200) and their number is set by the quality gate, not by the loop.
+    Returns [(size, loop_kb, budget_kb)] over budget.
+    """
+    over = []
+    for size, r in results.items():
+        budget = budget_kb + per_person_kb * size
+        if r['loop_kb'] > budget:
+            over.append((size, r['loop_kb'], budget))
+            print(f"[ALLOC] {size:>4} people: {r['loop_kb']:.1f} KB per frame > budget {budget:.0f} KB")
+    return over
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for size, r in results.items():
+        base = baseline.get(str(size))
+        if base is None:
+            continue
+        for stage in STAGES:
+            old, new = base[stage]['mean_ms'], r[stage]['mean_ms']
+            ratio = new / old if old > 0 else 1.0
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            if flag:
+                regressions.append((size, stage, ratio))
+            print(f"[COMPARE] {size:>4} people  {stage:<15} {old:8.3f} -> {new:8.3f} ms  x{ratio:4.2f} {flag}")
+    return regressions
+
+def plot(results, path):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("[WARN] matplotlib not installed, skipping plot")
+        return
+    sizes = list(results.keys())
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5))
+    for stage in STAGES:
+        ax1.plot(sizes, [results[s][stage]['mean_ms'] for s in sizes], marker='o', label=stage)
+    ax1.set_xlabel("People in frame")
+    ax1.set_ylabel("ms / frame (mean)")
+    ax1.set_title("Per-frame cost")
+    ax1.legend()
+    ax2.plot(sizes, [results[s]['peak_kb'] for s in sizes], marker='o', color='tab:red')
+    ax2.set_xlabel("People in frame")
+    ax2.set_ylabel("Peak traced KB")
+    ax2.set_title("Memory")
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"[BENCH] Plot saved to {path}")
+
+def main():
+    args = parse_args()
+    results = {}
+    for size in args.sizes:
+        print(f"[BENCH] {size} people ...")
+        r = run_size(args, size)
+        # Separate pass: tracemalloc slows everything down, keep it out of the timings
+        r.update(run_size(args, size, trace_memory=True))
+        results[size] = r
+
+    print_table(results)
+
+    if args.plot:
+        plot(results, args.plot)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                'meta': {'frames': args.frames, 'motion': args.motion, 'seed': args.seed, 'churn': args.churn,
+                         'resolution': [args.width, args.height], 'python': platform.python_version(),
+                         'machine': platform.machine(), 'created': time.strftime("%Y-%m-%d %H:%M:%S")},
+                'results': {str(k): v for k, v in results.items()}
+            }, f, indent=2)
+        print(f"[BENCH] Baseline saved to {args.save_baseline}")
+
+    if args.alloc_budget is not None:
+        if check_alloc_budget(results, args.alloc_budget, args.alloc_per_person):
+            raise SystemExit(1)
+        print(f"[ALLOC] Steady-state frames within {args.alloc_budget:.0f} KB + {args.alloc_per_person:.0f} KB/person")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"[BENCH] {len(regressions)} regression(s) over +{args.tolerance:.0%}")
+            raise SystemExit(1)
+        print("[BENCH] No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from src.config import MOTION_GATE
+from src.frame_cache import FrameContext
+from src.motion_gate import MotionGate
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Motion gate replay: idle savings, gate cost and wake-up latency on a simulated corridor.")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--static", type=float, default=20.0, help="Seconds of empty, static corridor before someone enters")
+    parser.add_argument("--speeds", type=float, nargs='+', default=[1, 3, 8, 20], help="Walking speeds to test (pixels/frame at 1080p)")
+    parser.add_argument("--noise", type=float, default=3.0, help="Sensor noise (gray levels, std)")
+    parser.add_argument("--flicker", type=float, default=2.0, help="Global brightness flicker (gray levels, amplitude)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+def corridor(args, rng):
+    """Textured static background (walls, floor, doors)."""
+    small = rng.integers(60, 160, (args.height // 16, args.width // 16, 3), dtype=np.uint8)
+    bg = cv2.resize(small, (args.width, args.height), interpolation=cv2.INTER_NEAREST)
+    return cv2.GaussianBlur(bg, (0, 0), 3)
+
+def run(args, speed):
+    rng = np.random.default_rng(args.seed)
+    background = corridor(args, rng)
+    # A few precomputed sensor-noise fields, cycled (full-res noise per frame would dominate the run time)
+    noise_fields = [rng.normal(0, args.noise, background.shape).astype(np.int16) for _ in range(8)]
+    base = background.astype(np.int16)
+    work = np.empty(background.shape, np.int16)
+    frame = np.empty_like(background)
+    gate = MotionGate()
+
+    dt = 1.0 / args.fps
+    n_static = int(args.static * args.fps)
+    person_h, person_w = int(args.height * 0.5), int(args.height * 0.2)
+    person_y = args.height - person_h - 50
+    entry_frame = wake_frame = None
+    heavy_static = static_seen = 0
+    gate_times = []
+
+    for i in range(n_static + int(args.width / speed) + 10):
+        # Synthetic capture: background + sensor noise + flicker (+ a person walking in from the left)
+        np.add(base, noise_fields[i % len(noise_fields)], out=work)
+        work += int(round(args.flicker * np.sin(i * 0.7)))
+        np.clip(work, 0, 255, out=work)
+        frame[:] = work
+        x2 = int((i - n_static) * speed) if i >= n_static else -1
+        visible = x2 >= 0 # x2 == 0 already draws the first pixel column
+        if visible:
+            cv2.rectangle(frame, (max(0, x2 - person_w), person_y), (x2, person_y + person_h), (30, 40, 90), -1)
+            if entry_frame is None:
+                entry_frame = i
+
+        ctx = FrameContext(frame, i)
+        t0 = time.perf_counter()
+        was_idle = gate.state == MotionGate.IDLE
+        run_heavy = gate.update(ctx, tracks_alive=0, now=i * dt)
+        gate_times.append(time.perf_counter() - t0)
+
+        if not visible:
+            static_seen += 1
+            heavy_static += run_heavy
+        if visible and was_idle and gate.state == MotionGate.ACTIVE:
+            wake_frame = i
+            break
+        if visible and not was_idle:
+            wake_frame = i # Never went idle: no wake-up needed
+            break
+
+    return {
+        'heavy_share_static': heavy_static / max(1, static_seen),
+        'gate_ms': float(np.mean(gate_times) * 1000),
+        'wake_frames': None if wake_frame is None else wake_frame - entry_frame,
+        'visible_px': None if wake_frame is None else int((wake_frame - n_static) * speed),
+    }
+
+def main():
+    args = parse_args()
+    print(f"[BENCH] {args.static:.0f}s static corridor @ {args.fps:.0f} FPS, then one person walks in. "
+          f"IDLE_AFTER={MOTION_GATE['IDLE_AFTER']}s KEEPALIVE={MOTION_GATE['KEEPALIVE']}s")
+    print(f"{'SPEED px/f':>10}{'HEAVY FRAMES (STATIC)':>23}{'GATE ms':>9}{'WAKE FRAMES':>13}{'WAKE ms':>9}{'VISIBLE px':>12}")
+    for speed in args.speeds:
+        r = run(args, speed)
+        wake = "never" if r['wake_frames'] is None else f"{r['wake_frames']}"
+        wake_ms = "-" if r['wake_frames'] is None else f"{r['wake_frames'] * 1000 / args.fps:.0f}"
+        px = "-" if r['visible_px'] is None else f"{r['visible_px']}"
+        print(f"{speed:>10.0f}{r['heavy_share_static']:>22.1%} {r['gate_ms']:>8.3f}{wake:>13}{wake_ms:>9}{px:>12}")
+    print("        (HEAVY FRAMES = share of static frames that still ran inference; WAKE = frames from first visible pixel)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from src.frame_cache import FrameBuffers, FrameContext
+from src.stages import StageExecutor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Frame stage executor: serial vs concurrent pose inference + face landmarking, with stand-in workloads.")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--inference-ms", type=float, default=25.0, help="Stand-in pose inference time per frame")
+    parser.add_argument("--face-ms", type=float, default=12.0, help="Stand-in face landmarking time per frame")
+    parser.add_argument("--device", choices=("cpu", "accel"), default="cpu",
+                        help="cpu = native OpenCV work (competes for cores); accel = waits off the CPU, like a GPU/NPU call")
+    parser.add_argument("--workers", type=int, nargs='+', default=[0, 2], help="Pool sizes to compare (0 = serial)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    return parser.parse_args()
+
+def native_work(device, buf):
+    """
+    One unit of GIL-free work and its calibrated duration.
+    cpu: a blur on a 640x640 tile (OpenCV releases the GIL); accel: a sleep (the CPU is free meanwhile).
+    """
+    if device == "accel":
+        return lambda: time.sleep(0.001), 0.001
+    work = lambda: cv2.GaussianBlur(buf, (9, 9), 0, dst=buf)
+    for _ in range(10):
+        work()
+    t0 = time.perf_counter()
+    for _ in range(50):
+        work()
+    return work, (time.perf_counter() - t0) / 50
+
+def stand_in(device, ms, buf):
+    work, unit = native_work(device, buf)
+    reps = max(1, round(ms / 1000 / unit))
+    def stage(*_):
+        for _ in range(reps):
+            work()
+    return stage
+
+def run(args, workers, frames):
+    tiles = [np.zeros((640, 640, 3), np.uint8) for _ in range(2)] # One scratch tile per stand-in (stages never share buffers)
+    stages = StageExecutor(workers=workers)
+    stages.add('inference', stand_in(args.device, args.inference_ms, tiles[0]))
+    stages.add('rgb', lambda f: f['ctx'].rgb())
+    stages.add('face_mesh', stand_in(args.device, args.face_ms, tiles[1]), after=('rgb',))
+
+    buffers = FrameBuffers()
+    t0 = time.perf_counter()
+    for i, frame in enumerate(frames * (args.frames // len(frames) + 1)):
+        if i == args.frames:
+            break
+        stages.run({'frame': frame, 'ctx': FrameContext(frame, i, buffers=buffers)})
+    fps = args.frames / (time.perf_counter() - t0)
+    stages.close()
+    return stages, fps
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    print(f"[BENCH] {args.frames} frames {args.width}x{args.height}, stand-ins: inference {args.inference_ms:.0f}ms, "
+          f"face {args.face_ms:.0f}ms on {args.device}, cv2 threads {cv2.getNumThreads()}")
+    print(f"{'WORKERS':>8}{'SUM ms':>9}{'PATH ms':>9}{'WALL ms':>9}{'FPS':>8}{'SPEEDUP':>9}  STAGES ms")
+    base = None
+    for workers in args.workers:
+        stages, fps = run(args, workers, frames)
+        base = base or fps
+        per_stage = " ".join(f"{name} {ms:.1f}" for name, ms in stages.stage_ms.items())
+        print(f"{workers:>8}{stages.sum_ms:>9.1f}{stages.path_ms:>9.1f}{stages.wall_ms:>9.1f}{fps:>8.1f}{fps / base:>8.2f}x  {per_stage}")
+    print("        (PATH = critical path of the stage graph: the best wall time concurrency can reach)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from src.camera import open_source
+from src.config import PIPELINE, TRACKING
+from src.detections import Detections
+from src.frame_cache import FrameContext
+from src.relink import TrackRelinker
+from src.synthetic import SyntheticCrowd, render_people
+from src.trackers import TRACKER_BACKENDS, box_iou, create_tracker, greedy_match
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay benchmark of the tracker backends: per-frame cost, ID switches, fragmentation.")
+    parser.add_argument("--trackers", nargs='+', default=list(TRACKER_BACKENDS), choices=TRACKER_BACKENDS)
+    parser.add_argument("--clips", nargs='*', default=[],
+                        help="Video clips or image directories (read through src/camera.py like live capture). Detections are computed once and cached next to the clip (<clip>.dets.npz). "
+                             "Ground truth is read from <clip>.gt.txt (MOTChallenge format) when present")
+    parser.add_argument("--model", default=PIPELINE['MODEL'], help="Detector used to build the clip detection cache")
+    parser.add_argument("--synthetic", type=int, nargs='*', default=None, metavar="PEOPLE",
+                        help="Synthetic crowd sizes with known ground truth (default: 10 50 when no clips are given)")
+    parser.add_argument("--frames", type=int, default=600, help="Frames per synthetic scene")
+    parser.add_argument("--motion", default='cross', choices=SyntheticCrowd.MOTIONS)
+    parser.add_argument("--miss", type=float, default=0.05, help="Synthetic: chance a person is not detected in a frame")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Synthetic: box noise as a fraction of the box height")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU needed to match a track to a ground-truth box")
+    parser.add_argument("--relink", action="store_true",
+                        help="Also replay short-gap re-linking (src/relink.py) on each tracker's output: avoided encodes and wrong re-links")
+    parser.add_argument("--encode-delay", type=float, default=0.3,
+                        help="Re-link replay: seconds until a new track's face encode would return its identity")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    return parser.parse_args()
+
+# --- Scenes ---
+
+class Scene:
+    """
+    Replay input: per-frame Detections and ground truth (ids, xyxy) or None, held in memory.
+    Images are STREAMED by frames() on every pass (a clip is re-opened each time): a minute of
+    1080p is ~11 GB decoded, so frames are never all held at once.
+    images: callable returning an iterator of images (or None) aligned with dets.
+    """
+    def __init__(self, dets, gt, images):
+        self.dets = dets
+        self.gt = gt
+        self._images = images
+
+    def __len__(self):
+        return len(self.dets)
+
+    @property
+    def has_gt(self):
+        return len(self.gt) > 0 and self.gt[0] is not None
+
+    def frames(self):
+        """(image or None, Detections, ground truth or None) per frame. An image is only valid until the next one."""
+        return zip(self._images(), self.dets, self.gt)
+
+def synthetic_scene(args, size):
+    crowd = SyntheticCrowd(size, motion=args.motion, seed=args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    image = crowd.background()
+    dets_all, gt_all = [], []
+    for _ in range(args.frames):
+        gt = crowd.next_frame()
+        # People entering/leaving: a detector needs about half the body in view (full box width = 0.4 * height)
+        on_screen = (gt.xyxy[:, 2] - gt.xyxy[:, 0]) >= 0.2 * (gt.xyxy[:, 3] - gt.xyxy[:, 1])
+        gt = Detections(gt.xyxy[on_screen], gt.conf[on_screen], gt.cls[on_screen], gt.ids[on_screen], gt.keypoints[on_screen])
+        seen = rng.random(len(gt)) >= args.miss
+        h = (gt.xyxy[seen, 3] - gt.xyxy[seen, 1])[:, None]
+        xyxy = (gt.xyxy[seen] + rng.normal(0, args.jitter, (seen.sum(), 4)) * h).astype(np.float32)
+        dets = Detections(xyxy, gt.conf[seen], gt.cls[seen], None, gt.keypoints[seen])
+        dets_all.append(dets)
+        gt_all.append((gt.ids, gt.xyxy))
+    return Scene(dets_all, gt_all, lambda: itertools.repeat(image, len(dets_all)))
+
+def _clip_base(path):
+    return os.path.splitext(path.rstrip("/\\"))[0]
+
+def _clip_detections(path, model_name):
+    cache = _clip_base(path) + ".dets.npz"
+    if os.path.exists(cache):
+        data = np.load(cache)
+        frame_idx = data['frame_idx']
+        return [Detections(data['xyxy'][frame_idx == i], data['conf'][frame_idx == i], data['cls'][frame_idx == i],
+                           None, data['keypoints'][frame_idx == i]) for i in range(int(data['n_frames']))]
+
+    from ultralytics import YOLO
+    print(f"[BENCH] Detecting {path} with {model_name} (cached to {cache}) ...")
+    model = YOLO(model_name)
+    source = open_source(path)
+    per_frame = []
+    while True:
+        ret, frame, _ = source.read()
+        if not ret:
+            break
+        results = model.predict(frame, conf=TRACKING['DETECT_CONF'], verbose=False, classes=[0])
+        dets = Detections.from_results(results[0])
+        if dets.keypoints is None:
+            dets.keypoints = np.zeros((len(dets), 17, 2), np.float32)
+        per_frame.append(dets)
+    source.release()
+
+    np.savez_compressed(
+        cache, n_frames=len(per_frame),
+        frame_idx=np.concatenate([np.full(len(d), i) for i, d in enumerate(per_frame)] + [np.zeros(0, int)]),
+        xyxy=np.concatenate([d.xyxy for d in per_frame] + [np.zeros((0, 4), np.float32)]),
+        conf=np.concatenate([d.conf for d in per_frame] + [np.zeros(0, np.float32)]),
+        cls=np.concatenate([d.cls for d in per_frame] + [np.zeros(0, int)]),
+        keypoints=np.concatenate([d.keypoints for d in per_frame] + [np.zeros((0, 17, 2), np.float32)]))
+    return per_frame
+
+def _mot_ground_truth(path, n_frames):
+    """MOTChallenge gt.txt: frame, id, left, top, width, height, ... (frames start at 1)."""
+    gt = [(np.zeros(0, int), np.zeros((0, 4), np.float32)) for _ in range(n_frames)]
+    rows = np.loadtxt(path, delimiter=',', ndmin=2)
+    for i in range(n_frames):
+        r = rows[rows[:, 0] == i + 1]
+        xyxy = np.column_stack([r[:, 2], r[:, 3], r[:, 2] + r[:, 4], r[:, 3] + r[:, 5]]).astype(np.float32)
+        gt[i] = (r[:, 1].astype(int), xyxy)
+    return gt
+
+def clip_scene(args, path):
+    dets = _clip_detections(path, args.model)
+    gt_path = _clip_base(path) + ".gt.txt"
+    gt = _mot_ground_truth(gt_path, len(dets)) if os.path.exists(gt_path) else [None] * len(dets)
+
+    def images():
+        # Decoded again for every pass: BoT-SORT needs the images for camera motion compensation
+        source = open_source(path)
+        try:
+            for _ in dets:
+                ret, image, _ = source.read()
+                yield image if ret else None
+        finally:
+            source.release()
+
+    return Scene(dets, gt, images)
+
+# --- Metrics ---
+
+def score_tracks(scene, outputs, iou_thresh):
+    """
+    CLEAR-MOT style counts against ground truth:
+        id_switches:   a ground-truth person is matched to a different track id than before.
+        fragmentation: a ground-truth person's track id is interrupted and the person is picked up
+                       again under ANOTHER id (a gap the tracker did not bridge). Gaps after which
+                       the same id resumes (e.g. detector misses held by the tracker) do not count.
+    """
+    last_hyp, tracked, people = {}, {}, set()
+    switches = frags = matched = total = 0
+    for gt, out in zip(scene.gt, outputs):
+        gt_ids, gt_xyxy = gt
+        total += len(gt_ids)
+        people.update(gt_ids.tolist())
+        pairs = greedy_match(box_iou(gt_xyxy, out.xyxy), iou_thresh)
+        hyp_of = {gt_ids[r]: out.ids[c] for r, c in pairs}
+        matched += len(hyp_of)
+        for gid in gt_ids:
+            hid = hyp_of.get(gid)
+            if hid is None:
+                if gid in last_hyp:
+                    tracked[gid] = False
+                continue
+            if gid in last_hyp:
+                switches += last_hyp[gid] != hid
+                frags += not tracked[gid] and last_hyp[gid] != hid
+            last_hyp[gid], tracked[gid] = hid, True
+
+    hyp_ids = set()
+    for out in outputs:
+        hyp_ids.update(out.ids.tolist())
+    return {'id_switches': int(switches), 'fragmentation': int(frags), 'recall': matched / max(total, 1),
+            'ids_per_person': len(hyp_ids) / max(len(people), 1)}
+
+def track_lengths(outputs):
+    """Without ground truth: number of tracks and their mean length (fewer, longer = less fragmented)."""
+    lengths = {}
+    for out in outputs:
+        for tid in out.ids.tolist():
+            lengths[tid] = lengths.get(tid, 0) + 1
+    return {'tracks': len(lengths), 'mean_track_frames': float(np.mean(list(lengths.values()))) if lengths else 0.0}
+
+def relink_replay(scene, outputs, args, render):
+    """
+    Short-gap re-linking on top of a tracker's output, timed at TRACKING['FRAME_RATE'].
+    A track's persistent id comes from an ideal face encoder answering --encode-delay seconds after
+    the track is born and re-checking every frame after that: its current ground-truth person
+    (without ground truth: the first track id of the chain).
+    Until then the track tries to re-link to a lost one, like IdentityManager does.
+        births:  tracks born after the first frame
+        chances: births whose person has a lost track waiting in the re-link pool
+        relinks: births that inherited a persistent id (each one is an urgent encode avoided)
+        wrong:   re-links to another person's id (ground truth only)
+    render: draw the ground-truth people (synthetic scenes have no people in the image).
+    """
+    relinker = TrackRelinker()
+    fps = TRACKING['FRAME_RATE']
+    canvas = None
+    owner, born = {}, {}
+    births = chances = relinks = wrong = 0
+    for k, ((image, _, gt), out) in enumerate(zip(scene.frames(), outputs)):
+        now = k / fps
+        if render:
+            canvas = image.copy() if canvas is None else canvas
+            np.copyto(canvas, image)
+            image = render_people(canvas, *gt)
+        ctx = FrameContext(image, k)
+
+        truth = {}
+        if gt is not None:
+            for r, c in greedy_match(box_iou(out.xyxy, gt[1]), args.iou):
+                truth[int(out.ids[r])] = int(gt[0][c])
+
+        alive = set(out.ids.tolist())
+        relinker.begin_frame(out.xyxy)
+        for tid in [t for t in relinker.tracks if t not in alive]:
+            relinker.lose(tid, owner.get(tid), now)
+        taken = {owner[t] for t in alive if t in owner}
+
+        for i, tid in enumerate(out.ids.tolist()):
+            box, kps = out.xyxy[i], out.keypoints[i] if out.keypoints is not None else None
+            if tid not in born:
+                born[tid] = now
+                births += k > 0
+                chances += k > 0 and truth.get(tid) in relinker.lost_pids()
+            if tid not in owner and relinker.is_young(tid, now):
+                pid, _ = relinker.match(ctx, tid, box, kps, now, exclude=taken)
+                if pid is not None:
+                    owner[tid] = pid
+                    taken.add(pid)
+                    relinks += 1
+                    wrong += tid in truth and truth[tid] != pid
+            if now - born[tid] >= args.encode_delay:
+                # Encoded (and re-checked from then on): follows the person the track is on now
+                owner[tid] = truth.get(tid, owner.get(tid, tid)) if gt is not None else owner.get(tid, tid)
+            relinker.observe(ctx, tid, box, kps, now, signature=tid in owner)
+
+    return {'births': births, 'chances': chances, 'relinks': relinks,
+            'wrong': wrong if scene.has_gt else None}
+
+def replay(name, scene, args, render=False):
+    tracker = create_tracker(name)
+    times, outputs = [], []
+    for image, dets, _ in scene.frames():
+        t0 = time.perf_counter()
+        out = tracker.update(dets, image)
+        times.append(time.perf_counter() - t0)
+        outputs.append(out)
+
+    result = {'mean_ms': float(np.mean(times) * 1000), 'p95_ms': float(np.percentile(times, 95) * 1000)}
+    if scene.has_gt:
+        result.update(score_tracks(scene, outputs, args.iou))
+    else:
+        result.update(track_lengths(outputs))
+    if args.relink:
+        result['relink'] = relink_replay(scene, outputs, args, render)
+    return result
+
+def print_table(results):
+    print(f"{'SCENE':<22}{'TRACKER':<11}{'MS/FRAME (P95)':>16}{'IDSW':>7}{'FRAG':>7}{'RECALL':>8}{'IDS/GT':>8}{'TRACKS':>8}")
+    for scene, per_tracker in results.items():
+        for name, r in per_tracker.items():
+            if 'id_switches' in r:
+                scored = f"{r['id_switches']:>7}{r['fragmentation']:>7}{r['recall']:>8.2f}{r['ids_per_person']:>8.2f}{'':>8}"
+            else:
+                scored = f"{'-':>7}{'-':>7}{'-':>8}{'-':>8}{r['tracks']:>8}"
+            print(f"{scene:<22}{name:<11}{r['mean_ms']:>8.3f} ({r['p95_ms']:>5.2f}){scored}")
+
+def print_relink_table(results):
+    print(f"{'SCENE':<22}{'TRACKER':<11}{'BIRTHS':>8}{'CHANCES':>9}{'RELINKS':>9}{'WRONG':>7}{'AVOIDED':>9}")
+    for scene, per_tracker in results.items():
+        for name, r in per_tracker.items():
+            rl = r.get('relink')
+            if rl is None:
+                continue
+            wrong = "-" if rl['wrong'] is None else f"{rl['wrong']}"
+            avoided = rl['relinks'] - (rl['wrong'] or 0)
+            print(f"{scene:<22}{name:<11}{rl['births']:>8}{rl['chances']:>9}{rl['relinks']:>9}{wrong:>7}{avoided:>9}")
+    print("        (CHANCES = new tracks of a person whose lost track was still re-linkable; AVOIDED = correct re-links = urgent encodes saved)")
+
+def main():
+    args = parse_args()
+    sizes = args.synthetic if args.synthetic is not None else ([] if args.clips else [10, 50])
+
+    scenes = {}
+    for size in sizes:
+        scenes[f"synthetic-{args.motion}-{size}"] = lambda size=size: synthetic_scene(args, size)
+    for path in args.clips:
+        scenes[os.path.basename(path)] = lambda path=path: clip_scene(args, path)
+
+    results = {}
+    for scene, load in scenes.items():
+        data = load()
+        if not len(data):
+            print(f"[WARN] {scene}: no frames, skipped")
+            continue
+        print(f"[BENCH] {scene}: {len(data)} frames")
+        results[scene] = {}
+        for name in args.trackers:
+            try:
+                results[scene][name] = replay(name, data, args, render=scene.startswith("synthetic"))
+            except ImportError as e:
+                print(f"[WARN] {name} unavailable ({e}), skipped")
+
+    print_table(results)
+    if args.relink:
+        print_relink_table(results)
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[BENCH] Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
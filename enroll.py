@@ -0,0 +1,92 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.config import IDENTITY_STORE_PATH, ENROLLMENT
+from src.enrollment import plan_work_items, process_work_item, select_diverse_samples
+from src.identity_store import load_identity_store, save_identity_store
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Bulk-enroll trusted identities from video clips and photo folders.",
+        epilog="Example: python enroll.py --person COMMANDER clips/cmd.mp4 photos/cmd/ --person ALICE photos/alice/")
+    parser.add_argument("--person", nargs='+', action='append', metavar=("NAME", "PATH"),
+                        help="Identity name followed by one or more video files, images or folders")
+    parser.add_argument("--root", help="Folder with one sub-folder per person (folder name = identity name)")
+    parser.add_argument("--store", default=IDENTITY_STORE_PATH, help=f"Identity store to update (default: {IDENTITY_STORE_PATH})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Decode/encode worker processes")
+    parser.add_argument("--samples", type=int, default=ENROLLMENT['SAMPLES_PER_PERSON'], help="Max samples kept per person")
+    parser.add_argument("--stride", type=int, default=ENROLLMENT['FRAME_STRIDE'], help="Use every N-th video frame")
+    parser.add_argument("--replace", action='store_true', help="Replace existing samples instead of merging with them")
+    return parser.parse_args()
+
+def collect_people(args):
+    people = {}
+    for entry in args.person or []:
+        if len(entry) < 2:
+            raise SystemExit(f"[ERROR] --person {entry[0]} needs at least one PATH")
+        people.setdefault(entry[0], []).extend(entry[1:])
+    if args.root:
+        for name in sorted(os.listdir(args.root)):
+            full = os.path.join(args.root, name)
+            if os.path.isdir(full):
+                people.setdefault(name, []).append(full)
+    return people
+
+def main():
+    args = parse_args()
+    people = collect_people(args)
+    if not people:
+        raise SystemExit("[ERROR] Nothing to enroll. Use --person NAME PATH... or --root DIR")
+
+    items = []
+    for name, paths in people.items():
+        items.extend(plan_work_items(name, paths, frame_stride=args.stride))
+    print(f"[ENROLL] {len(people)} people, {len(items)} work items, {args.workers} workers")
+
+    t0 = time.time()
+    stats = {name: {'frames': 0, 'faces': 0, 'samples': []} for name in people}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(process_work_item, item) for item in items]
+        for n, fut in enumerate(as_completed(futures), 1):
+            try:
+                res = fut.result()
+            except Exception as e:
+                print(f"[ERROR] Work item failed: {e}")
+                continue
+            st = stats[res['person']]
+            st['frames'] += res['frames']
+            st['faces'] += res['faces']
+            st['samples'].extend(res['samples'])
+            print(f"\r[ENROLL] {n}/{len(items)} items done", end="", flush=True)
+    print()
+
+    store = load_identity_store(args.store)
+
+    print(f"{'PERSON':<16}{'FRAMES':>8}{'FACES':>8}{'USABLE':>8}{'KEPT':>6}{'Q MIN':>8}{'Q MEAN':>8}{'Q MAX':>8}")
+    for name, st in stats.items():
+        candidates = list(st['samples'])
+        if name in store and not args.replace:
+            # Merge: previous samples compete with the new ones
+            old = store[name]
+            candidates.extend((enc, q, "store") for enc, q in zip(old['encodings'], old['qualities']))
+
+        kept = select_diverse_samples(candidates, k=args.samples)
+        if kept:
+            store[name] = {'encodings': [s[0] for s in kept], 'qualities': [s[1] for s in kept]}
+            q = np.array([s[1] for s in kept])
+            q_min, q_mean, q_max = q.min(), q.mean(), q.max()
+        else:
+            q_min = q_mean = q_max = 0.0
+            print(f"[WARN] No usable face samples for {name}")
+
+        print(f"{name:<16}{st['frames']:>8}{st['faces']:>8}{len(st['samples']):>8}{len(kept):>6}{q_min:>8.2f}{q_mean:>8.2f}{q_max:>8.2f}")
+
+    save_identity_store(args.store, store)
+    print(f"[ENROLL] Saved {len(store)} identities to {args.store} in {time.time() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
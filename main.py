@@ -1,3 +1,4 @@
+import argparse
 import cv2
 import numpy as np
 import time
@@ -12,10 +13,54 @@ except ImportError:
 from src.turret_controller import TurretController
 from src.target_manager import TargetManager
 from src.visualization import draw_hud
+from src.recorder import HudRecorder
+from src.frame_cache import FrameContext, FrameBuffers, PrepStats
+from src.face_mesh import create_face_landmarker, detect_face_landmarks
+from src.controls import key_to_command, apply_command
+from src.service import HudStreamServer
+from src.profiler import ProfileCapture
+from src.trackers import TRACKER_BACKENDS, create_tracker, detect_and_track
+from src.tracing import Tracer
+from src.motion_gate import MotionGate
+from src.camera import open_source
+from src.stages import StageExecutor
+from src.config import TRACKING, MOTION_GATE
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Safe Turret System")
+    parser.add_argument("--source", default=None,
+                        help="Camera index, video file, image directory or stream URL (default: CAMERA['SOURCE'])")
+    parser.add_argument("--record", action='store_true', help="Record the rendered HUD (see RECORDER in src/config.py)")
+    parser.add_argument("--pre-trigger", type=float, default=None, metavar="SECONDS",
+                        help="Record mode: keep only the last N seconds in memory until 'v' saves them")
+    parser.add_argument("--headless", action='store_true',
+                        help="No window: serve the HUD as MJPEG on localhost and take commands over HTTP")
+    parser.add_argument("--port", type=int, default=None, help="Headless mode HTTP port (default: SERVICE['PORT'])")
+    parser.add_argument("--pipeline", action='store_true',
+                        help="Run capture, inference, identity and render as separate processes (shared-memory frame bus)")
+    parser.add_argument("--tracker", default=TRACKING['BACKEND'], choices=("builtin",) + TRACKER_BACKENDS,
+                        help="builtin = model.track with bytetrack.yaml; others track model.predict output (src/trackers.py)")
+    parser.add_argument("--no-motion-gate", action='store_true',
+                        help="Run inference every frame even when the scene is static and empty (see MOTION_GATE)")
+    parser.add_argument("--serial-stages", action='store_true',
+                        help="Run pose inference and face landmarking one after the other on the main thread (see STAGES)")
+    args = parser.parse_args()
+    if args.pre_trigger is not None and not args.record:
+        parser.error("--pre-trigger needs --record")
+    return args
 
 def main():
+    args = parse_args()
     print("[SYSTEM] Initializing Safe Turret System...")
     
+    if args.pipeline:
+        from src.pipeline import run_pipeline
+        cfg = {'TRACKER': args.tracker}
+        if args.source is not None:
+            cfg['CAMERA'] = args.source
+        run_pipeline(record=args.record, pre_trigger=args.pre_trigger, cfg=cfg, headless=args.headless, port=args.port)
+        return
+    
     # Load POSE Model for precise keypoint targeting
     try:
         model = YOLO("yolo11n-pose.pt") 
@@ -23,159 +68,209 @@ def main():
         print(f"[ERROR] Model load failed: {e}")
         return
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("[ERROR] Camera not found.")
-        return
-
-    # Set resolution to 1920x1080 (Full HD)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-    
-    # Wait for the first frame to ensure we have dimensions
-    time.sleep(2) # Allow camera to warm up
-    ret, test_frame = cap.read()
-    if not ret:
-        print("[ERROR] Could not read from camera.")
+    # Frame source: camera (MJPG 1920x1080 negotiated + verified), file, image directory or stream.
+    # Decodes on a background thread; warm-up frames are read while opening.
+    try:
+        source = open_source(args.source)
+    except IOError as e:
+        print(f"[ERROR] {e}")
         return
 
-    W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    H = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # Dimensions as actually delivered (not as requested)
+    W, H = source.info['width'], source.info['height']
     
     # Init Subsystems
     turret = TurretController(kp=0.1, ki=0.01, kd=0.05)
     manager = TargetManager(W, H)
     
     # Initialize MediaPipe Tasks API (New Face Landmarker)
-    import mediapipe as mp
-    from mediapipe.tasks import python
-    from mediapipe.tasks.python import vision
-    
     # Path to the downloaded model
-    model_path = 'face_landmarker.task'
+    landmarker = create_face_landmarker('face_landmarker.task', num_faces=5)
     
-    # Create options
-    base_options = python.BaseOptions(model_asset_path=model_path)
-    options = vision.FaceLandmarkerOptions(
-        base_options=base_options,
-        output_face_blendshapes=True, # Optional: For detailed expressions
-        output_facial_transformation_matrixes=True,
-        num_faces=5, # Track up to 5 faces simultaneously
-        min_face_detection_confidence=0.5,
-        min_face_presence_confidence=0.5,
-        min_tracking_confidence=0.5,
-        running_mode=vision.RunningMode.VIDEO)
+    aim_mode = 2 # Default: UPPER_BODY
     
-    # Create Landmarker
-    landmarker = vision.FaceLandmarker.create_from_options(options)
+    # Tracker backend (None = ByteTrack inside model.track)
+    tracker = create_tracker(args.tracker)
     
-    aim_mode = 2 # Default: UPPER_BODY
+    # HUD Recorder (separate encoder process)
+    recorder = None
+    if args.record:
+        recorder = HudRecorder(W, H, pre_trigger_seconds=args.pre_trigger,
+                               source_fps=source.info.get('measured_fps') or source.info.get('fps')).start()
+    
+    # Headless Service (MJPEG stream + command API instead of a window)
+    server = None
+    if args.headless:
+        server = HudStreamServer(port=args.port).start()
     
     print(f"[SYSTEM] Cam: {W}x{H}")
     print("[SYSTEM] Mode: PRECISE POSE TRACKING + MP TASKS API")
-    print("[CONTROL] Keys: '1'=Head, '2'=Upper Body, '3'=Non-Lethal")
-    print("[CONTROL] Keys: 'm'=Toggle Manual/Auto, 'TAB'=Cycle Targets")
+    print(f"[SYSTEM] Tracker: {args.tracker}")
+    if not server:
+        print("[CONTROL] Keys: '1'=Head, '2'=Upper Body, '3'=Non-Lethal")
+        print("[CONTROL] Keys: 'm'=Toggle Manual/Auto, 'TAB'=Cycle Targets")
+        print("[CONTROL] Keys: 'p'=Capture Profile, 't'=Export Frame Trace")
+        if recorder:
+            print("[CONTROL] Keys: 'v'=Save Recording Event")
 
     # Timestamp for MP (monotonic in ms)
     # import time (Removed: Global import used)
     start_time_s = time.time()
+    
+    # Per-frame preprocessing cost (conversions / bytes copied)
+    prep_stats = PrepStats()
+    frame_id = 0
+    
+    # Reused destination buffers for the full-frame views (RGB for MediaPipe, gate thumbnail, ...)
+    frame_buffers = FrameBuffers()
+    
+    # On-demand profiler (idle until 'p' / 'profile')
+    profiler = ProfileCapture()
+    
+    # Per-frame trace spans + capture-to-actuation latency ('t' / 'trace' exports the window)
+    tracer = Tracer()
+    manager.id_manager.on_job_done = tracer.identity_job
+    last_ts_ms = -1
+    
+    # Motion gate: static scene + no tracks -> heavy stages at keep-alive rate
+    gate = MotionGate() if MOTION_GATE['ENABLED'] and not args.no_motion_gate else None
+    tracks_alive = 0
+
+    # Per-frame stages, run concurrently where the declared dependencies allow; joined before selection
+    stages = StageExecutor(workers=0 if args.serial_stages else None)
+    # Detect + Track (ByteTrack via model.track, or the selected backend)
+    # Enable logging: save_txt=True, save_conf=True
+    stages.add('inference', lambda f: detect_and_track(model, f['frame'], tracker,
+                                        save=True,      # Save inference images/video
+                                        save_txt=True,  # Save bounding box coordinates
+                                        save_conf=True  # Save confidence scores
+                                        ))
+    # MediaPipe Face Landmarker (Tasks API), for ALL faces (not just primary), on the clean frame
+    stages.add('rgb', lambda f: f['ctx'].rgb())
+    stages.add('face_mesh', lambda f, rgb: detect_face_landmarks(landmarker, rgb, f['ts_ms']), after=('rgb',))
 
     while True:
-        ret, frame = cap.read()
+        profiler.on_frame()
+        
+        # t_capture: when the driver delivered the frame (grab() returned on the decode thread)
+        t_wait = time.time()
+        ret, frame, t_capture = source.read()
         if not ret: break
         
-        # Calculate MS timestamp
-        ts_ms = int((time.time() - start_time_s) * 1000)
-
-        # Track with ByteTrack
-        # Enable logging: save_txt=True, save_conf=True
-        results = model.track(frame, persist=True, tracker="bytetrack.yaml", 
-                            verbose=False, classes=[0],
-                            save=True,      # Save inference images/video
-                            save_txt=True,  # Save bounding box coordinates
-                            save_conf=True  # Save confidence scores
-                            )
+        # Shared preprocessing cache: every consumer reads derived views from here
+        frame_id += 1
+        trace = tracer.begin(frame_id, t_capture)
+        trace.add('capture', t_wait, time.time()) # Waiting for the next decoded frame
+        ctx = FrameContext(frame, frame_id, t_capture=t_capture, trace=trace, buffers=frame_buffers)
         
-        # --- LOGIC UPDATE ---
-        targets = []
-        primary = None
+        # Calculate MS timestamp (at capture, strictly increasing for MediaPipe)
+        ts_ms = max(int((t_capture - start_time_s) * 1000), last_ts_ms + 1)
+        last_ts_ms = ts_ms
+
+        # --- MOTION GATE ---
+        with trace.span('gate'):
+            run_heavy = gate.update(ctx, tracks_alive) if gate else True
         
-        if results:
-            # Pass the FULL results object (contains keypoints) AND the frame for identity
-            targets = manager.select_targets(results[0], frame, aim_mode)
-            primary = manager.primary_target
+        if run_heavy:
+            # Pose inference overlaps RGB conversion + face landmarks (VIDEO mode, frame capture timestamp)
+            out = stages.run({'frame': frame, 'ctx': ctx, 'ts_ms': ts_ms}, trace=trace)
+            _, dets = out['inference']
+            face_landmarks = out['face_mesh']
+            tracks_alive = len(dets)
+            
+            # --- LOGIC UPDATE ---
+            # Tracked detections (with keypoints) AND the frame for identity
+            with trace.span('selection'):
+                targets = manager.select_targets(dets, ctx, aim_mode)
+                primary = manager.primary_target
+        else:
+            # Idle: static, empty scene. Nothing to track or draw.
+            manager.clear_targets()
+            dets, targets, primary, face_landmarks = None, [], None, []
+        prep_stats.add(ctx)
 
         # --- TURRET PID UPDATE ---
         if primary:
-            # Use the calculated AIM POINT
-            target_x, target_y = primary['aim_point']
-            
-            # Error = Target Point - Frame Center
-            error_x = target_x - (W // 2)
-            error_y = target_y - (H // 2)
-            turret.update(error_x, error_y)
+            with trace.span('control'):
+                # Use the calculated AIM POINT
+                target_x, target_y = primary['aim_point']
+                
+                # Error = Target Point - Frame Center
+                error_x = target_x - (W // 2)
+                error_y = target_y - (H // 2)
+                turret.update(error_x, error_y)
         
         # --- RENDER ---
-        draw_hud(frame, turret, targets, primary, aim_mode, manager)
+        t_render = time.time()
+        # Headless: only draw when someone is watching (stream client or recorder)
+        if not run_heavy:
+            if not server or server.has_clients():
+                cv2.putText(frame, f"MOTION GATE: {gate.summary()}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+        elif not server or server.has_clients() or recorder:
+            perf = {'STAGES': stages.summary(), 'PREP': prep_stats.summary(), 'LATENCY': tracer.latency_summary(), 'ID AGE': tracer.label_age_summary()}
+            if gate:
+                perf['GATE'] = gate.summary()
+            if profiler.active:
+                perf['PROFILE'] = profiler.status()
+            draw_hud(frame, turret, targets, primary, aim_mode, manager, perf=perf)
+
+            # --- TECH DEMO VISUALS ---
+            from src.visualization import draw_skeleton, draw_mediapipe_mesh, draw_latency_histogram
+            
+            # 0. Capture-to-actuation latency (rolling window)
+            draw_latency_histogram(frame, tracer.histogram())
+            
+            # 1. Pose Skeleton (For ALL tracked persons; keypoints already converted to numpy once)
+            if dets is not None and dets.keypoints is not None:
+                 for kp_xy in dets.keypoints:
+                     draw_skeleton(frame, kp_xy)
+
+            # 2. MediaPipe Face Mesh
+            if face_landmarks:
+                 draw_mediapipe_mesh(frame, face_landmarks)
+
+        if recorder:
+            recorder.submit(frame)
 
-        # --- TECH DEMO VISUALS ---
-        from src.visualization import draw_skeleton, draw_mediapipe_mesh
-        
-        # 1. Pose Skeleton (For ALL tracked persons)
-        if results and results[0].keypoints is not None:
-             for i, kps in enumerate(results[0].keypoints):
-                 # Get raw xy
-                 kp_xy = kps.xy[0].cpu().numpy()
-                 draw_skeleton(frame, kp_xy)
-
-        # 2. MediaPipe Face Landmarker (Tasks API)
-        # Process for ALL faces (not just primary)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
-         
-        # Process Async (Video Mode)
-        detection_result = landmarker.detect_for_video(mp_image, ts_ms)
-         
-        if detection_result.face_landmarks:
-             draw_mediapipe_mesh(frame, detection_result.face_landmarks)
-
-        cv2.imshow("Safe Turret Sim", frame)
-        
         # Input Handling
-        key = cv2.waitKey(1)
-        if key == ord('q'): 
+        if server:
+            server.publish(frame)
+            cmds = server.poll_commands()
+        else:
+            cv2.imshow("Safe Turret Sim", frame)
+            cmd = key_to_command(cv2.waitKey(1))
+            cmds = [cmd] if cmd else []
+        trace.add('render', t_render, time.time())
+        tracer.end(trace)
+
+        if 'quit' in cmds: 
             break
-        elif key == ord('1'):
-            aim_mode = 1
-        elif key == ord('2'):
-            aim_mode = 2
-        elif key == ord('3'):
-            aim_mode = 3
-        elif key == ord('m'):
-            manager.manual_mode = not manager.manual_mode
-            print(f"[SYSTEM] Manual Mode: {manager.manual_mode}")
-            # If switching to Manual, lock onto current primary (if any)
-            if manager.manual_mode and manager.primary_target:
-                manager.selected_id = manager.primary_target['id']
-            elif not manager.manual_mode:
-                manager.selected_id = None
-        elif key == 9: # TAB Key (ASCII 9)
-            if manager.manual_mode and len(targets) > 0:
-                # Cycle ID
-                # Get list of IDs
-                ids = sorted([t['id'] for t in targets])
-                
-                if manager.selected_id in ids:
-                    idx = ids.index(manager.selected_id)
-                    next_idx = (idx + 1) % len(ids)
-                    manager.selected_id = ids[next_idx]
-                else:
-                    # If current selected is lost, pick first
-                    manager.selected_id = ids[0]
-                
-                print(f"[SYSTEM] Switched Target -> {manager.selected_id} (Available: {ids})")
+        for cmd in cmds:
+            if cmd == 'event':
+                if recorder:
+                    recorder.trigger()
+            elif cmd == 'profile':
+                profiler.request()
+            elif cmd == 'trace':
+                tracer.export()
+            else:
+                aim_mode = apply_command(cmd, manager, targets, aim_mode)
 
-    cap.release()
+    print(f"[SYSTEM] Preprocessing per frame: {prep_stats.summary()}")
+    print(f"[SYSTEM] Frame stages: {stages.breakdown()}")
+    print(f"[SYSTEM] Capture-to-actuation latency: {tracer.latency_summary()}")
+    q = manager.id_manager.get_queue_stats()
+    print(f"[SYSTEM] Identity: {q['encode_calls']} encodes, {q['relinks']} re-links "
+          f"({q['relinks_confirmed']} confirmed, {q['relinks_wrong']} wrong, {q['relinks_dropped']} dropped unverified)")
+    if gate:
+        print(f"[SYSTEM] Motion gate: {gate.summary()}")
+    if recorder:
+        recorder.stop()
+    if server:
+        server.stop()
+    print(f"[SYSTEM] Frames: {source.stats()}")
+    stages.close()
+    source.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
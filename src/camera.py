@@ -0,0 +1,347 @@
+import glob
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from .config import CAMERA
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+STREAM_PREFIXES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+def fourcc_to_str(value):
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or "?"
+
+def _copy_into(frame, dst):
+    """Frame into a caller buffer (resized when the size differs). Returns dst."""
+    if frame.shape == dst.shape:
+        np.copyto(dst, frame)
+    else:
+        cv2.resize(frame, (dst.shape[1], dst.shape[0]), dst=dst)
+    return dst
+
+class FrameSource(ABC):
+    """
+    One interface for every frame input (live camera, stream URL, video file, image directory):
+        read(dst=None) -> (ok, frame, t_capture)   t_capture: when the frame arrived (time.time())
+        skip()                                     Discard the next frame (keeps a live buffer fresh)
+        info                                       What was actually negotiated / found
+        stats()                                    Frames read / dropped
+        release()
+    threaded=True decodes on a background thread:
+        - Live sources keep only the NEWEST frame (older unread frames are dropped, like a camera).
+        - Files / image directories read ahead into a small queue and never drop (replay is exact).
+    reuse=True recycles frame buffers: a frame returned by read() is decoded into again once the
+    NEXT read() is called, so the steady state allocates no frames. Callers that keep frames
+    across reads must copy them (or open the source with reuse=False).
+    """
+    live = False
+
+    def __init__(self, name, threaded, buffer, reuse=False):
+        self.name = name
+        self.info = {'kind': self.__class__.__name__, 'source': name}
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._threaded = threaded
+        self._buffer = buffer
+        self._thread = None
+        self._running = False
+        self._reuse = reuse
+        self._free = queue.Queue() # Recycled frame buffers (reuse=True), filled as frames are released
+        self._held = None          # Frame handed out by the last read()
+        self._close_lock = threading.Lock()
+        self._thread_done = False  # Decode thread has exited (it no longer touches the device)
+        self._close_pending = False # release() gave up waiting: the decode thread closes on its way out
+
+    # --- Subclass API ---
+
+    @abstractmethod
+    def _next(self, dst=None):
+        """Blocking: next frame from the device/file. Returns (ok, frame, t_capture)."""
+
+    def _close(self):
+        pass
+
+    # --- Public API ---
+
+    def start(self):
+        if self._threaded and self._thread is None:
+            self._running = True
+            if self.live:
+                self._cond = threading.Condition()
+                self._latest, self._seq, self._taken, self._eof = None, 0, 0, False
+                target = self._live_loop
+            else:
+                self._queue = queue.Queue(maxsize=self._buffer)
+                target = self._readahead_loop
+            self._thread = threading.Thread(target=self._thread_main, args=(target,), name=f"source-{self.info['kind']}", daemon=True)
+            self._thread.start()
+        return self
+
+    def read(self, dst=None, timeout=5.0):
+        self._recycle(self._held) # The caller is done with the previous frame
+        self._held = None
+        if not self._threaded:
+            ok, frame, t = self._next(dst if dst is not None else self._spare())
+            if ok:
+                self.frames_read += 1
+                if dst is None:
+                    self._held = frame
+                elif frame is not dst:
+                    frame = _copy_into(frame, dst)
+            return ok, frame, t
+
+        if self.live:
+            with self._cond:
+                if not self._cond.wait_for(lambda: self._seq > self._taken or self._eof, timeout):
+                    return False, None, None
+                if self._seq == self._taken: # EOF, nothing new
+                    return False, None, None
+                frame, t = self._latest
+                self.frames_dropped += self._seq - self._taken - 1
+                self._taken = self._seq
+        else:
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return False, None, None
+            if item is None: # End of file / directory
+                self._queue.put(None)
+                return False, None, None
+            frame, t = item
+        self.frames_read += 1
+        if dst is not None:
+            _copy_into(frame, dst)
+            self._recycle(frame) # Only once copied: the decode thread may decode into it right away
+            return True, dst, t
+        self._held = frame
+        return True, frame, t
+
+    def skip(self):
+        """Unthreaded live source: grab and discard one frame. No-op otherwise."""
+        if not self._threaded and self.live:
+            self._grab_only()
+
+    def _grab_only(self):
+        self._next()
+
+    def stats(self):
+        return {'read': self.frames_read, 'dropped': self.frames_dropped}
+
+    # --- Buffer Recycling ---
+
+    def _spare(self):
+        """A released frame buffer to decode into, or None (the decoder allocates)."""
+        if not self._reuse:
+            return None
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _recycle(self, frame):
+        if self._reuse and frame is not None:
+            self._free.put(frame)
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            if not self.live:
+                try: # Unblock a reader waiting on a full queue
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+            self._thread.join(timeout=1.0)
+            with self._close_lock:
+                if not self._thread_done:
+                    # Still blocked in the device (e.g. a stalled stream): closing now would pull the
+                    # capture out from under it. The thread closes it once the read returns.
+                    self._close_pending = True
+                    print(f"[WARN] {self.name}: decode thread still blocked in read, closing when it returns")
+                    return
+        self._close()
+
+    # --- Background Threads ---
+
+    def _thread_main(self, loop):
+        try:
+            loop()
+        finally:
+            with self._close_lock:
+                self._thread_done = True
+                if self._close_pending:
+                    self._close()
+
+    def _live_loop(self):
+        while self._running:
+            ok, frame, t = self._next(self._spare())
+            with self._cond:
+                if not ok:
+                    self._eof = True
+                    self._cond.notify_all()
+                    return
+                if self._seq > self._taken: # Unread frame replaced: its buffer is free again
+                    self._recycle(self._latest[0])
+                self._latest = (frame, t)
+                self._seq += 1
+                self._cond.notify_all()
+
+    def _readahead_loop(self):
+        while self._running:
+            ok, frame, t = self._next(self._spare())
+            if not ok:
+                break
+            while self._running:
+                try:
+                    self._queue.put((frame, t), timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+        self._queue.put(None)
+
+class CaptureSource(FrameSource):
+    """cv2.VideoCapture input: video file or network stream URL."""
+    def __init__(self, path, threaded, buffer, live, reuse=False):
+        super().__init__(str(path), threaded, buffer, reuse)
+        self.live = live
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open {path}")
+        self.info.update({
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+            'fourcc': fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            'frames': int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) if not live else None,
+        })
+
+    def _next(self, dst=None):
+        ok, frame = self.cap.read(dst) if dst is not None else self.cap.read()
+        return ok, frame, time.time()
+
+    def _grab_only(self):
+        self.cap.grab()
+
+    def _close(self):
+        self.cap.release()
+
+class CameraSource(CaptureSource):
+    """
+    Live camera with format negotiation:
+        FOURCC (MJPG by default: many USB cameras fall back to raw YUYV at a few FPS at 1080p),
+        resolution and FPS are requested, then VERIFIED from the driver properties AND the
+        frames actually delivered (delivered FPS is measured over the warm-up frames).
+    t_capture is taken when grab() returns, i.e. when the driver delivers the frame.
+    """
+    live = True
+
+    def __init__(self, index, width, height, fps, fourcc, threaded, warmup, reuse=False):
+        FrameSource.__init__(self, f"camera:{index}", threaded, 1, reuse)
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise IOError(f"Camera {index} not found")
+
+        # Order matters on V4L2/DirectShow: pixel format first, then size, then rate
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+        # Verify with real frames: the first ones are often black/slow while auto-exposure settles
+        frame, stamps = None, []
+        for _ in range(max(2, warmup)):
+            ok, img = self.cap.read()
+            if ok:
+                frame = img
+                stamps.append(time.time())
+        if frame is None:
+            self.cap.release()
+            raise IOError(f"Camera {index} delivered no frames")
+
+        self.info.update({
+            'width': frame.shape[1],
+            'height': frame.shape[0],
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+            'measured_fps': (len(stamps) - 1) / (stamps[-1] - stamps[0]) if len(stamps) > 2 and stamps[-1] > stamps[0] else None,
+            'fourcc': fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            'backend': self.cap.getBackendName(),
+        })
+
+        got, want = self.info, {'fourcc': fourcc, 'width': width, 'height': height}
+        mismatch = [k for k, v in want.items() if v and got[k] != v]
+        if fps and got['measured_fps'] and got['measured_fps'] < 0.8 * fps:
+            mismatch.append('fps')
+        if mismatch:
+            print(f"[WARN] Camera {index}: requested {width}x{height} {fourcc} @{fps}, "
+                  f"got {got['width']}x{got['height']} {got['fourcc']} @{got['fps']:.0f} "
+                  f"(measured {got['measured_fps'] or 0:.1f} FPS). Mismatch: {', '.join(mismatch)}")
+
+    def _next(self, dst=None):
+        if not self.cap.grab():
+            return False, None, None
+        t_capture = time.time()
+        ok, frame = self.cap.retrieve(dst) if dst is not None else self.cap.retrieve()
+        return ok, frame, t_capture
+
+class ImageDirSource(FrameSource):
+    """Sorted still images from a directory, as a frame sequence."""
+    def __init__(self, path, threaded, buffer, fps, reuse=False):
+        super().__init__(path, threaded, buffer, reuse)
+        self.files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise IOError(f"No images in {path}")
+        self.index = 0
+        first = cv2.imread(self.files[0])
+        if first is None:
+            raise IOError(f"Could not read {self.files[0]}")
+        self.info.update({'width': first.shape[1], 'height': first.shape[0], 'fps': fps, 'fourcc': "IMG", 'frames': len(self.files)})
+
+    def _next(self, dst=None):
+        while self.index < len(self.files):
+            frame = cv2.imread(self.files[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, frame, time.time()
+            print(f"[WARN] Skipping unreadable image {self.files[self.index - 1]}")
+        return False, None, None
+
+def open_source(spec=None, width=None, height=None, fps=None, fourcc=None, threaded=None, warmup=None, reuse=None):
+    """
+    Open any frame input behind the FrameSource interface and start it:
+        0, "1"            Camera index (negotiated: FOURCC / size / FPS from CAMERA)
+        "rtsp://..."      Network stream (live: newest frame wins)
+        "clip.mp4"        Video file (every frame, in order)
+        "frames/"         Image directory (sorted file names)
+    reuse: recycle frame buffers (frames are only valid until the next read()).
+    Raises IOError when the source cannot be opened.
+    """
+    spec = CAMERA['SOURCE'] if spec is None else spec
+    threaded = CAMERA['THREADED'] if threaded is None else threaded
+    reuse = CAMERA['REUSE_BUFFERS'] if reuse is None else reuse
+    buffer = CAMERA['READ_AHEAD']
+
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        source = CameraSource(int(spec), width or CAMERA['WIDTH'], height or CAMERA['HEIGHT'], fps or CAMERA['FPS'],
+                              CAMERA['FOURCC'] if fourcc is None else fourcc, threaded,
+                              CAMERA['WARMUP_FRAMES'] if warmup is None else warmup, reuse)
+    elif spec.lower().startswith(STREAM_PREFIXES):
+        source = CaptureSource(spec, threaded, buffer, live=True, reuse=reuse)
+    elif os.path.isdir(spec):
+        source = ImageDirSource(spec, threaded, buffer, fps or CAMERA['FPS'], reuse)
+    elif os.path.isfile(spec):
+        source = CaptureSource(spec, threaded, buffer, live=False, reuse=reuse)
+    else:
+        raise IOError(f"Unknown frame source: {spec}")
+
+    i = source.info
+    print(f"[CAMERA] {i['kind']} {i['source']}: {i['width']}x{i['height']} {i.get('fourcc', '?')} @{i.get('fps') or 0:.0f} FPS"
+          + (" (threaded decode)" if threaded else ""))
+    return source.start()
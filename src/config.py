@@ -23,3 +23,151 @@ AIM_MODES = {
 # Calibration: Pixels per Degree
 # Assuming approx 60 deg FOV for 1920 width => ~32 px/deg
 PIXELS_PER_DEGREE = 32.0
+
+# Frame Source (src/camera.py; main.py --source)
+CAMERA = {
+    'SOURCE': 0,            # Camera index, video file, image directory or stream URL (rtsp://, http://)
+    'WIDTH': 1920,          # Requested camera mode; what the driver delivers is verified and logged
+    'HEIGHT': 1080,
+    'FPS': 30,
+    'FOURCC': "MJPG",       # Compressed mode: uncompressed YUYV at 1080p often runs at ~5 FPS over USB
+    'WARMUP_FRAMES': 10,    # Frames read at open: auto-exposure settling + delivered FPS measurement
+    'THREADED': True,       # Decode on a background thread
+    'READ_AHEAD': 4,        # Files / image directories: frames decoded ahead (never dropped)
+    'REUSE_BUFFERS': True   # Decode into recycled frame buffers (a frame is valid until the next read())
+}
+
+# Identity Job Queue (Background face encoding)
+IDENTITY_QUEUE = {
+    'MAX_DEPTH': 8,           # Max queued jobs; least urgent/oldest is dropped when full
+    'NUM_WORKERS': 1,         # Encoding threads (dlib releases the GIL)
+    'RECHECK_INTERVAL': 1.0   # Seconds between re-verifications of a known track
+}
+
+# Short-Gap Re-Linking (src/relink.py: new tracker id -> recently lost track, no encode)
+RELINK = {
+    'ENABLED': False,           # Off: most re-links in crowds are wrong (bench/relink_*.json, bench_trackers.py --relink)
+    'MAX_GAP': 2.0,             # Seconds a lost track can be re-linked
+    'RETRY_WINDOW': 0.3,        # Seconds a new track keeps trying (its first frames are often partial)
+    'MAX_DIST': 1.0,            # Predicted position error allowed, in box heights
+    'MAX_SIZE_RATIO': 1.4,      # Box height change allowed
+    'MIN_APPEARANCE': 0.6,      # Torso histogram similarity (1 - Bhattacharyya distance)
+    'MAX_OCCLUSION': 0.1,       # Torso share hidden by a person in front above which no signature is taken
+    'MIN_SCORE': 0.45,          # Appearance - position/size/gap penalties
+    'MARGIN': 0.1,              # Best candidate must beat the runner-up by this much
+    'WEIGHTS': {'position': 0.3, 'size': 0.2, 'gap': 0.15},
+    'SIGNATURE_INTERVAL': 0.5,  # Seconds between torso histogram refreshes per track
+    'HIST_BINS': (16, 8),       # Hue x saturation
+    'VERIFY_ATTEMPTS': 3,       # Verification encodes without a face before an inherited PID is dropped
+    'VERIFY_TIMEOUT': 5.0       # Seconds an inherited PID may stay unverified
+}
+
+# Face Quality Gating (Cheap scoring before dlib encoding)
+FACE_QUALITY = {
+    'MIN_EYE_DIST': 10,           # Pixels between eyes below which a face is too small
+    'GOOD_EYE_DIST': 35,          # Pixels between eyes for full size score
+    'MAX_NOSE_OFFSET': 0.5,       # Nose offset (in eye distances) that counts as full profile
+    'PATCH_SIZE': 48,             # Grayscale patch size for sharpness/exposure
+    'GOOD_SHARPNESS': 150.0,      # Laplacian variance for full sharpness score
+    'CROP_MARGIN': 2.0,           # Face crop half-size in eye distances
+    'NO_EYES_PRIOR': 0.65,        # Size and frontal score of a box-top crop without eye keypoints (0.65^2 < GOOD_SCORE)
+    'MIN_SCORE': 0.15,            # Never encode below this
+    'GOOD_SCORE': 0.45,           # Encode immediately at/above this
+    'CANDIDATE_WINDOW': 0.3,      # Seconds to collect candidates before encoding the best one
+    'CANDIDATE_TTL': 1.0,         # Seconds after which a kept candidate is too old to use
+    'GALLERY_SIZE': 5,            # Max samples per identity
+    'GALLERY_MIN_DIVERSITY': 0.15 # Encoding distance below which two samples are duplicates
+}
+
+# Identity Store (Written by enroll.py, loaded by IdentityManager as Trusted Identities)
+IDENTITY_STORE_PATH = "identities.npz"
+
+# Offline Enrollment (enroll.py)
+ENROLLMENT = {
+    'SAMPLES_PER_PERSON': 12, # Max diverse samples kept per identity
+    'FRAME_STRIDE': 5,        # Use every N-th video frame
+    'CHUNK_FRAMES': 300,      # Video frames per work item (parallelism unit)
+    'IMAGES_PER_ITEM': 8,     # Photos per work item
+    'MAX_IMAGE_WIDTH': 1280,  # Downscale larger inputs before detection
+    'MIN_QUALITY': 0.2,       # Skip samples below this face quality score
+    'MAX_MEDOID_DIST': 0.65   # Drop samples farther than this from the medoid (live match tolerance): bystanders, misdetections
+}
+
+# HUD Recorder (Out-of-process, shared-memory ring)
+RECORDER = {
+    'OUT_DIR': "recordings",
+    'WIDTH': 1280,                # Output resolution (None = camera resolution)
+    'HEIGHT': 720,
+    'DECIMATION': 2,              # Record every N-th rendered frame
+    'FPS': 15,                    # Fallback output frame rate when the source reports none (else source FPS / DECIMATION)
+    'SEGMENT_SECONDS': 300,       # New file every N seconds (continuous mode)
+    'PRE_TRIGGER_SECONDS': 0,     # >0: only keep the last N seconds in memory until triggered
+    'POST_TRIGGER_SECONDS': 5,    # Seconds recorded after a trigger (pre-trigger mode)
+    'SLOTS': 8,                   # Shared-memory ring size; frames are dropped when full
+    'CODEC': "mp4v",
+    'JPEG_QUALITY': 80            # Pre-trigger in-memory compression
+}
+
+# Multi-Process Pipeline (main.py --pipeline)
+PIPELINE = {
+    'CAMERA': 0,
+    'WIDTH': 1920,                       # Frame slot size; other camera sizes are resized into it
+    'HEIGHT': 1080,
+    'SLOTS': 6,                          # Frames in flight; capture drops frames when all are busy
+    'MODEL': "yolo11n-pose.pt",
+    'FACE_MODEL': "face_landmarker.task",
+    'TRACKER': "builtin"                 # See TRACKING['BACKEND']
+}
+
+# Headless Service (main.py --headless)
+SERVICE = {
+    'HOST': "127.0.0.1",   # Localhost only
+    'PORT': 8080,
+    'MAX_FPS': 10,         # MJPEG stream rate limit
+    'WIDTH': 960,          # Stream width (downscaled, aspect preserved)
+    'JPEG_QUALITY': 70
+}
+
+# On-Demand Profiling ('p' key / 'profile' command)
+PROFILER = {
+    'FRAMES': 300,            # Frames captured per request
+    'INTERVAL': 0.005,        # Stack sampling period (seconds)
+    'TRACEBACK_DEPTH': 10,    # tracemalloc frames kept per allocation
+    'TOP_ALLOCATIONS': 30,    # Lines in the allocation report
+    'OUT_DIR': "profiles"
+}
+
+# Tracker Backends (main.py --tracker, bench_trackers.py)
+TRACKING = {
+    'BACKEND': "builtin",   # builtin = model.track + bytetrack.yaml; bytetrack | botsort | iou = model.predict + src/trackers.py
+    'DETECT_CONF': 0.1,     # Detector threshold when tracking outside model.track (same as ultralytics track mode)
+    'FRAME_RATE': 30,       # ByteTrack/BoT-SORT: scales track_buffer
+    'IOU_THRESH': 0.3,      # IoU tracker: min overlap to continue a track
+    'MAX_AGE': 30,          # IoU tracker: frames a lost track is kept
+    'MIN_CONF': 0.25        # IoU tracker: detections below are ignored
+}
+
+# Frame Tracing ('t' key / 'trace' command exports the window)
+TRACING = {
+    'WINDOW_FRAMES': 600,                                 # Rolling window of frames / identity jobs kept
+    'HISTOGRAM_MS': (0, 25, 50, 75, 100, 150, 200, 300),  # Capture-to-actuation latency bins on the HUD
+    'OUT_DIR': "traces"
+}
+
+# Motion-Gated Inference (static scene + no tracks -> heavy stages at keep-alive rate)
+MOTION_GATE = {
+    'ENABLED': True,          # main.py --no-motion-gate disables
+    'THUMB_WIDTH': 240,       # Grayscale thumbnail width for frame differencing
+    'BG_ALPHA': 0.05,         # Running background learning rate
+    'PIXEL_DIFF': 18,         # Gray-level change for a thumbnail pixel to count as moving
+    'WAKE_AREA': 0.003,       # Moving-pixel share that wakes the system immediately
+    'STILL_AREA': 0.001,      # Moving-pixel share below which the scene counts as static (hysteresis)
+    'IDLE_AFTER': 3.0,        # Seconds of static scene with no tracks before going idle
+    'KEEPALIVE': 1.0          # While idle: run the heavy stages once every N seconds anyway
+}
+
+# Concurrent Frame Stages (src/stages.py: pose inference and face landmarking overlap)
+STAGES = {
+    'WORKERS': None   # Threads running a frame's independent stages. None = 2 on multi-core machines, 0 on one core
+                      # (0 = serial on the calling thread; main.py --serial-stages)
+}
@@ -0,0 +1,58 @@
+from .config import AIM_MODES
+
+# Keyboard -> Command
+KEY_COMMANDS = {
+    ord('q'): 'quit',
+    ord('1'): 'aim 1',
+    ord('2'): 'aim 2',
+    ord('3'): 'aim 3',
+    ord('m'): 'manual',
+    9: 'next',          # TAB Key (ASCII 9)
+    ord('v'): 'event',  # Save recording event
+    ord('p'): 'profile', # Capture a profile of the next frames
+    ord('t'): 'trace',   # Export the frame trace window (Chrome trace JSON)
+}
+
+def key_to_command(key):
+    """Map a cv2.waitKey code to a command string (or None)."""
+    return KEY_COMMANDS.get(key)
+
+def apply_command(cmd, manager, targets, aim_mode):
+    """
+    Apply a targeting command to the TargetManager.
+    Commands: 'aim N', 'manual', 'next'. Others are ignored here (handled by the caller).
+    Returns the (possibly new) aim mode.
+    """
+    if cmd.startswith('aim '):
+        try:
+            mode = int(cmd.split()[1])
+        except ValueError:
+            return aim_mode
+        return mode if mode in AIM_MODES else aim_mode
+
+    if cmd == 'manual':
+        manager.manual_mode = not manager.manual_mode
+        print(f"[SYSTEM] Manual Mode: {manager.manual_mode}")
+        # If switching to Manual, lock onto current primary (if any)
+        if manager.manual_mode and manager.primary_target:
+            manager.selected_id = manager.primary_target['id']
+        elif not manager.manual_mode:
+            manager.selected_id = None
+
+    elif cmd == 'next':
+        if manager.manual_mode and len(targets) > 0:
+            # Cycle ID
+            # Get list of IDs
+            ids = sorted([t['id'] for t in targets])
+
+            if manager.selected_id in ids:
+                idx = ids.index(manager.selected_id)
+                next_idx = (idx + 1) % len(ids)
+                manager.selected_id = ids[next_idx]
+            else:
+                # If current selected is lost, pick first
+                manager.selected_id = ids[0]
+
+            print(f"[SYSTEM] Switched Target -> {manager.selected_id} (Available: {ids})")
+
+    return aim_mode
@@ -0,0 +1,43 @@
+import numpy as np
+
+class Detections:
+    """
+    Backend-independent detections for one frame, as plain numpy arrays.
+    Picklable (pipeline messages) and converted from torch ONCE per frame.
+        xyxy:      (N, 4) float32 boxes
+        conf:      (N,) float32 scores
+        cls:       (N,) int class ids
+        ids:       (N,) int track ids, or None when not tracked yet
+        keypoints: (N, 17, 2) float32 pose keypoints, or None
+    """
+    def __init__(self, xyxy, conf, cls, ids=None, keypoints=None):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.ids = ids
+        self.keypoints = keypoints
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Convert an ultralytics Results object (boxes + optional keypoints).
+        """
+        boxes = results.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+
+        ids = boxes.id.cpu().numpy().astype(int) if boxes.id is not None else None
+        kps = results.keypoints.xy.cpu().numpy() if results.keypoints is not None else None
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(int),
+            ids,
+            kps)
+
+    def __len__(self):
+        return len(self.xyxy)
@@ -0,0 +1,168 @@
+import os
+import cv2
+import numpy as np
+import face_recognition
+from .config import ENROLLMENT, FACE_QUALITY
+from .face_quality import score_face_quality
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+
+def plan_work_items(person, paths, frame_stride=None, chunk_frames=None):
+    """
+    Split one person's media into independent work items for the process pool.
+    - Image folders / files: batches of ENROLLMENT['IMAGES_PER_ITEM'] images.
+    - Videos: ranges of chunk_frames frames (each worker seeks to its own start).
+    Returns list of dicts: {'person', 'kind', 'path'/'files', 'start', 'end', 'stride'}
+    """
+    frame_stride = frame_stride or ENROLLMENT['FRAME_STRIDE']
+    chunk_frames = chunk_frames or ENROLLMENT['CHUNK_FRAMES']
+    items = []
+    images = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if name.lower().endswith(IMAGE_EXTS):
+                    images.append(full)
+                elif name.lower().endswith(VIDEO_EXTS):
+                    items.extend(_plan_video(person, full, frame_stride, chunk_frames))
+        elif path.lower().endswith(IMAGE_EXTS):
+            images.append(path)
+        elif path.lower().endswith(VIDEO_EXTS):
+            items.extend(_plan_video(person, path, frame_stride, chunk_frames))
+        else:
+            print(f"[ENROLL] Skipping unsupported input: {path}")
+
+    batch = ENROLLMENT['IMAGES_PER_ITEM']
+    for i in range(0, len(images), batch):
+        items.append({'person': person, 'kind': 'images', 'files': images[i:i + batch]})
+    return items
+
+def _plan_video(person, path, frame_stride, chunk_frames):
+    cap = cv2.VideoCapture(path)
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if n_frames <= 0:
+        # Unknown length (some containers): one item reads the whole clip
+        return [{'person': person, 'kind': 'video', 'path': path, 'start': 0, 'end': None, 'stride': frame_stride}]
+    return [
+        {'person': person, 'kind': 'video', 'path': path, 'start': s, 'end': min(s + chunk_frames, n_frames), 'stride': frame_stride}
+        for s in range(0, n_frames, chunk_frames)
+    ]
+
+def _iter_item_frames(item):
+    if item['kind'] == 'images':
+        for path in item['files']:
+            img = cv2.imread(path)
+            if img is not None:
+                yield path, img
+        return
+
+    cap = cv2.VideoCapture(item['path'])
+    if item['start']:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, item['start'])
+    idx = item['start']
+    while item['end'] is None or idx < item['end']:
+        # grab() skips decoding work for frames we do not sample
+        if (idx - item['start']) % item['stride'] == 0:
+            ret, frame = cap.read()
+            if not ret: break
+            yield f"{item['path']}#{idx}", frame
+        elif not cap.grab():
+            break
+        idx += 1
+    cap.release()
+
+def _landmarks_to_keypoints(landmarks):
+    """
+    Map face_recognition 5-point landmarks to COCO face keypoints (0=Nose, 1/2=Eyes)
+    so the same quality scorer as the live pipeline can be used.
+    """
+    kps = np.zeros((17, 2), dtype=np.float32)
+    kps[0] = np.mean(landmarks['nose_tip'], axis=0)
+    kps[1] = np.mean(landmarks['left_eye'], axis=0)
+    kps[2] = np.mean(landmarks['right_eye'], axis=0)
+    return kps
+
+def process_work_item(item):
+    """
+    Process-pool worker: decode, detect the (largest) face, score and encode.
+    Returns {'person', 'frames', 'faces', 'samples': [(encoding, quality, source)]}
+    """
+    out = {'person': item['person'], 'frames': 0, 'faces': 0, 'samples': []}
+    max_w = ENROLLMENT['MAX_IMAGE_WIDTH']
+
+    for source, frame in _iter_item_frames(item):
+        out['frames'] += 1
+        h, w = frame.shape[:2]
+        if w > max_w:
+            frame = cv2.resize(frame, (max_w, int(h * max_w / w)), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        locations = face_recognition.face_locations(rgb)
+        if not locations:
+            continue
+        # Enrollment media shows one subject; ignore bystanders
+        top, right, bottom, left = max(locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+        out['faces'] += 1
+
+        landmarks = face_recognition.face_landmarks(rgb, [(top, right, bottom, left)], model='small')
+        if not landmarks:
+            continue
+        kps = _landmarks_to_keypoints(landmarks[0])
+        quality = score_face_quality(frame, (left, top, right, bottom), kps)['score']
+        if quality < ENROLLMENT['MIN_QUALITY']:
+            continue
+
+        encodings = face_recognition.face_encodings(rgb, [(top, right, bottom, left)])
+        if encodings:
+            out['samples'].append((encodings[0], quality, source))
+    return out
+
+def reject_outliers(samples, max_dist=None):
+    """
+    Drop samples whose encoding is farther than max_dist from the medoid of the set
+    (the sample with the smallest total distance to all others). Farthest-point selection
+    would otherwise prefer exactly these: a bystander's face, a misdetection, a bad crop.
+    samples: list of (encoding, quality, source). Returns the inliers, in order.
+    """
+    max_dist = max_dist if max_dist is not None else ENROLLMENT['MAX_MEDOID_DIST']
+    if len(samples) < 3:
+        return list(samples) # No majority to tell the subject from an outlier
+    encs = np.array([s[0] for s in samples], dtype=np.float64)
+    sq = np.einsum('ij,ij->i', encs, encs)
+    dist = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2.0 * encs @ encs.T, 0.0))
+    medoid = int(np.argmin(dist.sum(axis=1)))
+    return [s for s, d in zip(samples, dist[medoid]) if d <= max_dist]
+
+def select_diverse_samples(samples, k=None, min_diversity=None, max_dist=None):
+    """
+    Greedy selection of the best, most diverse samples.
+    Outliers are dropped first (reject_outliers). Then starts from the highest quality sample
+    and repeatedly adds the sample that is farthest (in encoding space) from the ones already
+    kept, weighted by quality.
+    Near-duplicates (distance < min_diversity) are never kept twice.
+    samples: list of (encoding, quality, source). Returns the kept subset.
+    """
+    k = k or ENROLLMENT['SAMPLES_PER_PERSON']
+    min_diversity = min_diversity if min_diversity is not None else FACE_QUALITY['GALLERY_MIN_DIVERSITY']
+    samples = reject_outliers(samples, max_dist)
+    if not samples:
+        return []
+
+    encs = np.array([s[0] for s in samples])
+    quals = np.array([s[1] for s in samples])
+
+    kept = [int(np.argmax(quals))]
+    min_dist = np.linalg.norm(encs - encs[kept[0]], axis=1)
+    while len(kept) < k:
+        gain = np.where(min_dist >= min_diversity, min_dist * (0.5 + 0.5 * quals), -1.0)
+        gain[kept] = -1.0
+        best = int(np.argmax(gain))
+        if gain[best] < 0:
+            break
+        kept.append(best)
+        min_dist = np.minimum(min_dist, np.linalg.norm(encs - encs[best], axis=1))
+    return [samples[i] for i in kept]
@@ -0,0 +1,34 @@
+import numpy as np
+
+def create_face_landmarker(model_path='face_landmarker.task', num_faces=5):
+    """
+    Initialize MediaPipe Tasks API (New Face Landmarker) in VIDEO mode.
+    """
+    from mediapipe.tasks import python
+    from mediapipe.tasks.python import vision
+
+    # Create options
+    base_options = python.BaseOptions(model_asset_path=model_path)
+    options = vision.FaceLandmarkerOptions(
+        base_options=base_options,
+        output_face_blendshapes=True, # Optional: For detailed expressions
+        output_facial_transformation_matrixes=True,
+        num_faces=num_faces, # Track up to 5 faces simultaneously
+        min_face_detection_confidence=0.5,
+        min_face_presence_confidence=0.5,
+        min_tracking_confidence=0.5,
+        running_mode=vision.RunningMode.VIDEO)
+
+    # Create Landmarker
+    return vision.FaceLandmarker.create_from_options(options)
+
+def detect_face_landmarks(landmarker, rgb_frame, ts_ms):
+    """
+    Run the landmarker on an RGB frame. ts_ms must increase monotonically.
+    Returns list of (478, 2) arrays of normalized (x, y) landmarks, one per face.
+    """
+    import mediapipe as mp
+
+    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+    result = landmarker.detect_for_video(mp_image, ts_ms)
+    return [np.array([(lm.x, lm.y) for lm in face], dtype=np.float32) for face in result.face_landmarks]
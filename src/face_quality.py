@@ -0,0 +1,107 @@
+import threading
+import cv2
+import numpy as np
+from .config import FACE_QUALITY
+
+# COCO face keypoints
+NOSE, L_EYE, R_EYE, L_EAR, R_EAR = 0, 1, 2, 3, 4
+
+# Per-thread scratch patches for the pixel checks (fixed size, reused for every face)
+_scratch = threading.local()
+
+def _patch_buffers(s):
+    bufs = getattr(_scratch, 'bufs', None)
+    if bufs is None or bufs['gray'].shape != (s, s):
+        bufs = _scratch.bufs = {
+            'patch': np.empty((s, s, 3), np.uint8),
+            'gray': np.empty((s, s), np.uint8),
+            'lap': np.empty((s, s), np.int16),
+            'mask': np.empty((s, s), np.uint8),
+        }
+    return bufs
+
+def _valid(kps, idx):
+    return kps is not None and kps.shape[0] > idx and kps[idx][0] != 0 and kps[idx][1] != 0
+
+def face_region(kps, box, frame_shape):
+    """
+    Estimate the face rectangle from pose keypoints (eyes/nose).
+    Falls back to the top of the person box when the eyes are not visible.
+    Returns (x1, y1, x2, y2, eye_dist). eye_dist is 0 for the fallback.
+    """
+    H, W = frame_shape[:2]
+    bx1, by1, bx2, by2 = map(int, box)
+
+    if _valid(kps, L_EYE) and _valid(kps, R_EYE):
+        mid_x = (kps[L_EYE][0] + kps[R_EYE][0]) / 2
+        mid_y = (kps[L_EYE][1] + kps[R_EYE][1]) / 2
+        eye_dist = float(np.hypot(kps[L_EYE][0] - kps[R_EYE][0], kps[L_EYE][1] - kps[R_EYE][1]))
+        # Generous margin: dlib needs forehead + chin inside the crop
+        half = max(eye_dist, 8.0) * FACE_QUALITY['CROP_MARGIN']
+        x1, x2 = mid_x - half, mid_x + half
+        y1, y2 = mid_y - half * 0.9, mid_y + half * 1.1
+    else:
+        # Fallback: square on top of the person box
+        eye_dist = 0.0
+        w = bx2 - bx1
+        x1, x2 = bx1, bx2
+        y1, y2 = by1, by1 + w
+
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(W, int(x2)), min(H, int(y2))
+    return x1, y1, x2, y2, eye_dist
+
+def score_face_quality(frame, box, kps):
+    """
+    Cheap (main-thread, microseconds) estimate of how worth encoding a face crop is.
+    Components (each 0..1):
+        - size:     Inter-ocular distance in pixels.
+        - frontal:  Nose centered between the eyes (profile faces score low).
+        - sharp:    Laplacian variance of a small grayscale face patch (motion blur).
+        - exposure: Mean brightness near mid-grey, few clipped pixels (backlight).
+    Without eye keypoints (or kps=None) the top of the box is scored with a fixed size/frontal
+    prior: a sharp, well-exposed crop passes MIN_SCORE but never reaches GOOD_SCORE, so it is
+    encoded only when no better candidate shows up within the candidate window.
+    Returns dict with 'score' (product of components), components and 'region'.
+    """
+    x1, y1, x2, y2, eye_dist = face_region(kps, box, frame.shape)
+    q = {'score': 0.0, 'size': 0.0, 'frontal': 0.0, 'sharp': 0.0, 'exposure': 0.0, 'region': (x1, y1, x2, y2)}
+
+    if (x2 - x1) < 8 or (y2 - y1) < 8:
+        return q
+
+    # 1. Size (from keypoints, no pixels touched)
+    if eye_dist > 0:
+        min_d, good_d = FACE_QUALITY['MIN_EYE_DIST'], FACE_QUALITY['GOOD_EYE_DIST']
+        q['size'] = float(np.clip((eye_dist - min_d) / (good_d - min_d), 0.0, 1.0))
+    else:
+        q['size'] = FACE_QUALITY['NO_EYES_PRIOR'] # Unknown scale (no eyes / no keypoints): the box-top crop
+
+    # 2. Frontalness (nose offset from eye midpoint, relative to eye distance)
+    if eye_dist > 0 and _valid(kps, NOSE):
+        mid_x = (kps[L_EYE][0] + kps[R_EYE][0]) / 2
+        offset = abs(kps[NOSE][0] - mid_x) / eye_dist
+        q['frontal'] = float(np.clip(1.0 - offset / FACE_QUALITY['MAX_NOSE_OFFSET'], 0.0, 1.0))
+    elif eye_dist > 0:
+        q['frontal'] = 0.5
+    else:
+        q['frontal'] = FACE_QUALITY['NO_EYES_PRIOR']
+
+    if q['size'] == 0.0 or q['frontal'] == 0.0:
+        return q # Skip pixel work for hopeless crops
+
+    # 3 + 4. Sharpness & Exposure on a tiny grayscale patch
+    s = FACE_QUALITY['PATCH_SIZE']
+    bufs = _patch_buffers(s)
+    patch = cv2.resize(frame[y1:y2, x1:x2], (s, s), dst=bufs['patch'], interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY, dst=bufs['gray'])
+
+    _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S, dst=bufs['lap']))
+    q['sharp'] = float(np.clip(lap_std[0, 0] ** 2 / FACE_QUALITY['GOOD_SHARPNESS'], 0.0, 1.0))
+
+    mean = cv2.mean(gray)[0]
+    clipped = 1.0 - cv2.countNonZero(cv2.inRange(gray, 10, 245, dst=bufs['mask'])) / gray.size
+    q['exposure'] = float(np.clip((1.0 - ((mean - 128.0) / 128.0) ** 2) * (1.0 - clipped), 0.0, 1.0))
+
+    q['score'] = q['size'] * q['frontal'] * q['sharp'] * q['exposure']
+    return q
@@ -0,0 +1,91 @@
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+class FrameBus:
+    """
+    Zero-copy frame transport between processes.
+    A shared-memory ring of fixed-size BGR frame slots plus a free-slot queue.
+    Stages only pass small metadata messages ({'frame_id', 'slot', ...}); the pixels stay
+    in shared memory. The producer acquire()s a slot, the LAST consumer release()s it.
+    Create in the parent process, pass to stage processes as a Process argument.
+    """
+    def __init__(self, mp_ctx, slots, height, width):
+        self.slots = slots
+        self.shape = (slots, height, width, 3)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+        self.free_q = mp_ctx.Queue()
+        for i in range(slots):
+            self.free_q.put(i)
+        self._owner = True
+        self._attach()
+
+    def _attach(self):
+        self.frames = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def __getstate__(self):
+        # Only the shm name/queue travel to the child; the array view is rebuilt there
+        return {'slots': self.slots, 'shape': self.shape, 'name': self.shm.name, 'free_q': self.free_q}
+
+    def __setstate__(self, state):
+        self.slots = state['slots']
+        self.shape = state['shape']
+        self.free_q = state['free_q']
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._attach()
+
+    def view(self, slot):
+        """Frame slot as a numpy view (no copy)."""
+        return self.frames[slot]
+
+    def acquire(self, timeout=None):
+        """Get a free slot index, or None if none is free (caller should drop the frame)."""
+        try:
+            if timeout is None:
+                return self.free_q.get_nowait()
+            return self.free_q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, slot):
+        self.free_q.put(slot)
+
+    def detach(self):
+        """Stage exit: never block process shutdown on unconsumed free-slot messages."""
+        self.free_q.cancel_join_thread()
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+class StageQueue:
+    """
+    Metadata queue between two stages with a shared occupancy counter
+    (multiprocessing.Queue.qsize() is not available on macOS).
+    """
+    def __init__(self, mp_ctx):
+        self.q = mp_ctx.Queue()
+        self.count = mp_ctx.Value('i', 0)
+
+    def put(self, item):
+        with self.count.get_lock():
+            self.count.value += 1
+        self.q.put(item)
+
+    def get(self, timeout=None):
+        """Raises queue.Empty on timeout."""
+        item = self.q.get(timeout=timeout)
+        with self.count.get_lock():
+            self.count.value -= 1
+        return item
+
+    def detach(self):
+        """Stage exit: never block process shutdown on unconsumed messages."""
+        self.q.cancel_join_thread()
+
+    def __len__(self):
+        return self.count.value
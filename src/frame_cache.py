@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+
+class FrameContext:
+    """
+    Per-frame preprocessing cache. Created ONCE per captured frame and passed to every consumer
+    (YOLO, MediaPipe, identity, motion checks) instead of the raw frame.
+    Derived views are produced lazily on first request and memoized:
+        - rgb():          Full-frame RGB (MediaPipe).
+        - thumb_gray(w):  Tiny grayscale thumbnail (one direct resize; motion gate).
+        - crop_rgb(box):  Downscaled RGB crop, safe to hand to worker threads (identity).
+    conversions / bytes_copied count the work actually done for this frame.
+    crop_bytes: bytes of the crops handed out by crop_rgb() (identity crops, owned by the workers).
+    t_capture / trace: capture time and optional FrameTrace (src/tracing.py) of this frame.
+    buffers: optional FrameBuffers shared by consecutive frames. Full-frame views are then written
+    into reused buffers (no per-frame allocation) and are only valid until the next frame's context
+    recomputes them. crop_rgb() always returns a fresh array (it is handed to worker threads).
+    NOTE: Cached views reflect the frame as captured. Request them before drawing the HUD.
+    """
+    def __init__(self, frame, frame_id=0, t_capture=None, trace=None, buffers=None):
+        self.frame = frame
+        self.frame_id = frame_id
+        self.t_capture = t_capture
+        self.trace = trace
+        self.buffers = buffers
+        self.H, self.W = frame.shape[:2]
+
+        self._rgb = None
+        self._thumb = {}
+        self._crop_rgb = {}
+
+        # Per-frame counters
+        self.conversions = 0
+        self.bytes_copied = 0
+        self.crop_bytes = 0
+
+    def _count(self, arr):
+        self.conversions += 1
+        self.bytes_copied += arr.nbytes
+        return arr
+
+    def _out(self, key, shape):
+        """Destination buffer for a view (None: let OpenCV allocate a fresh one)."""
+        return self.buffers.get(key, shape) if self.buffers is not None else None
+
+    def rgb(self):
+        if self._rgb is None:
+            dst = self._out('rgb', (self.H, self.W, 3))
+            self._rgb = self._count(cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB, dst=dst))
+        return self._rgb
+
+    def thumb_gray(self, width=240):
+        """
+        Grayscale thumbnail `width` pixels wide. A single INTER_LINEAR resize (~25x cheaper than
+        three pyrDown levels at 1080p); aliasing is acceptable for frame differencing.
+        """
+        if width not in self._thumb:
+            h = max(1, self.H * width // self.W)
+            small = cv2.resize(self.frame, (width, h), dst=self._out(('thumb_bgr', width), (h, width, 3)),
+                               interpolation=cv2.INTER_LINEAR)
+            self.conversions += 1
+            dst = self._out(('thumb', width), (h, width))
+            self._thumb[width] = self._count(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=dst))
+        return self._thumb[width]
+
+    def clip_box(self, box):
+        x1, y1, x2, y2 = map(int, box)
+        return max(0, x1), max(0, y1), min(self.W, x2), min(self.H, y2)
+
+    def crop_rgb(self, box, max_width=200):
+        """
+        RGB crop, downscaled to max_width. The result is a fresh small array that
+        worker threads may keep (the resize/convert IS the copy).
+        """
+        key = (self.clip_box(box), max_width)
+        if key not in self._crop_rgb:
+            x1, y1, x2, y2 = key[0]
+            crop = self.frame[y1:y2, x1:x2]
+            h, w = crop.shape[:2]
+            if w > max_width:
+                crop = cv2.resize(crop, (max_width, max(1, int(h * max_width / w))), interpolation=cv2.INTER_AREA)
+                self.conversions += 1
+                rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=crop) # The resize is already a fresh array
+            else:
+                rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+            self._crop_rgb[key] = self._count(rgb)
+            self.crop_bytes += rgb.nbytes
+        return self._crop_rgb[key]
+
+class FrameBuffers:
+    """
+    Reusable destination buffers for FrameContext views, one per (view, shape).
+    Create ONE per frame source and pass it to every FrameContext: buffers are allocated on the
+    first frame at a given resolution and reused afterwards (steady state allocates nothing).
+    """
+    def __init__(self):
+        self._bufs = {}
+        self.allocations = 0
+
+    def get(self, key, shape, dtype=np.uint8):
+        buf = self._bufs.get(key)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._bufs[key] = np.empty(shape, dtype)
+            self.allocations += 1
+        return buf
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self._bufs.values())
+
+class PrepStats:
+    """
+    Rolling per-frame preprocessing cost (conversion count and bytes copied).
+    """
+    def __init__(self, alpha=0.05):
+        self.alpha = alpha
+        self.frames = 0
+        self.conversions = 0.0
+        self.bytes_copied = 0.0
+
+    def add(self, ctx):
+        if self.frames == 0:
+            self.conversions, self.bytes_copied = float(ctx.conversions), float(ctx.bytes_copied)
+        else:
+            a = self.alpha
+            self.conversions += a * (ctx.conversions - self.conversions)
+            self.bytes_copied += a * (ctx.bytes_copied - self.bytes_copied)
+        self.frames += 1
+
+    def summary(self):
+        return f"{self.conversions:.1f} conv {self.bytes_copied / 1e6:.2f}MB"
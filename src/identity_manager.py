@@ -1,18 +1,23 @@
 import face_recognition
 import numpy as np
-import cv2
 import time
-from concurrent.futures import ThreadPoolExecutor
+from .config import IDENTITY_QUEUE, FACE_QUALITY, IDENTITY_STORE_PATH, RELINK
+from .identity_scheduler import IdentityJobScheduler
+from .face_quality import score_face_quality
+from .identity_store import load_identity_store
+from .relink import TrackRelinker
 
 class IdentityManager:
     """
     Manages persistent identities using facial recognition with Asynchronous Processing.
     Ensures the main thread is NEVER blocked by face_recognition.
+    Encoding runs on a bounded priority queue (IdentityJobScheduler); all identity
+    state is only mutated on the main thread in apply_results().
     """
-    def __init__(self, match_tolerance=0.65):
+    def __init__(self, match_tolerance=0.65, store_path=IDENTITY_STORE_PATH):
         self.match_tolerance = match_tolerance
         
-        # Database: { 'PID-1': {'encodings': [np.array(...)], 'last_seen': ts} }
+        # Database: { 'PID-1': {'encodings': [np.array(...)], 'qualities': [0.7], 'last_seen': ts} }
         self.known_entities = {}
         
         # Trusted Identities: { 'COMMANDER': [encodings...] }
@@ -25,11 +30,38 @@ class IdentityManager:
         
         # Check Limiter: { yolo_id: last_check_time }
         self.last_check_time = {}
-        self.check_interval = 1.0 # Check every 1s per ID
+        self.check_interval = IDENTITY_QUEUE['RECHECK_INTERVAL'] # Check every 1s per ID
         
-        # Async Executor
-        self.executor = ThreadPoolExecutor(max_workers=1)
-        self.pending_tasks = set() # Track YOLO IDs currently being processed
+        # Async Job Queue (bounded, prioritized, one job per track)
+        self.scheduler = IdentityJobScheduler(
+            self._encode_face,
+            max_depth=IDENTITY_QUEUE['MAX_DEPTH'],
+            num_workers=IDENTITY_QUEUE['NUM_WORKERS'])
+        
+        # Best recent crop per track: { yolo_id: {'crop', 'quality', 'ts', 'first_ts', 'frame_id', 't_capture'} }
+        self.candidates = {}
+        
+        # Label provenance: { yolo_id: (source frame_id, source capture time) } of the applied result
+        self.label_source = {}
+        
+        # Optional callback(yolo_id, job_meta) for every applied result (e.g. Tracer.identity_job)
+        self.on_job_done = None
+        
+        # Short-gap re-linking: new tracker id -> recently lost track's PID without an encode
+        self.relinker = TrackRelinker() if RELINK['ENABLED'] else None
+        self.unverified = {} # { yolo_id: {'pid', 'ts', 'fails'} } until an encode confirms or corrects it
+        self.alive_ids = set()
+        
+        # Metrics
+        self.encode_calls = 0
+        self.quality_skips = 0
+        self.relinks_confirmed = 0
+        self.relinks_wrong = 0
+        self.relinks_dropped = 0
+        
+        # Enrolled identities (see enroll.py)
+        for name, entry in load_identity_store(store_path).items():
+            self.register_trusted_identity(name, entry['encodings'])
         
         print(f"[SYSTEM] AsyncIdentityManager Initialized (Tol={self.match_tolerance})")
         print("[SYSTEM] Deep Metric Learning Model: ResNet-34 (dlib) Active")
@@ -42,14 +74,23 @@ class IdentityManager:
         self.trusted_identities[name] = encodings
         print(f"[IDENTITY] Registered Trusted Identity: {name} ({len(encodings)} samples)")
 
-    def get_pid(self, frame, box, yolo_id):
+    def get_pid(self, ctx, box, yolo_id, keypoints=None, is_primary=False):
         """
         Non-blocking PID resolution.
+        ctx: FrameContext of the current frame (shared preprocessing cache).
         Returns:
             - Existing PID if known.
             - "Scanning..." if currently processing.
             - "Trk-ID" if unknown and waiting for slot.
         """
+        # 0. Re-link a newborn track to a recently lost one (cheap, no encode)
+        if self.relinker is not None:
+            now = time.time()
+            if yolo_id not in self.yolo_to_pid and self.relinker.is_young(yolo_id, now):
+                self._try_relink(ctx, box, yolo_id, keypoints, now)
+            pid = self.yolo_to_pid.get(yolo_id)
+            self.relinker.observe(ctx, yolo_id, box, keypoints, now, signature=pid is not None and not pid.startswith("Trk-"))
+
         # 1. Return cached result if available
         if yolo_id in self.yolo_to_pid:
             # Check if we need to re-verify (re-scan)
@@ -59,82 +100,228 @@ class IdentityManager:
             # Else: Proceed to schedule a re-check (fall through)
 
         # 2. Check if already being processed
-        if yolo_id in self.pending_tasks:
+        if self.scheduler.is_pending(yolo_id):
             # Return current best guess (or Scanning)
-            return self.yolo_to_pid.get(yolo_id, f"Scanning...")
+            return self.yolo_to_pid.get(yolo_id, "Scanning...")
 
-        # 3. Schedule Background Task
-        # Copy necessary data (Frame crop) to avoid race conditions with frame buffer
+        # 3. Quality Gate (cheap, main thread)
+        # Only crops worth a dlib encode are scheduled; keep the best recent one per track
         x1, y1, x2, y2 = map(int, box)
-        H, W = frame.shape[:2]
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(W, x2), min(H, y2)
         
         # Skip invalid boxes
         if (x2 - x1) < 20 or (y2 - y1) < 20:
              return self.yolo_to_pid.get(yolo_id, f"Trk-{yolo_id}")
-             
-        crop = frame[y1:y2, x1:x2].copy() # COPY is crucial for threads
         
-        self.pending_tasks.add(yolo_id)
-        self.executor.submit(self._process_face_bg, crop, yolo_id)
+        now = time.time()
+        quality = score_face_quality(ctx.frame, box, keypoints)
+        cand = self.candidates.get(yolo_id)
+        if cand is not None and now - cand['ts'] > FACE_QUALITY['CANDIDATE_TTL']:
+            cand = None # Too old to represent the current appearance
+        
+        if quality['score'] < FACE_QUALITY['MIN_SCORE']:
+            self.quality_skips += 1
+        elif cand is None or quality['score'] > cand['quality']:
+            first_ts = cand['first_ts'] if cand is not None else now
+            cand = {
+                # Small RGB crop: the resize/convert is the thread-safe copy
+                'crop': ctx.crop_rgb(quality['region'], max_width=200),
+                'quality': quality['score'],
+                'ts': now,
+                'first_ts': first_ts,
+                'frame_id': ctx.frame_id,
+                't_capture': ctx.t_capture if ctx.t_capture is not None else now
+            }
+            self.candidates[yolo_id] = cand
+        
+        if cand is None:
+            return self.yolo_to_pid.get(yolo_id, "Scanning...")
+        
+        # Encode a great crop right away, otherwise wait a short window for a better one
+        if cand['quality'] < FACE_QUALITY['GOOD_SCORE'] and now - cand['first_ts'] < FACE_QUALITY['CANDIDATE_WINDOW']:
+            return self.yolo_to_pid.get(yolo_id, "Scanning...")
+        
+        # 4. Schedule Background Task
+        # Re-linked guesses are verified at low priority; new tracks and the primary target jump the queue
+        if yolo_id in self.unverified:
+            priority = IdentityJobScheduler.PRIORITY_LOW
+        elif is_primary or yolo_id not in self.yolo_to_pid:
+            priority = IdentityJobScheduler.PRIORITY_URGENT
+        else:
+            priority = IdentityJobScheduler.PRIORITY_NORMAL
+        meta = {'frame_id': cand['frame_id'], 't_capture': cand['t_capture']}
+        if self.scheduler.submit(yolo_id, (cand['crop'], cand['quality']), priority, meta=meta):
+            del self.candidates[yolo_id]
         
         # Return immediate fallback
-        return self.yolo_to_pid.get(yolo_id, f"Scanning...")
+        return self.yolo_to_pid.get(yolo_id, "Scanning...")
+
+    def _try_relink(self, ctx, box, yolo_id, keypoints, now):
+        # PIDs held by tracks still in frame cannot be inherited
+        taken = {self.yolo_to_pid[k] for k in self.alive_ids if k in self.yolo_to_pid}
+        pid, entry = self.relinker.match(ctx, yolo_id, box, keypoints, now, exclude=taken)
+        if pid is None:
+            return
+        self.yolo_to_pid[yolo_id] = pid
+        self.last_check_time[yolo_id] = now # Verified at the next regular re-check
+        self.unverified[yolo_id] = {'pid': pid, 'ts': now, 'fails': 0}
+        if entry['source'] is not None:
+            self.label_source[yolo_id] = entry['source']
+        print(f"[IDENTITY] Re-linked Trk-{yolo_id} -> {pid} (lost {now - entry['ts']:.1f}s ago)")
 
-    def _process_face_bg(self, crop, yolo_id):
+    def prune_tracks(self, alive_ids, boxes=None):
         """
-        Background Worker Function.
+        Drop queued identity jobs for tracks that are no longer in frame.
+        Lost tracks with a persistent PID become re-link candidates.
+        boxes: person boxes of the frame (re-link signatures skip torsos hidden by someone in front).
         """
-        try:
-            # Optimization: Resize large faces to standard size (e.g. 200px width)
-            # Face recognition is O(N^2) with pixels, resizing speeds up 10x
-            h, w = crop.shape[:2]
-            if w > 200:
-                scale = 200 / w
-                crop = cv2.resize(crop, (0,0), fx=scale, fy=scale)
+        alive = set(alive_ids)
+        if self.relinker is not None:
+            now = time.time()
+            self.relinker.begin_frame(boxes)
+            for yolo_id in [k for k in self.relinker.tracks if k not in alive]:
+                pid = self.yolo_to_pid.get(yolo_id)
+                if pid is not None and (pid.startswith("Trk-") or pid in self.trusted_identities):
+                    pid = None # No face seen yet / trusted identities are only ever given by a face match
+                self.relinker.lose(yolo_id, pid, now, source=self.label_source.get(yolo_id))
+        for yolo_id in [k for k in self.unverified if k not in alive]:
+            del self.unverified[yolo_id]
+        now = time.time()
+        for yolo_id in [k for k, u in self.unverified.items() if now - u['ts'] > RELINK['VERIFY_TIMEOUT']]:
+            self._drop_relink(yolo_id, "not verified in time")
+        self.alive_ids = alive
+        for yolo_id in [k for k in self.candidates if k not in alive]:
+            del self.candidates[yolo_id]
+        for yolo_id in [k for k in self.label_source if k not in alive]:
+            del self.label_source[yolo_id]
+        return self.scheduler.cancel_missing(alive)
 
-            # Convert to RGB
-            rgb_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-            
-            # Detect
-            encodings = face_recognition.face_encodings(rgb_crop)
-            
-            if len(encodings) == 0:
-                # No face found
-                self.yolo_to_pid[yolo_id] = f"Trk-{yolo_id}"
-            else:
-                current_encoding = encodings[0]
-                found_pid, dist = self._match_encoding(current_encoding)
-                
-                if not found_pid:
-                    # New Identity
-                    found_pid = f"ID-{self.next_pid_counter:02d}"
-                    self.next_pid_counter += 1
-                    self.known_entities[found_pid] = {
-                        'encodings': [current_encoding], # Start Gallery
-                        'created_at': time.time(),
-                        'last_seen': time.time()
-                    }
-                    print(f"[IDENTITY] New Persistent ID: {found_pid} (No match found)")
+    def apply_results(self):
+        """
+        Main Thread: Apply finished background encodings to the identity database.
+        """
+        for yolo_id, result, meta in self.scheduler.drain():
+            self.encode_calls += 1
+            if result is not None:
+                encodings, quality = result
+                if yolo_id in self.unverified and len(encodings) == 0:
+                    # No face in the verification crop: keep the re-linked PID for a few more tries
+                    self.unverified[yolo_id]['fails'] += 1
+                    if self.unverified[yolo_id]['fails'] >= RELINK['VERIFY_ATTEMPTS']:
+                        self._drop_relink(yolo_id, "no face to verify")
+                elif yolo_id in self.unverified:
+                    guess = self.unverified.pop(yolo_id)['pid']
+                    self._apply_encodings(yolo_id, encodings, quality)
+                    if self.yolo_to_pid[yolo_id] == guess:
+                        self.relinks_confirmed += 1
+                    else:
+                        self.relinks_wrong += 1
+                        print(f"[IDENTITY] Wrong re-link: Trk-{yolo_id} was {guess}, encoding says {self.yolo_to_pid[yolo_id]}")
+                    self.label_source[yolo_id] = (meta.get('frame_id'), meta.get('t_capture'))
                 else:
-                    self.known_entities[found_pid]['last_seen'] = time.time()
-                    print(f"[IDENTITY] Matched {found_pid} (Dist: {dist:.3f})")
-                    
-                    # Add to gallery if match is good but not identical (Learning)
-                    # Limit gallery size to 5
-                    if len(self.known_entities[found_pid]['encodings']) < 5:
-                        self.known_entities[found_pid]['encodings'].append(current_encoding)
-                
-                # Update Mapping
-                self.yolo_to_pid[yolo_id] = found_pid
-
-        except Exception as e:
-            print(f"[ERROR] bg_process: {e}")
-        finally:
-            if yolo_id in self.pending_tasks:
-                self.pending_tasks.remove(yolo_id)
+                    self._apply_encodings(yolo_id, encodings, quality)
+                    self.label_source[yolo_id] = (meta.get('frame_id'), meta.get('t_capture'))
             self.last_check_time[yolo_id] = time.time()
+            if self.on_job_done is not None:
+                self.on_job_done(yolo_id, meta)
+
+    def _drop_relink(self, yolo_id, reason):
+        """Give up on an unverified re-link: the track is new again (urgent encode, "Scanning...")."""
+        guess = self.unverified.pop(yolo_id)['pid']
+        self.yolo_to_pid.pop(yolo_id, None)
+        self.last_check_time.pop(yolo_id, None)
+        self.label_source.pop(yolo_id, None)
+        self.relinks_dropped += 1
+        print(f"[IDENTITY] Dropped re-link Trk-{yolo_id} -> {guess} ({reason})")
+
+    def label_age(self, yolo_id, now=None):
+        """
+        Seconds since the frame the current identity label was computed from was captured
+        (None if the label does not come from an encoding yet).
+        """
+        source = self.label_source.get(yolo_id)
+        if source is None or source[1] is None:
+            return None
+        return (now or time.time()) - source[1]
+
+    def get_queue_stats(self):
+        stats = self.scheduler.stats()
+        stats['encode_calls'] = self.encode_calls
+        stats['quality_skips'] = self.quality_skips
+        # Every re-link is an urgent new-track encode avoided (verification runs at low priority)
+        stats['relinks'] = self.relinker.relinks if self.relinker is not None else 0
+        stats['relinks_confirmed'] = self.relinks_confirmed
+        stats['relinks_wrong'] = self.relinks_wrong
+        stats['relinks_dropped'] = self.relinks_dropped
+        stats['encodes_per_person'] = self.encode_calls / max(1, len(self.known_entities) + len(self.trusted_identities))
+        return stats
+
+    def _encode_face(self, payload):
+        """
+        Background Worker Function. Pure: only computes encodings, touches no shared state.
+        payload: (rgb_face_crop, quality)
+        Crops arrive already converted to RGB and resized to <=200px wide
+        (Face recognition is O(N^2) with pixels, resizing speeds up 10x).
+        """
+        rgb_crop, quality = payload
+        
+        # Detect
+        return face_recognition.face_encodings(rgb_crop), quality
+
+    def _apply_encodings(self, yolo_id, encodings, quality):
+        """
+        Main Thread: Match a finished encoding and update the mapping/gallery.
+        """
+        if len(encodings) == 0:
+            # No face found
+            self.yolo_to_pid[yolo_id] = f"Trk-{yolo_id}"
+            return
+
+        current_encoding = encodings[0]
+        found_pid, dist = self._match_encoding(current_encoding)
+        
+        if not found_pid:
+            # New Identity
+            found_pid = f"ID-{self.next_pid_counter:02d}"
+            self.next_pid_counter += 1
+            self.known_entities[found_pid] = {
+                'encodings': [current_encoding], # Start Gallery
+                'qualities': [quality],
+                'created_at': time.time(),
+                'last_seen': time.time()
+            }
+            print(f"[IDENTITY] New Persistent ID: {found_pid} (No match found)")
+        elif found_pid in self.known_entities:
+            self.known_entities[found_pid]['last_seen'] = time.time()
+            print(f"[IDENTITY] Matched {found_pid} (Dist: {dist:.3f})")
+            
+            # Learning: keep the highest-quality, diverse samples
+            self._add_to_gallery(self.known_entities[found_pid], current_encoding, quality)
+        else:
+            print(f"[IDENTITY] Matched Trusted {found_pid} (Dist: {dist:.3f})")
+        
+        # Update Mapping
+        self.yolo_to_pid[yolo_id] = found_pid
+
+    def _add_to_gallery(self, entity, encoding, quality):
+        """
+        Quality-aware gallery update (max FACE_QUALITY['GALLERY_SIZE'] samples).
+        - Near-duplicate of an existing sample: replace it only if the new one is better.
+        - Otherwise: append, or replace the worst sample when full and the new one is better.
+        """
+        encs, quals = entity['encodings'], entity['qualities']
+        distances = face_recognition.face_distance(encs, encoding)
+        nearest = int(np.argmin(distances))
+        
+        if distances[nearest] < FACE_QUALITY['GALLERY_MIN_DIVERSITY']:
+            if quality > quals[nearest]:
+                encs[nearest], quals[nearest] = encoding, quality
+        elif len(encs) < FACE_QUALITY['GALLERY_SIZE']:
+            encs.append(encoding)
+            quals.append(quality)
+        else:
+            worst = int(np.argmin(quals))
+            if quality > quals[worst]:
+                encs[worst], quals[worst] = encoding, quality
 
     def _match_encoding(self, encoding):
         """
@@ -160,10 +347,7 @@ class IdentityManager:
             return found_pid, best_dist
 
         # 2. Check General Known Identities
-        # Improve locking: Iterate dictionary safely
-        known_items = list(self.known_entities.items())
-        
-        for pid, data in known_items:
+        for pid, data in self.known_entities.items():
             # Check against ALL stored encodings for this person
             # Returns list of distances
             distances = face_recognition.face_distance(data['encodings'], encoding)
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+
+class IdentityJobScheduler:
+    """
+    Bounded priority queue for background identity work.
+    - One job per track: a newer crop REPLACES the queued one instead of duplicating it.
+    - Lower priority value runs first (new tracks / primary target before re-checks).
+    - Jobs for tracks that left the frame can be cancelled before they run.
+    - Workers never touch shared state: results go to a completion queue
+      that the main thread drains with drain().
+    """
+    PRIORITY_URGENT = 0 # New track or current primary target
+    PRIORITY_NORMAL = 1 # Periodic re-verification
+    PRIORITY_LOW = 2    # Opportunistic work (e.g. verification of a guess)
+
+    def __init__(self, worker_fn, max_depth=8, num_workers=1):
+        self.worker_fn = worker_fn
+        self.max_depth = max_depth
+
+        self._lock = threading.Condition()
+        self._heap = []              # [priority, seq, track_id, payload, submit_ts, alive]
+        self._queued = {}            # track_id -> heap entry (lazy deletion via 'alive')
+        self._running = set()        # track_ids currently inside worker_fn
+        self._unclaimed = set()      # finished, waiting for drain() on the main thread
+        self._completed = queue.SimpleQueue()
+        self._seq = itertools.count()
+        self._stop = False
+
+        # Metrics
+        self.submitted = 0
+        self.replaced = 0
+        self.dropped_full = 0  # Evicted / rejected because the queue was full
+        self.dropped_stale = 0 # Cancelled because the track disappeared
+        self.completed = 0
+        self.wait_ema_ms = 0.0
+        self.wait_max_ms = 0.0
+
+        self._workers = []
+        for i in range(num_workers):
+            th = threading.Thread(target=self._worker_loop, name=f"identity-worker-{i}", daemon=True)
+            th.start()
+            self._workers.append(th)
+
+    # --- Main Thread API ---
+
+    def submit(self, track_id, payload, priority=PRIORITY_NORMAL, meta=None):
+        """
+        Queue (or replace) the job for track_id.
+        Returns True if the job is queued, False if it was rejected.
+        """
+        with self._lock:
+            # Never run two jobs for the same track at once
+            if track_id in self._running or track_id in self._unclaimed:
+                return False
+
+            old = self._queued.get(track_id)
+            if old is not None:
+                # Newer crop wins; keep the more urgent of the two priorities
+                old[5] = False
+                priority = min(priority, old[0])
+                del self._queued[track_id]
+                self.replaced += 1
+            elif len(self._queued) >= self.max_depth:
+                # Full: evict the least urgent, oldest job (or reject the new one)
+                worst = max(self._queued.values(), key=lambda e: (e[0], -e[1]))
+                if priority >= worst[0]:
+                    self.dropped_full += 1
+                    return False
+                worst[5] = False
+                del self._queued[worst[2]]
+                self.dropped_full += 1
+
+            entry = [priority, next(self._seq), track_id, (payload, meta), time.time(), True]
+            heapq.heappush(self._heap, entry)
+            self._queued[track_id] = entry
+            self.submitted += 1
+            self._lock.notify()
+            return True
+
+    def cancel_missing(self, alive_track_ids):
+        """
+        Drop queued jobs whose track is no longer alive.
+        Returns the number of cancelled jobs.
+        """
+        alive = set(alive_track_ids)
+        with self._lock:
+            stale = [tid for tid in self._queued if tid not in alive]
+            for tid in stale:
+                self._queued.pop(tid)[5] = False
+            self.dropped_stale += len(stale)
+            # Compact the heap once dead entries dominate it
+            if len(self._heap) > 2 * (len(self._queued) + 1):
+                self._heap = [e for e in self._heap if e[5]]
+                heapq.heapify(self._heap)
+        return len(stale)
+
+    def is_pending(self, track_id):
+        """True if a job for this track is queued, running or awaiting drain()."""
+        with self._lock:
+            return track_id in self._queued or track_id in self._running or track_id in self._unclaimed
+
+    def drain(self):
+        """
+        Collect finished jobs. Call from the main thread only.
+        Returns list of (track_id, result, meta) tuples. result is None if the job failed.
+        """
+        out = []
+        while True:
+            try:
+                item = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            out.append(item)
+        if out:
+            with self._lock:
+                for track_id, _, _ in out:
+                    self._unclaimed.discard(track_id)
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': len(self._queued),
+                'running': len(self._running),
+                'submitted': self.submitted,
+                'replaced': self.replaced,
+                'dropped': self.dropped_full + self.dropped_stale,
+                'dropped_full': self.dropped_full,
+                'dropped_stale': self.dropped_stale,
+                'completed': self.completed,
+                'wait_ms': self.wait_ema_ms,
+                'wait_max_ms': self.wait_max_ms,
+            }
+
+    def shutdown(self, timeout=1.0):
+        with self._lock:
+            self._stop = True
+            self._lock.notify_all()
+        for th in self._workers:
+            th.join(timeout)
+
+    # --- Worker Thread ---
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                entry = None
+                while entry is None:
+                    if self._stop:
+                        return
+                    while self._heap and not self._heap[0][5]:
+                        heapq.heappop(self._heap)
+                    if self._heap:
+                        entry = heapq.heappop(self._heap)
+                    else:
+                        self._lock.wait()
+
+                _, _, track_id, (payload, meta), submit_ts, _ = entry
+                del self._queued[track_id]
+                self._running.add(track_id)
+
+                wait_ms = (time.time() - submit_ts) * 1000
+                self.wait_ema_ms = wait_ms if self.completed == 0 else 0.9 * self.wait_ema_ms + 0.1 * wait_ms
+                self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+            result = None
+            t0 = time.time()
+            try:
+                result = self.worker_fn(payload)
+            except Exception as e:
+                print(f"[ERROR] identity job (trk {track_id}): {e}")
+
+            job_meta = dict(meta or {})
+            job_meta.update({'submit_ts': submit_ts, 'wait_ms': wait_ms, 'run_ms': (time.time() - t0) * 1000})
+
+            with self._lock:
+                self._running.discard(track_id)
+                self._unclaimed.add(track_id)
+                self.completed += 1
+            self._completed.put((track_id, result, job_meta))
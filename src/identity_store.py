@@ -0,0 +1,47 @@
+import os
+import numpy as np
+
+def load_identity_store(path):
+    """
+    Load enrolled identities from disk.
+    Returns: { 'COMMANDER': {'encodings': [np.array(128)], 'qualities': [0.8, ...]} }
+    Missing file -> empty dict.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    data = np.load(path, allow_pickle=False)
+    names = [str(n) for n in data['names']]
+    owners = data['owners']
+    encodings = data['encodings']
+    qualities = data['qualities']
+
+    identities = {name: {'encodings': [], 'qualities': []} for name in names}
+    for idx, enc, q in zip(owners, encodings, qualities):
+        entry = identities[names[idx]]
+        entry['encodings'].append(enc)
+        entry['qualities'].append(float(q))
+    return identities
+
+def save_identity_store(path, identities):
+    """
+    Write identities (same structure as load_identity_store) as a single .npz file.
+    Written to a temp file first so a crash never leaves a half-written store.
+    """
+    names = sorted(identities.keys())
+    owners, encodings, qualities = [], [], []
+    for idx, name in enumerate(names):
+        entry = identities[name]
+        for enc, q in zip(entry['encodings'], entry['qualities']):
+            owners.append(idx)
+            encodings.append(np.asarray(enc, dtype=np.float64))
+            qualities.append(q)
+
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        names=np.array(names, dtype=str),
+        owners=np.array(owners, dtype=np.int32),
+        encodings=np.array(encodings, dtype=np.float64).reshape(-1, 128),
+        qualities=np.array(qualities, dtype=np.float32))
+    os.replace(tmp_path, path)
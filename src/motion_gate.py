@@ -0,0 +1,100 @@
+import time
+
+import cv2
+import numpy as np
+
+from .config import MOTION_GATE
+
+class MotionGate:
+    """
+    Decides per frame whether the heavy stages (pose inference, MediaPipe, HUD) run.
+    Motion = share of thumbnail pixels differing from a running background (ctx.thumb_gray).
+        ACTIVE: heavy stages every frame. Goes IDLE after IDLE_AFTER seconds where the moving
+                share stays below STILL_AREA AND no tracks are alive.
+        IDLE:   heavy stages only every KEEPALIVE seconds (a person standing perfectly still
+                is still picked up). Wakes on the SAME frame the moving share reaches WAKE_AREA,
+                or when a keep-alive frame finds tracks.
+    WAKE_AREA > STILL_AREA is the hysteresis: sensor noise and flicker neither wake nor keep awake.
+    Wake-up latency = capture of the waking frame -> gate decision (the heavy stages start right after).
+    """
+    ACTIVE, IDLE = "ACTIVE", "IDLE"
+
+    def __init__(self, cfg=None):
+        self.cfg = dict(MOTION_GATE, **(cfg or {}))
+        self.state = self.ACTIVE
+        self.motion = 0.0
+
+        self._bg = None     # float32 running background
+        self._bg_u8 = None  # Preallocated uint8 buffers
+        self._diff = None
+        self._mask = None
+        self._last_motion = None # Set on the first frame
+        self._last_heavy = 0.0
+
+        # Metrics
+        self.frames = 0
+        self.skipped = 0
+        self.wakeups = 0
+        self.wake_latency_ms = []
+
+    def update(self, ctx, tracks_alive, now=None):
+        """
+        Call once per captured frame, before inference.
+        tracks_alive: tracks present after the last heavy frame.
+        Returns True when the heavy stages should run on this frame.
+        """
+        now = time.time() if now is None else now
+        self.frames += 1
+        self.motion = self._motion_share(ctx.thumb_gray(self.cfg['THUMB_WIDTH']))
+
+        if self._last_motion is None or self.motion >= self.cfg['STILL_AREA'] or tracks_alive:
+            self._last_motion = now
+
+        if self.state == self.IDLE:
+            if self.motion >= self.cfg['WAKE_AREA'] or tracks_alive:
+                self.state = self.ACTIVE
+                self.wakeups += 1
+                if ctx.t_capture is not None:
+                    self.wake_latency_ms.append((time.time() - ctx.t_capture) * 1000)
+                print(f"[GATE] Wake up (motion {self.motion:.2%}, tracks {tracks_alive})")
+            elif now - self._last_heavy >= self.cfg['KEEPALIVE']:
+                self._last_heavy = now
+                return True # Keep-alive frame
+            else:
+                self.skipped += 1
+                return False
+        elif now - self._last_motion >= self.cfg['IDLE_AFTER']:
+            self.state = self.IDLE
+            print(f"[GATE] Idle (static for {self.cfg['IDLE_AFTER']:.0f}s, no tracks)")
+
+        self._last_heavy = now
+        return True
+
+    def _motion_share(self, gray):
+        if self._bg is None or self._bg.shape != gray.shape:
+            self._bg = gray.astype(np.float32)
+            self._bg_u8 = np.empty_like(gray)
+            self._diff = np.empty_like(gray)
+            self._mask = np.empty_like(gray)
+            return 0.0
+        cv2.convertScaleAbs(self._bg, dst=self._bg_u8)
+        cv2.absdiff(gray, self._bg_u8, dst=self._diff)
+        cv2.threshold(self._diff, self.cfg['PIXEL_DIFF'], 255, cv2.THRESH_BINARY, dst=self._mask)
+        cv2.accumulateWeighted(gray, self._bg, self.cfg['BG_ALPHA'])
+        return cv2.countNonZero(self._mask) / self._mask.size
+
+    def stats(self):
+        lat = self.wake_latency_ms
+        return {
+            'state': self.state,
+            'motion': self.motion,
+            'skipped_share': self.skipped / max(1, self.frames),
+            'wakeups': self.wakeups,
+            'wake_ms_mean': float(np.mean(lat)) if lat else 0.0,
+            'wake_ms_max': float(np.max(lat)) if lat else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['state']} mot:{s['motion']:.1%} skip:{s['skipped_share']:.0%} "
+                f"wake:{s['wakeups']} ({s['wake_ms_max']:.1f}ms max)")
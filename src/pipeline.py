@@ -0,0 +1,349 @@
+import queue
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+import cv2
+
+from .config import PIPELINE
+from .frame_bus import FrameBus, StageQueue
+
+# Stage order == frame flow: capture -> inference -> identity -> render
+STAGES = ('CAPTURE', 'INFER', 'IDENTITY', 'RENDER')
+# Single-process tools: a sampling profile or a frame trace of one stage process would be misleading
+UNSUPPORTED_COMMANDS = ('profile', 'trace')
+
+# Shared stats row per stage: [fps, busy_ms, processed, queue, dropped]
+STAT_FIELDS = 5
+
+class StageMeter:
+    """
+    Per-stage throughput/busy-time meter, written into a shared mp.Array row
+    so the render stage (HUD) and the parent can read every stage's numbers.
+    """
+    def __init__(self, stats, index, alpha=0.1):
+        self.stats = stats
+        self.base = index * STAT_FIELDS
+        self.alpha = alpha
+        self.fps = 0.0
+        self.busy_ms = 0.0
+        self.processed = 0
+        self.dropped = 0
+        self.last_ts = None
+
+    def tick(self, busy_s, queue_len):
+        now = time.time()
+        if self.last_ts is not None:
+            dt = max(now - self.last_ts, 1e-6)
+            self.fps += self.alpha * (1.0 / dt - self.fps)
+        self.last_ts = now
+        self.busy_ms += self.alpha * (busy_s * 1000 - self.busy_ms)
+        self.processed += 1
+        self._publish(queue_len)
+
+    def drop(self):
+        self.dropped += 1
+        self._publish(0)
+
+    def _publish(self, queue_len):
+        row = (self.fps, self.busy_ms, self.processed, queue_len, self.dropped)
+        for i, v in enumerate(row):
+            self.stats[self.base + i] = v
+
+def read_stage_stats(stats):
+    """Returns { 'CAPTURE': {'fps', 'busy_ms', 'processed', 'queue', 'dropped'}, ... }"""
+    out = {}
+    for i, name in enumerate(STAGES):
+        row = stats[i * STAT_FIELDS:(i + 1) * STAT_FIELDS]
+        out[name] = {'fps': row[0], 'busy_ms': row[1], 'processed': int(row[2]), 'queue': int(row[3]), 'dropped': int(row[4])}
+    return out
+
+class _ManagerView:
+    """
+    Render-side stand-in for TargetManager. draw_hud only reads manual_mode
+    and the identity queue stats, which arrive with each frame message.
+    """
+    def __init__(self, manual_mode, id_stats):
+        self.manual_mode = manual_mode
+        self.id_manager = self
+        self._id_stats = id_stats
+
+    def get_queue_stats(self):
+        return self._id_stats
+
+# --- Stage Processes ---
+
+def _stage_exit(stop, *endpoints):
+    """Any stage exiting stops the whole pipeline."""
+    stop.set()
+    for ep in endpoints:
+        ep.detach()
+
+def _capture_stage(bus, out_q, stop, stats, cfg, source_fps):
+    meter = StageMeter(stats, 0)
+    source = None
+    try:
+        from .camera import open_source
+        # This process IS the decode thread: decode straight into the frame slots
+        source = open_source(cfg['CAMERA'], width=cfg['WIDTH'], height=cfg['HEIGHT'], threaded=False)
+        source_fps.value = source.info.get('measured_fps') or source.info.get('fps') or 0.0 # For the recorder
+        frame_id = 0
+        while not stop.is_set():
+            slot = bus.acquire()
+            if slot is None:
+                # Downstream is full: discard this camera frame, keep the device buffer fresh
+                source.skip()
+                meter.drop()
+                continue
+
+            t0 = time.time()
+            ret, _, t_capture = source.read(dst=bus.view(slot)) # Resized into the slot if the size differs
+            if not ret:
+                bus.release(slot)
+                break
+
+            frame_id += 1
+            out_q.put({'frame_id': frame_id, 'slot': slot, 't_capture': t_capture})
+            meter.tick(time.time() - t0, 0)
+    except IOError as e:
+        print(f"[ERROR] {e}")
+    finally:
+        if source is not None:
+            source.release()
+        _stage_exit(stop, bus, out_q)
+
+def _inference_stage(bus, in_q, out_q, stop, stats, cfg):
+    meter = StageMeter(stats, 1)
+    try:
+        from ultralytics import YOLO
+        from .face_mesh import create_face_landmarker, detect_face_landmarks
+        from .trackers import create_tracker, detect_and_track
+        from .stages import StageExecutor
+
+        model = YOLO(cfg['MODEL'])
+        tracker = create_tracker(cfg['TRACKER'])
+        landmarker = create_face_landmarker(cfg['FACE_MODEL'], num_faces=5)
+        # MediaPipe clock starts at the first frame's capture (frames queue up while the models load)
+        start_time_s = None
+        last_ts_ms = -1
+
+        # Detect + Track (ByteTrack via model.track, or the configured backend) || MediaPipe Face Landmarker
+        stages = StageExecutor()
+        stages.add('inference', lambda f: detect_and_track(model, f['frame'], tracker)[1])
+        stages.add('rgb', lambda f: cv2.cvtColor(f['frame'], cv2.COLOR_BGR2RGB))
+        stages.add('face_mesh', lambda f, rgb: detect_face_landmarks(landmarker, rgb, f['ts_ms']), after=('rgb',))
+
+        while not stop.is_set():
+            try:
+                msg = in_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t0 = time.time()
+            frame = bus.view(msg['slot'])
+
+            # MediaPipe timestamps must be strictly increasing
+            if start_time_s is None:
+                start_time_s = msg['t_capture']
+            ts_ms = max(int((msg['t_capture'] - start_time_s) * 1000), last_ts_ms + 1)
+            last_ts_ms = ts_ms
+            out = stages.run({'frame': frame, 'ts_ms': ts_ms})
+            msg['detections'], msg['face_landmarks'] = out['inference'], out['face_mesh']
+
+            out_q.put(msg)
+            meter.tick(time.time() - t0, len(in_q))
+    finally:
+        _stage_exit(stop, bus, out_q)
+
+def _identity_stage(bus, in_q, out_q, cmd_q, stop, stats, cfg):
+    meter = StageMeter(stats, 2)
+    try:
+        from .target_manager import TargetManager
+        from .turret_controller import TurretController
+        from .frame_cache import FrameContext
+        from .controls import apply_command
+
+        W, H = cfg['WIDTH'], cfg['HEIGHT']
+        turret = TurretController(kp=0.1, ki=0.01, kd=0.05)
+        manager = TargetManager(W, H)
+        aim_mode = 2 # Default: UPPER_BODY
+        targets = []
+
+        while not stop.is_set():
+            # Commands from the render stage (keys)
+            while True:
+                try:
+                    aim_mode = apply_command(cmd_q.get_nowait(), manager, targets, aim_mode)
+                except queue.Empty:
+                    break
+
+            try:
+                msg = in_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t0 = time.time()
+
+            ctx = FrameContext(bus.view(msg['slot']), msg['frame_id'], t_capture=msg['t_capture'])
+            targets = manager.select_targets(msg['detections'], ctx, aim_mode)
+            primary = manager.primary_target
+
+            # --- TURRET PID UPDATE ---
+            if primary:
+                target_x, target_y = primary['aim_point']
+                turret.update(target_x - (W // 2), target_y - (H // 2))
+
+            msg.update({
+                'targets': targets,
+                # Index, not the dict: identity (t == primary) does not survive pickling
+                'primary_index': next((i for i, t in enumerate(targets) if t is primary), None),
+                'pan': turret.pan_angle,
+                'tilt': turret.tilt_angle,
+                'aim_mode': aim_mode,
+                'manual_mode': manager.manual_mode,
+                'id_stats': manager.id_manager.get_queue_stats(),
+            })
+            out_q.put(msg)
+            meter.tick(time.time() - t0, len(in_q))
+    finally:
+        _stage_exit(stop, bus, out_q)
+
+def _dispatch_commands(cmds, recorder, cmd_q):
+    """Render stage: 'event' triggers the recorder, other commands go to the identity stage. True on 'quit'."""
+    if 'quit' in cmds:
+        return True
+    for cmd in cmds:
+        if cmd in UNSUPPORTED_COMMANDS:
+            print(f"[PIPELINE] '{cmd}' is not supported with --pipeline (run without it to {cmd} the loop)")
+        elif cmd == 'event':
+            if recorder:
+                recorder.trigger()
+        else:
+            cmd_q.put(cmd)
+    return False
+
+def _render_stage(bus, in_q, cmd_q, stop, stats, cfg, source_fps, record, pre_trigger, headless=False, port=None):
+    meter = StageMeter(stats, 3)
+    recorder = server = None
+    try:
+        from .turret_controller import TurretController
+        from .visualization import draw_hud, draw_skeleton, draw_mediapipe_mesh
+        from .controls import key_to_command
+        from .recorder import HudRecorder
+        from .service import HudStreamServer
+
+        if headless:
+            server = HudStreamServer(port=port, unsupported=UNSUPPORTED_COMMANDS).start()
+        turret = TurretController() # Mirror: angles come from the identity stage
+
+        while not stop.is_set():
+            try:
+                msg = in_q.get(timeout=0.1)
+            except queue.Empty:
+                # Keep the window (or the command API) responsive while upstream is idle
+                if server:
+                    cmds = server.poll_commands()
+                else:
+                    cmd = key_to_command(cv2.waitKey(1))
+                    cmds = [cmd] if cmd else []
+                if _dispatch_commands(cmds, recorder, cmd_q):
+                    break
+                continue
+            t0 = time.time()
+            frame = bus.view(msg['slot'])
+            if record and recorder is None:
+                # First frame: the capture stage has opened the source and published its frame rate
+                recorder = HudRecorder(cfg['WIDTH'], cfg['HEIGHT'], pre_trigger_seconds=pre_trigger,
+                                       source_fps=source_fps.value or None).start()
+
+            targets = msg['targets']
+            primary = targets[msg['primary_index']] if msg['primary_index'] is not None else None
+            turret.pan_angle, turret.tilt_angle = msg['pan'], msg['tilt']
+
+            perf = {
+                name: f"{st['fps']:.1f}fps {st['busy_ms']:.0f}ms q:{st['queue']}"
+                for name, st in read_stage_stats(stats).items()
+            }
+            draw_hud(frame, turret, targets, primary, msg['aim_mode'], _ManagerView(msg['manual_mode'], msg['id_stats']), perf=perf)
+
+            dets = msg['detections']
+            if dets.keypoints is not None:
+                for kps in dets.keypoints:
+                    draw_skeleton(frame, kps)
+            if msg['face_landmarks']:
+                draw_mediapipe_mesh(frame, msg['face_landmarks'])
+
+            if recorder:
+                recorder.submit(frame)
+            if server:
+                server.publish(frame)
+                cmds = server.poll_commands()
+            else:
+                cv2.imshow("Safe Turret Sim", frame)
+                cmd = key_to_command(cv2.waitKey(1))
+                cmds = [cmd] if cmd else []
+
+            # Slot is done: hand it back to capture
+            bus.release(msg['slot'])
+            meter.tick(time.time() - t0, len(in_q))
+
+            if _dispatch_commands(cmds, recorder, cmd_q):
+                break
+    finally:
+        if recorder:
+            recorder.stop()
+        if server:
+            server.stop()
+        else:
+            cv2.destroyAllWindows()
+        cmd_q.cancel_join_thread()
+        _stage_exit(stop, bus)
+
+# --- Supervisor ---
+
+def run_pipeline(record=False, pre_trigger=None, cfg=None, headless=False, port=None):
+    """
+    Multi-process mode: capture, inference, identity and render each run in their own process,
+    connected by a FrameBus (shared-memory frame slots) and small metadata queues.
+    headless: the render stage serves the HUD over HTTP (HudStreamServer) instead of opening a window.
+    Shuts everything down as soon as ANY stage exits.
+    """
+    cfg = dict(PIPELINE, **(cfg or {}))
+    ctx = mp.get_context("spawn")
+
+    bus = FrameBus(ctx, cfg['SLOTS'], cfg['HEIGHT'], cfg['WIDTH'])
+    stop = ctx.Event()
+    stats = ctx.Array('d', len(STAGES) * STAT_FIELDS, lock=False)
+    source_fps = ctx.Value('d', 0.0, lock=False) # Set by the capture stage once the source is open
+    infer_q, identity_q, render_q = StageQueue(ctx), StageQueue(ctx), StageQueue(ctx)
+    cmd_q = ctx.Queue()
+
+    # Stage processes are NOT daemonic: the render stage may start the recorder process
+    procs = [
+        ctx.Process(target=_capture_stage, args=(bus, infer_q, stop, stats, cfg, source_fps), name="stage-capture"),
+        ctx.Process(target=_inference_stage, args=(bus, infer_q, identity_q, stop, stats, cfg), name="stage-inference"),
+        ctx.Process(target=_identity_stage, args=(bus, identity_q, render_q, cmd_q, stop, stats, cfg), name="stage-identity"),
+        ctx.Process(target=_render_stage, args=(bus, render_q, cmd_q, stop, stats, cfg, source_fps, record, pre_trigger, headless, port), name="stage-render"),
+    ]
+    for p in procs:
+        p.start()
+    print(f"[PIPELINE] {len(procs)} stages, {cfg['SLOTS']} frame slots ({cfg['WIDTH']}x{cfg['HEIGHT']})")
+
+    try:
+        # Block until the first stage exits (or Ctrl+C)
+        wait([p.sentinel for p in procs])
+        first = next((p for p in procs if not p.is_alive()), None)
+        if first is not None:
+            print(f"[PIPELINE] {first.name} exited (code {first.exitcode}), shutting down")
+    except KeyboardInterrupt:
+        print("[PIPELINE] Interrupted, shutting down")
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                print(f"[PIPELINE] {p.name} did not stop, terminating")
+                p.terminate()
+                p.join()
+
+        for name, st in read_stage_stats(stats).items():
+            print(f"[PIPELINE] {name:<9} {st['processed']:>7} frames  {st['fps']:5.1f} fps  busy {st['busy_ms']:6.1f} ms  dropped {st['dropped']}")
+        bus.close()
@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from .config import PROFILER
+
+class ProfileCapture:
+    """
+    On-demand profiling of the running loop (key 'p' or the 'profile' command).
+    When requested, captures the next N frames with:
+        - A sampling profiler (all threads, every INTERVAL seconds) -> folded stacks
+          (`name;frame;frame count` lines, for flamegraph.pl / speedscope / inferno).
+        - tracemalloc snapshots at start and end -> top allocations report.
+    While off, on_frame() is a single attribute check: no hooks, no sampler thread, no tracemalloc.
+    """
+    def __init__(self, frames=None, interval=None, out_dir=None, top=None):
+        self.frames = frames or PROFILER['FRAMES']
+        self.interval = interval or PROFILER['INTERVAL']
+        self.out_dir = out_dir or PROFILER['OUT_DIR']
+        self.top = top or PROFILER['TOP_ALLOCATIONS']
+
+        self.active = False
+        self.frames_left = 0
+        self._requested = False
+        self._stacks = None
+        self._sampler = None
+        self._stop = None
+
+    def request(self):
+        """Arm a capture; it starts at the next frame boundary."""
+        if self.active:
+            print("[PROFILE] Capture already running")
+            return
+        self._requested = True
+
+    def on_frame(self):
+        """Call once per loop iteration."""
+        if not (self.active or self._requested):
+            return
+        if self._requested:
+            self._requested = False
+            self._start()
+            return
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self._finish()
+
+    def status(self):
+        return f"{self.frames_left} frames left" if self.active else None
+
+    # --- Internals ---
+
+    def _start(self):
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(PROFILER['TRACEBACK_DEPTH'])
+        self._snap_start = tracemalloc.take_snapshot()
+
+        self._stacks = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+        self._t0 = time.time()
+        self.active = True
+        self.frames_left = self.frames
+        self._sampler.start()
+        print(f"[PROFILE] Capturing {self.frames} frames ...")
+
+    def _finish(self):
+        self._stop.set()
+        self._sampler.join()
+        snap_end = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.active = False
+
+        # Report writing is slow-ish: keep it off the loop thread
+        stacks, snap_start = self._stacks, self._snap_start
+        elapsed, samples = time.time() - self._t0, self._samples
+        threading.Thread(
+            target=self._write_reports, args=(stacks, snap_start, snap_end, elapsed, samples),
+            name="profiler-writer", daemon=True).start()
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self._samples += 1
+
+    def _write_reports(self, stacks, snap_start, snap_end, elapsed, samples):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+
+        with open(base + ".folded", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        snap_start = snap_start.filter_traces(ignore)
+        snap_end = snap_end.filter_traces(ignore)
+        with open(base + ".alloc.txt", "w") as f:
+            f.write(f"# {self.frames} frames, {elapsed:.2f}s, {samples} stack samples\n\n")
+            f.write(f"# Top {self.top} allocation sites still alive at the end\n")
+            for stat in snap_end.statistics('lineno')[:self.top]:
+                f.write(f"{stat}\n")
+            f.write(f"\n# Top {self.top} allocation growth during the capture\n")
+            for stat in snap_end.compare_to(snap_start, 'lineno')[:self.top]:
+                f.write(f"{stat}\n")
+            f.write(f"\n# Top {self.top} growth by traceback\n")
+            for stat in snap_end.compare_to(snap_start, 'traceback')[:self.top]:
+                f.write(f"{stat}\n")
+                for line in stat.traceback.format():
+                    f.write(f"    {line}\n")
+
+        print(f"[PROFILE] Wrote {base}.folded and {base}.alloc.txt")
@@ -0,0 +1,231 @@
+import os
+import time
+import queue
+import multiprocessing as mp
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .config import RECORDER
+
+class HudRecorder:
+    """
+    Records the final rendered HUD frame in a separate encoder process.
+    - Frames travel through a shared-memory ring of slots (only slot indices are pickled).
+    - If no slot is free (encoder behind), the frame is DROPPED: the tracking loop never waits.
+    - Continuous mode: writes segmented video files (new file every segment_seconds).
+    - Pre-trigger mode (pre_trigger_seconds > 0): keeps only the last N seconds in memory
+      (JPEG-compressed, inside the encoder process) until trigger() asks for them to be saved.
+    - Output timing follows the submit timestamps, not the source rate: the main loop runs at
+      inference rate and frames are decimated/dropped, so the encoder repeats a frame over the gap
+      to the next one and skips frames arriving faster than the output rate (real-time playback).
+    - source_fps: frame rate of the input (negotiated camera / file FPS); the output rate is
+      source_fps / decimation, the most the loop can deliver.
+    """
+    def __init__(self, frame_width, frame_height,
+                 out_width=None, out_height=None,
+                 decimation=None, fps=None, segment_seconds=None,
+                 pre_trigger_seconds=None, post_trigger_seconds=None,
+                 out_dir=None, slots=None, source_fps=None):
+        self.out_w = out_width or RECORDER['WIDTH'] or frame_width
+        self.out_h = out_height or RECORDER['HEIGHT'] or frame_height
+        self.decimation = max(1, decimation or RECORDER['DECIMATION'])
+        self.slots = slots or RECORDER['SLOTS']
+
+        self.cfg = {
+            # Output rate (RECORDER['FPS'] when the source rate is unknown); timestamps pace the frames
+            'fps': fps or (source_fps / self.decimation if source_fps else RECORDER['FPS']),
+            'segment_seconds': segment_seconds or RECORDER['SEGMENT_SECONDS'],
+            'pre_trigger_seconds': RECORDER['PRE_TRIGGER_SECONDS'] if pre_trigger_seconds is None else pre_trigger_seconds,
+            'post_trigger_seconds': RECORDER['POST_TRIGGER_SECONDS'] if post_trigger_seconds is None else post_trigger_seconds,
+            'out_dir': out_dir or RECORDER['OUT_DIR'],
+            'codec': RECORDER['CODEC'],
+        }
+
+        self.frame_count = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.proc = None
+
+    @property
+    def pre_trigger(self):
+        return self.cfg['pre_trigger_seconds'] > 0
+
+    def start(self):
+        shape = (self.slots, self.out_h, self.out_w, 3)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self.ring = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+
+        ctx = mp.get_context("spawn")
+        self.work_q = ctx.Queue()
+        self.free_q = ctx.Queue()
+        for i in range(self.slots):
+            self.free_q.put(i)
+
+        self.proc = ctx.Process(
+            target=_encoder_main,
+            args=(self.shm.name, shape, self.work_q, self.free_q, self.cfg),
+            name="hud-recorder",
+            daemon=True)
+        self.proc.start()
+
+        mode = f"PRE-TRIGGER {self.cfg['pre_trigger_seconds']}s" if self.pre_trigger else f"SEGMENTS {self.cfg['segment_seconds']}s"
+        print(f"[RECORDER] {self.out_w}x{self.out_h} @ 1/{self.decimation} frames ({self.cfg['fps']:.1f} FPS), {mode} -> {self.cfg['out_dir']}/")
+        return self
+
+    def submit(self, frame):
+        """
+        Hand the rendered frame to the encoder. Never blocks.
+        Returns True if the frame was queued, False if skipped (decimation) or dropped.
+        """
+        if self.proc is None:
+            return False
+        self.frame_count += 1
+        if self.frame_count % self.decimation != 0:
+            return False
+
+        try:
+            slot = self.free_q.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        dst = self.ring[slot]
+        if frame.shape[1] == self.out_w and frame.shape[0] == self.out_h:
+            np.copyto(dst, frame)
+        else:
+            cv2.resize(frame, (self.out_w, self.out_h), dst=dst, interpolation=cv2.INTER_AREA)
+        self.work_q.put((slot, time.time()))
+        self.recorded += 1
+        return True
+
+    def trigger(self):
+        """
+        Event: save the pre-trigger buffer (plus POST_TRIGGER_SECONDS after it).
+        In continuous mode this only starts a new segment.
+        """
+        if self.proc is not None:
+            self.work_q.put(('trigger', time.time()))
+            print("[RECORDER] Event trigger")
+
+    def stats(self):
+        return {'recorded': self.recorded, 'dropped': self.dropped}
+
+    def stop(self):
+        if self.proc is None:
+            return
+        self.work_q.put(None)
+        self.proc.join(timeout=5.0)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.proc = None
+        del self.ring
+        self.shm.close()
+        self.shm.unlink()
+        print(f"[RECORDER] Stopped (recorded={self.recorded}, dropped={self.dropped})")
+
+class _PacedWriter:
+    """
+    Constant-rate video writer fed with timestamped frames (encoder process).
+    Output frame n stands for time t0 + n / fps: a frame is repeated until the next one is due,
+    frames arriving faster than fps are skipped. Playback time equals capture time.
+    """
+    def __init__(self, writer, fps):
+        self.writer = writer
+        self.fps = fps
+        self.t0 = None
+        self.written = 0
+        self.last = None # Newest frame seen: fills the gap up to the next one
+
+    def write(self, frame, ts):
+        if self.t0 is None:
+            self.t0 = ts
+        due = int((ts - self.t0) * self.fps + 1e-6) + 1 # Output frames whose time is <= ts (tolerates float error)
+        if self.last is not None:
+            while self.written < due - 1:
+                self.writer.write(self.last)
+                self.written += 1
+        if self.written < due:
+            self.writer.write(frame)
+            self.written = due
+        if self.last is None:
+            self.last = frame.copy()
+        else:
+            np.copyto(self.last, frame)
+
+    def release(self):
+        self.writer.release()
+
+def _open_writer(cfg, prefix, w, h):
+    os.makedirs(cfg['out_dir'], exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(cfg['out_dir'], f"{prefix}_{stamp}_{int(time.time() * 1000) % 1000:03d}.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*cfg['codec']), cfg['fps'], (w, h))
+    print(f"[RECORDER] Writing {path}")
+    return _PacedWriter(writer, cfg['fps'])
+
+def _encoder_main(shm_name, shape, work_q, free_q, cfg):
+    """
+    Encoder process: pulls slot indices, encodes, returns slots to the free list.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    _, h, w, _ = shape
+
+    pre_trigger = cfg['pre_trigger_seconds'] > 0
+    writer = None
+    segment_start = 0.0
+    memory = deque()      # Pre-trigger buffer: (ts, jpeg bytes)
+    post_until = 0.0      # Pre-trigger mode: keep writing the event file until this time
+
+    try:
+        while True:
+            msg = work_q.get()
+            if msg is None:
+                break
+
+            if msg[0] == 'trigger':
+                ts = msg[1]
+                if pre_trigger:
+                    if writer is None:
+                        writer = _open_writer(cfg, "event", w, h)
+                        for jpg_ts, jpg in memory:
+                            writer.write(cv2.imdecode(jpg, cv2.IMREAD_COLOR), jpg_ts)
+                        memory.clear()
+                    post_until = ts + cfg['post_trigger_seconds']
+                elif writer is not None:
+                    writer.release()
+                    writer = None
+                continue
+
+            slot, ts = msg
+            frame = ring[slot]
+
+            if not pre_trigger:
+                if writer is None or ts - segment_start >= cfg['segment_seconds']:
+                    if writer is not None:
+                        writer.release()
+                    writer = _open_writer(cfg, "hud", w, h)
+                    segment_start = ts
+                writer.write(frame, ts)
+            elif writer is not None:
+                # Post-trigger: stream straight into the event file
+                writer.write(frame, ts)
+                if ts >= post_until:
+                    writer.release()
+                    writer = None
+            else:
+                ok, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, RECORDER['JPEG_QUALITY']])
+                if ok:
+                    memory.append((ts, jpg))
+                while memory and ts - memory[0][0] > cfg['pre_trigger_seconds']:
+                    memory.popleft()
+
+            free_q.put(slot)
+    finally:
+        if writer is not None:
+            writer.release()
+        del ring
+        shm.close()
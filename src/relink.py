@@ -0,0 +1,189 @@
+import math
+
+import cv2
+import numpy as np
+
+from .config import RELINK
+
+# COCO torso keypoints
+L_SH, R_SH, L_HIP, R_HIP = 5, 6, 11, 12
+SIGNATURE_SIZE = (24, 32) # (w, h) the torso is resized to before the histogram
+
+def _center(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+def _valid(kps, idx):
+    return kps is not None and kps.shape[0] > idx and kps[idx, 0] != 0 and kps[idx, 1] != 0
+
+def torso_region(kps, box):
+    """
+    Torso rectangle (x1, y1, x2, y2): shoulders -> hips from the pose keypoints,
+    or the upper-middle of the person box when they are not visible.
+    """
+    bx1, by1, bx2, by2 = map(float, box)
+    if all(_valid(kps, i) for i in (L_SH, R_SH, L_HIP, R_HIP)):
+        xs = kps[[L_SH, R_SH, L_HIP, R_HIP], 0]
+        ys = kps[[L_SH, R_SH, L_HIP, R_HIP], 1]
+        x1, x2, y1, y2 = xs.min(), xs.max(), ys.min(), ys.max()
+        # Shrink toward the center: arms and background sit at the edges
+        dx, dy = (x2 - x1) * 0.15, (y2 - y1) * 0.1
+        return int(x1 + dx), int(y1 + dy), int(x2 - dx), int(y2 - dy)
+    w, h = bx2 - bx1, by2 - by1
+    return int(bx1 + 0.3 * w), int(by1 + 0.22 * h), int(bx2 - 0.3 * w), int(by1 + 0.5 * h)
+
+def occluded_share(region, box, boxes):
+    """
+    Largest share of `region` covered by one of `boxes` standing IN FRONT of `box`
+    (feet lower in the image = closer to the camera).
+    """
+    if boxes is None or len(boxes) == 0:
+        return 0.0
+    x1, y1, x2, y2 = region
+    front = boxes[boxes[:, 3] > box[3] + 1.0]
+    if len(front) == 0:
+        return 0.0
+    iw = (np.minimum(front[:, 2], x2) - np.maximum(front[:, 0], x1)).clip(min=0)
+    ih = (np.minimum(front[:, 3], y2) - np.maximum(front[:, 1], y1)).clip(min=0)
+    return float((iw * ih).max() / max(1.0, (x2 - x1) * (y2 - y1)))
+
+def torso_signature(ctx, kps, box, bins=None, occluders=None, max_occlusion=None):
+    """
+    Hue x saturation histogram (L1-normalized, float32) of the torso.
+    None when the torso is too small, or more than max_occlusion of it is hidden by a person in
+    front (the histogram would describe the occluder's clothes).
+    Clothing color survives the short gaps re-linking is for; a face does not need to be visible.
+    """
+    bins = bins or RELINK['HIST_BINS']
+    max_occlusion = RELINK['MAX_OCCLUSION'] if max_occlusion is None else max_occlusion
+    region = ctx.clip_box(torso_region(kps, box))
+    x1, y1, x2, y2 = region
+    if x2 - x1 < 6 or y2 - y1 < 6 or occluded_share(region, box, occluders) > max_occlusion:
+        return None
+    patch = cv2.resize(ctx.frame[y1:y2, x1:x2], SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(patch, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, list(bins), [0, 180, 0, 256])
+    return cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1).ravel()
+
+def appearance_similarity(a, b):
+    """1 - Bhattacharyya distance (1 = identical histograms)."""
+    if a is None or b is None:
+        return 0.0
+    return 1.0 - cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA)
+
+class TrackRelinker:
+    """
+    Short-gap re-linking: when the tracker loses a person for a moment and gives them a NEW id,
+    match the newborn track to a recently lost one instead of paying a full face encode.
+        begin_frame(boxes)               Person boxes of the frame (occlusion check of the signatures).
+        observe(ctx, id, box, kps, now)  Every frame, for every alive track (last box, velocity,
+                                         torso signature refreshed every SIGNATURE_INTERVAL).
+        lose(id, pid, now)               A track disappeared. Kept for MAX_GAP seconds when it had
+                                         a persistent id.
+        match(ctx, id, box, kps, now)    Young track (is_young) -> (pid, lost entry) or (None, None).
+    Score of a lost candidate (gates: MAX_GAP, MAX_DIST, MAX_SIZE_RATIO, MIN_APPEARANCE):
+        appearance - w_pos * position error - w_size * size change - w_gap * gap   (each error 0..1)
+    Accepted when the best score reaches MIN_SCORE AND beats the runner-up by MARGIN.
+    """
+    def __init__(self, cfg=None):
+        self.cfg = dict(RELINK, **(cfg or {}))
+        self.tracks = {} # { id: {'box', 'ts', 'born', 'vel', 'sig', 'sig_ts'} }
+        self.lost = {}   # { id: {'pid', 'box', 'ts', 'vel', 'sig', 'source'} }
+        self.frame_boxes = None
+
+        # Metrics
+        self.attempts = 0
+        self.relinks = 0
+
+    def begin_frame(self, boxes):
+        self.frame_boxes = None if boxes is None else np.asarray(boxes, np.float32).reshape(-1, 4)
+
+    def _signature(self, ctx, kps, box):
+        return torso_signature(ctx, kps, box, self.cfg['HIST_BINS'], self.frame_boxes, self.cfg['MAX_OCCLUSION'])
+
+    def is_young(self, track_id, now):
+        """Unseen, or born less than RETRY_WINDOW ago (birth frames are often partial / occluded)."""
+        t = self.tracks.get(track_id)
+        return t is None or now - t['born'] < self.cfg['RETRY_WINDOW']
+
+    def observe(self, ctx, track_id, box, kps, now, signature=True):
+        """signature=False: skip the torso histogram (tracks without a persistent id cannot be inherited)."""
+        box = (float(box[0]), float(box[1]), float(box[2]), float(box[3]))
+        t = self.tracks.get(track_id)
+        if t is None:
+            self.tracks[track_id] = {'box': box, 'ts': now, 'born': now, 'vel': (0.0, 0.0),
+                                     'sig': self._signature(ctx, kps, box) if signature else None, 'sig_ts': now}
+            return
+        dt = now - t['ts']
+        if dt > 0:
+            (cx0, cy0), (cx1, cy1) = _center(t['box']), _center(box)
+            vx, vy = (cx1 - cx0) / dt, (cy1 - cy0) / dt
+            t['vel'] = (0.7 * t['vel'][0] + 0.3 * vx, 0.7 * t['vel'][1] + 0.3 * vy)
+        t['box'], t['ts'] = box, now
+        if signature and (t['sig'] is None or now - t['sig_ts'] >= self.cfg['SIGNATURE_INTERVAL']):
+            sig = self._signature(ctx, kps, box)
+            if sig is not None:
+                t['sig'] = sig if t['sig'] is None else 0.7 * t['sig'] + 0.3 * sig
+            t['sig_ts'] = now
+
+    def lose(self, track_id, pid, now, source=None):
+        """source: optional label provenance handed back with a re-link."""
+        t = self.tracks.pop(track_id, None)
+        if t is not None and pid is not None:
+            self.lost[track_id] = dict(t, pid=pid, source=source)
+        self._expire(now)
+
+    def lost_pids(self):
+        return {e['pid'] for e in self.lost.values()}
+
+    def match(self, ctx, track_id, box, kps, now, exclude=()):
+        """
+        exclude: persistent ids currently held by alive tracks (one person cannot be two tracks).
+        On success the lost entry is consumed and the new track takes over its state.
+        """
+        self._expire(now)
+        if not self.lost:
+            return None, None
+        self.attempts += 1
+        cfg, w = self.cfg, self.cfg['WEIGHTS']
+        sig = self._signature(ctx, kps, box)
+        if sig is None:
+            return None, None
+        cx, cy = _center(box)
+        h = max(1.0, float(box[3]) - float(box[1]))
+
+        best_per_pid = {}
+        for lost_id, e in self.lost.items():
+            if e['pid'] in exclude:
+                continue
+            gap = now - e['ts']
+            lh = max(1.0, e['box'][3] - e['box'][1])
+            # Constant-velocity prediction over the gap (people keep walking while unseen)
+            px, py = _center(e['box'])
+            px, py = px + e['vel'][0] * gap, py + e['vel'][1] * gap
+            pos_err = math.hypot(cx - px, cy - py) / (lh * cfg['MAX_DIST'])
+            size_err = abs(math.log(h / lh)) / math.log(cfg['MAX_SIZE_RATIO'])
+            app = appearance_similarity(sig, e['sig'])
+            if pos_err > 1.0 or size_err > 1.0 or app < cfg['MIN_APPEARANCE']:
+                continue
+            score = app - w['position'] * pos_err - w['size'] * size_err - w['gap'] * gap / cfg['MAX_GAP']
+            # Best lost track per PID (one person can leave several fragments behind)
+            if e['pid'] not in best_per_pid or score > best_per_pid[e['pid']][0]:
+                best_per_pid[e['pid']] = (score, lost_id)
+
+        if not best_per_pid:
+            return None, None
+        scores = sorted(best_per_pid.values(), reverse=True)
+        best, lost_id = scores[0]
+        if best < cfg['MIN_SCORE'] or (len(scores) > 1 and best - scores[1][0] < cfg['MARGIN']):
+            return None, None
+        self.relinks += 1
+        entry = self.lost.pop(lost_id)
+        # The re-linked track continues the lost one (velocity), with the fresh signature
+        born = self.tracks[track_id]['born'] if track_id in self.tracks else now
+        self.tracks[track_id] = {'box': (float(box[0]), float(box[1]), float(box[2]), float(box[3])), 'ts': now, 'born': born,
+                                 'vel': entry['vel'], 'sig': sig, 'sig_ts': now}
+        return entry['pid'], entry
+
+    def _expire(self, now):
+        for lost_id in [k for k, e in self.lost.items() if now - e['ts'] > self.cfg['MAX_GAP']]:
+            del self.lost[lost_id]
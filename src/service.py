@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from .config import SERVICE
+from .controls import KEY_COMMANDS
+
+COMMANDS = set(KEY_COMMANDS.values())
+
+INDEX_HTML = b"""<!doctype html>
+<html><head><title>Safe Turret HUD</title></head>
+<body style="background:#000;color:#0f0;font-family:monospace">
+<img src="/stream.mjpg" style="max-width:100%"><br>
+POST /cmd/&lt;command&gt; : quit | aim/1 | aim/2 | aim/3 | manual | next | event | profile | trace
+</body></html>
+"""
+
+class HudStreamServer:
+    """
+    Headless service front-end on localhost:
+        GET  /             Minimal viewer page.
+        GET  /stream.mjpg  Rate-limited, downscaled MJPEG stream of the rendered HUD.
+        GET  /snapshot.jpg Latest JPEG frame.
+        POST /cmd/<cmd>    Same actions as the keys: aim/1, manual, next, event, profile, trace, quit ...
+    Commands are only accepted when the Host header names this server and the Origin header (sent
+    by browsers) is absent or this server: a web page open on the same machine cannot POST to the
+    turret (cross-site request forgery) or reach it through DNS rebinding. curl sends no Origin.
+    JPEG encoding runs on a background thread, and only while at least one client is connected.
+    The main loop only pays for a downscale when a frame is actually due.
+    """
+    def __init__(self, host=None, port=None, max_fps=None, width=None, jpeg_quality=None, unsupported=()):
+        self.host = host or SERVICE['HOST']
+        self.port = SERVICE['PORT'] if port is None else port # 0: any free port
+        self.min_interval = 1.0 / (max_fps or SERVICE['MAX_FPS'])
+        self.width = width or SERVICE['WIDTH']
+        self.jpeg_quality = jpeg_quality or SERVICE['JPEG_QUALITY']
+        self.unsupported = set(unsupported) # Known commands this mode cannot run (answered with 501)
+
+        self.commands = queue.SimpleQueue()
+        self.clients = 0
+        self.encoded = 0
+
+        self._cond = threading.Condition()
+        self._pending = None     # Downscaled BGR frame waiting for the encoder
+        self._jpeg = None        # Latest encoded frame
+        self._seq = 0
+        self._last_publish = 0.0
+        self._running = False
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass # Keep the console for system messages
+
+            def do_GET(self):
+                if self.path == '/':
+                    self._reply(200, 'text/html', INDEX_HTML)
+                elif self.path == '/snapshot.jpg':
+                    jpeg = server._jpeg
+                    if jpeg is None:
+                        self._reply(503, 'text/plain', b"no frame yet\n")
+                    else:
+                        self._reply(200, 'image/jpeg', jpeg)
+                elif self.path == '/stream.mjpg':
+                    server._serve_stream(self)
+                else:
+                    self._reply(404, 'text/plain', b"not found\n")
+
+            def do_POST(self):
+                if not self.path.startswith('/cmd/'):
+                    self._reply(404, 'text/plain', b"not found\n")
+                    return
+                if not server._same_origin(self.headers):
+                    print(f"[SERVICE] Refused command from Origin={self.headers.get('Origin')} Host={self.headers.get('Host')}")
+                    self._reply(403, 'text/plain', b"cross-origin command refused\n")
+                    return
+                cmd = self.path[len('/cmd/'):].strip('/').replace('/', ' ')
+                if cmd not in COMMANDS:
+                    self._reply(400, 'text/plain', f"unknown command: {cmd}\n".encode())
+                    return
+                if cmd in server.unsupported:
+                    self._reply(501, 'text/plain', f"{cmd} is not supported in this mode\n".encode())
+                    return
+                server.commands.put(cmd)
+                self._reply(200, 'text/plain', b"ok\n")
+
+            def _reply(self, code, ctype, body):
+                self.send_response(code)
+                self.send_header('Content-Type', ctype)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._origins = {f"{h}:{self.port}" for h in (self.host, "127.0.0.1", "localhost", "[::1]")}
+        self._running = True
+        threading.Thread(target=self.httpd.serve_forever, name="hud-http", daemon=True).start()
+        threading.Thread(target=self._encoder_loop, name="hud-jpeg", daemon=True).start()
+        print(f"[SERVICE] HUD stream: http://{self.host}:{self.port}/stream.mjpg")
+        usage = "|".join(c for c in ("quit", "aim/1", "aim/2", "aim/3", "manual", "next", "event", "profile", "trace") if c not in self.unsupported)
+        print(f"[SERVICE] Commands:   curl -X POST http://{self.host}:{self.port}/cmd/<{usage}>")
+        return self
+
+    def _same_origin(self, headers):
+        """Host is this server and Origin, when sent, is this server too."""
+        if headers.get('Host', '').lower() not in self._origins:
+            return False
+        origin = headers.get('Origin')
+        return origin is None or origin.lower() in {f"http://{o}" for o in self._origins}
+
+    def has_clients(self):
+        return self.clients > 0
+
+    def publish(self, frame):
+        """
+        Main loop: offer the rendered frame. Returns immediately when no client is
+        connected or the previous frame was published less than 1/MAX_FPS ago.
+        """
+        if self.clients == 0:
+            return
+        now = time.time()
+        if now - self._last_publish < self.min_interval:
+            return
+        self._last_publish = now
+
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA) if w > self.width else frame.copy()
+        with self._cond:
+            self._pending = small # Encoder always takes the newest; older pending frames are skipped
+            self._cond.notify_all()
+
+    def poll_commands(self):
+        """Main loop: commands received since the last call."""
+        cmds = []
+        while True:
+            try:
+                cmds.append(self.commands.get_nowait())
+            except queue.Empty:
+                return cmds
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # --- Background Threads ---
+
+    def _encoder_loop(self):
+        while self._running:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait(0.5)
+                frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+
+            ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                continue
+            with self._cond:
+                self._jpeg = buf.tobytes()
+                self._seq += 1
+                self.encoded += 1
+                self._cond.notify_all()
+
+    def _serve_stream(self, handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+
+        with self._cond:
+            self.clients += 1
+        seq = -1
+        try:
+            while self._running:
+                with self._cond:
+                    while self._seq == seq and self._running:
+                        self._cond.wait(1.0)
+                    jpeg, seq = self._jpeg, self._seq
+                if jpeg is None:
+                    continue
+                handler.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                handler.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Client went away
+        finally:
+            with self._cond:
+                self.clients -= 1
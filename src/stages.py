@@ -0,0 +1,112 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import STAGES
+
+class Stage:
+    __slots__ = ('name', 'fn', 'after')
+
+    def __init__(self, name, fn, after=()):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+
+class StageExecutor:
+    """
+    Runs the per-frame stages on a small thread pool, each as soon as the stages it depends on are done.
+        add(name, fn, after=())    Declare a stage. fn(inputs, *results of `after`) -> result.
+                                   Stages must be declared after their dependencies (no cycles).
+        run(inputs, trace=None)    One frame: returns {name: result} once EVERY stage is done (the join).
+    Stages only read `inputs` and their dependencies' results; anything they share with the main
+    thread (target manager, HUD) is used after the join. Inference and landmarking spend their time
+    in native code that releases the GIL, so independent stages overlap.
+    workers=0: every stage runs on the calling thread in declaration order (serial reference).
+    Per frame: sum of stage times, critical path (longest dependency chain of stage times), wall time.
+    """
+    def __init__(self, workers=None, alpha=0.05):
+        workers = STAGES['WORKERS'] if workers is None else workers
+        if workers is None:
+            # One core: the stages would only time-slice (and contend for the GIL)
+            workers = 2 if (os.cpu_count() or 1) > 1 else 0
+        self.stages = []
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") if workers > 0 else None
+        self.workers = workers
+
+        # Metrics (rolling, ms)
+        self.alpha = alpha
+        self.frames = 0
+        self.stage_ms = {}
+        self.sum_ms = 0.0
+        self.path_ms = 0.0
+        self.wall_ms = 0.0
+
+    def add(self, name, fn, after=()):
+        known = {s.name for s in self.stages}
+        if name in known:
+            raise ValueError(f"Stage '{name}' declared twice")
+        missing = [d for d in after if d not in known]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on undeclared stage(s) {missing}")
+        self.stages.append(Stage(name, fn, after))
+        return self
+
+    def _call(self, stage, inputs, results, trace):
+        t0 = time.time()
+        result = stage.fn(inputs, *[results[d] for d in stage.after])
+        t1 = time.time()
+        if trace is not None:
+            trace.add(stage.name, t0, t1)
+        return result, t1 - t0
+
+    def run(self, inputs, trace=None):
+        t0 = time.time()
+        results, durations, started, pending = {}, {}, set(), {}
+        try:
+            while len(results) < len(self.stages):
+                ready = [s for s in self.stages if s.name not in started and all(d in results for d in s.after)]
+                if ready:
+                    for s in ready:
+                        started.add(s.name)
+                        if self._pool is None:
+                            results[s.name], durations[s.name] = self._call(s, inputs, results, trace)
+                        else:
+                            pending[self._pool.submit(self._call, s, inputs, results, trace)] = s.name
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    name = pending.pop(f)
+                    results[name], durations[name] = f.result()
+        finally:
+            # Never leave a stage running into the next frame (or past an error)
+            if pending:
+                wait(pending)
+        self._record(durations, time.time() - t0)
+        return results
+
+    def _record(self, durations, wall):
+        finish = {}
+        for s in self.stages:
+            finish[s.name] = durations[s.name] + max((finish[d] for d in s.after), default=0.0)
+        sample = {'sum': sum(durations.values()), 'path': max(finish.values(), default=0.0), 'wall': wall}
+
+        a = self.alpha if self.frames else 1.0
+        self.sum_ms += a * (sample['sum'] * 1000 - self.sum_ms)
+        self.path_ms += a * (sample['path'] * 1000 - self.path_ms)
+        self.wall_ms += a * (sample['wall'] * 1000 - self.wall_ms)
+        for name, d in durations.items():
+            prev = self.stage_ms.get(name, d * 1000)
+            self.stage_ms[name] = prev + a * (d * 1000 - prev)
+        self.frames += 1
+
+    def summary(self):
+        return f"{self.path_ms:.1f}/{self.sum_ms:.1f}ms path/sum"
+
+    def breakdown(self):
+        stages = " ".join(f"{name} {ms:.1f}" for name, ms in self.stage_ms.items())
+        return (f"path {self.path_ms:.1f}ms, sum {self.sum_ms:.1f}ms, wall {self.wall_ms:.1f}ms "
+                f"({self.workers} workers) [{stages}]")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
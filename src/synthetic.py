@@ -0,0 +1,187 @@
+import cv2
+import numpy as np
+from .detections import Detections
+
+# Standing person, facing the camera. (x, y) relative to the person box (0..1).
+# COCO order: Nose, LEye, REye, LEar, REar, LSh, RSh, LElb, RElb, LWri, RWri, LHip, RHip, LKnee, RKnee, LAnk, RAnk
+KEYPOINT_TEMPLATE = np.array([
+    (0.50, 0.08), (0.46, 0.06), (0.54, 0.06), (0.42, 0.07), (0.58, 0.07),
+    (0.35, 0.20), (0.65, 0.20), (0.30, 0.35), (0.70, 0.35), (0.28, 0.48), (0.72, 0.48),
+    (0.40, 0.52), (0.60, 0.52), (0.40, 0.72), (0.60, 0.72), (0.40, 0.92), (0.60, 0.92)
+], dtype=np.float32)
+
+# Keypoint groups hidden together by an occluder
+OCCLUSION_GROUPS = (
+    (11, 12, 13, 14, 15, 16), # Lower body (desk, other person)
+    (13, 14, 15, 16),         # Legs
+    (1, 3, 5, 7, 9, 11, 13, 15), # Left side
+    (2, 4, 6, 8, 10, 12, 14, 16) # Right side
+)
+SWING_JOINTS = (7, 8, 9, 10, 13, 14, 15, 16) # Arms/legs swing while walking
+
+class SyntheticCrowd:
+    """
+    Deterministic synthetic scene generator producing YOLO-like Detections per frame:
+    boxes, track ids, confidences and 17-point keypoints with occlusion and missing joints.
+    Same seed + parameters -> identical sequence.
+    Motion patterns:
+        'walk'   - Constant velocity with noise, bouncing off the frame edges.
+        'random' - Random walk.
+        'cross'  - Two streams crossing left<->right; people leaving are replaced by NEW ids.
+        'static' - Standing still with jitter.
+    """
+    MOTIONS = ('walk', 'random', 'cross', 'static')
+
+    def __init__(self, n_people, width=1920, height=1080, motion='walk', seed=0,
+                 occlusion=0.15, missing=0.03, churn=0.0, turned_away=0.2):
+        if motion not in self.MOTIONS:
+            raise ValueError(f"motion must be one of {self.MOTIONS}")
+        self.n = n_people
+        self.W, self.H = width, height
+        self.motion = motion
+        self.occlusion = occlusion    # Per person per frame: chance a keypoint group is hidden
+        self.missing = missing        # Per keypoint: chance of a random dropout
+        self.churn = churn            # Per person per frame: chance the track is lost and re-born
+        self.turned_away = turned_away # Share of people not facing the camera
+        self.rng = np.random.default_rng(seed)
+
+        self.next_id = 1
+        self.frame_idx = 0
+        self.people = [self._spawn() for _ in range(n_people)]
+        self._background = None
+
+    def _spawn(self, from_edge=False):
+        rng = self.rng
+        h = rng.uniform(0.15, 0.6) * self.H # Depth: far (small) to near (large)
+        if self.motion == 'cross':
+            direction = 1 if rng.random() < 0.5 else -1
+            x = (-0.2 * h if direction > 0 else self.W + 0.2 * h) if from_edge else rng.uniform(0, self.W)
+            vel = np.array([direction * rng.uniform(2, 8), rng.uniform(-0.5, 0.5)])
+        else:
+            x = rng.uniform(0, self.W)
+            speed = {'walk': 4.0, 'random': 0.0, 'static': 0.0}[self.motion]
+            angle = rng.uniform(0, 2 * np.pi)
+            vel = np.array([np.cos(angle), np.sin(angle) * 0.3]) * rng.uniform(0.5, 1.5) * speed
+
+        person = {
+            'id': self.next_id,
+            'pos': np.array([x, rng.uniform(h, self.H)]), # (center x, feet y)
+            'vel': vel,
+            'h': h,
+            'yaw': rng.uniform(-1, 1) if rng.random() >= self.turned_away else rng.choice([-1.5, 1.5]),
+            'phase': rng.uniform(0, 2 * np.pi),
+        }
+        self.next_id += 1
+        return person
+
+    def _step(self, p):
+        rng = self.rng
+        if self.motion == 'random':
+            p['vel'] = 0.9 * p['vel'] + rng.normal(0, 1.5, 2) * (1, 0.3)
+        elif self.motion == 'static':
+            p['vel'] = rng.normal(0, 0.5, 2)
+        else:
+            p['vel'] = p['vel'] + rng.normal(0, 0.2, 2) * (1, 0.3)
+        p['pos'] = p['pos'] + p['vel']
+        p['phase'] += 0.25
+
+        half_w = 0.2 * p['h']
+        x, y = p['pos']
+        if self.motion == 'cross':
+            if x < -half_w or x > self.W + half_w:
+                return False # Left the frame
+            if y < p['h'] or y > self.H:
+                p['vel'][1] *= -1
+            p['pos'][1] = np.clip(y, p['h'], self.H)
+        else:
+            if x < half_w or x > self.W - half_w:
+                p['vel'][0] *= -1
+            if y < p['h'] or y > self.H:
+                p['vel'][1] *= -1
+            p['pos'] = np.clip(p['pos'], (half_w, p['h']), (self.W - half_w, self.H))
+        return True
+
+    def _keypoints(self, p, box):
+        rng = self.rng
+        x1, y1, x2, y2 = box
+        bw, bh = x2 - x1, y2 - y1
+
+        kps = KEYPOINT_TEMPLATE.copy()
+        # Walking: limbs swing
+        swing = 0.04 * np.sin(p['phase'])
+        kps[list(SWING_JOINTS), 0] += swing * np.array([1, -1, 1.5, -1.5, -1, 1, -1.5, 1.5])
+        # Head yaw: face keypoints shift sideways
+        kps[:5, 0] += 0.05 * p['yaw']
+        kps = kps * (bw, bh) + (x1, y1)
+        kps += rng.normal(0, 0.01 * bh, kps.shape)
+
+        visible = np.ones(17, dtype=bool)
+        if abs(p['yaw']) > 1.0:
+            visible[:3] = False # Back of the head: no eyes/nose
+        if rng.random() < self.occlusion:
+            visible[list(OCCLUSION_GROUPS[rng.integers(len(OCCLUSION_GROUPS))])] = False
+        visible &= rng.random(17) >= self.missing
+        visible &= (kps[:, 0] > 0) & (kps[:, 0] < self.W) & (kps[:, 1] > 0) & (kps[:, 1] < self.H)
+
+        kps[~visible] = 0 # YOLO convention: missing joint = (0, 0)
+        return kps
+
+    def next_frame(self):
+        """Advance one frame. Returns Detections (cls 0, tracked ids, keypoints)."""
+        self.frame_idx += 1
+        alive = []
+        for p in self.people:
+            if not self._step(p) or self.rng.random() < self.churn:
+                p = self._spawn(from_edge=(self.motion == 'cross'))
+            alive.append(p)
+        self.people = alive
+
+        n = len(alive)
+        xyxy = np.zeros((n, 4), np.float32)
+        kps = np.zeros((n, 17, 2), np.float32)
+        ids = np.zeros(n, int)
+        for i, p in enumerate(alive):
+            half_w = 0.2 * p['h']
+            x, y = p['pos']
+            box = (max(0.0, x - half_w), max(0.0, y - p['h']), min(float(self.W), x + half_w), min(float(self.H), y))
+            xyxy[i] = box
+            kps[i] = self._keypoints(p, box)
+            ids[i] = p['id']
+
+        conf = self.rng.uniform(0.4, 0.95, n).astype(np.float32)
+        return Detections(xyxy, conf, np.zeros(n, int), ids, kps)
+
+    def background(self):
+        """Deterministic textured frame (so crop/quality code has real pixels to read)."""
+        if self._background is None:
+            rng = np.random.default_rng(12345)
+            small = rng.integers(40, 200, (self.H // 8, self.W // 8, 3), dtype=np.uint8)
+            self._background = np.repeat(np.repeat(small, 8, axis=0), 8, axis=1)
+            if self._background.shape[:2] != (self.H, self.W):
+                pad = np.zeros((self.H, self.W, 3), np.uint8)
+                pad[:self._background.shape[0], :self._background.shape[1]] = self._background
+                self._background = pad
+        return self._background
+
+def person_colors(person_id):
+    """Deterministic clothing colors (BGR shirt, BGR trousers) of a synthetic person."""
+    rng = np.random.default_rng(person_id)
+    hsv = np.array([[[rng.integers(0, 180), rng.integers(60, 256), rng.integers(80, 240)],
+                     [rng.integers(0, 180), rng.integers(0, 160), rng.integers(30, 120)]]], np.uint8)
+    shirt, trousers = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0]
+    return tuple(int(c) for c in shirt), tuple(int(c) for c in trousers)
+
+def render_people(canvas, ids, xyxy):
+    """
+    Draw ground-truth people (box = person extent) as flat-colored figures: head, shirt, trousers.
+    Gives appearance-based code (torso histograms) real pixels; back to front by feet position.
+    """
+    for k in np.argsort(xyxy[:, 3]):
+        x1, y1, x2, y2 = xyxy[k]
+        w, h = x2 - x1, y2 - y1
+        shirt, trousers = person_colors(int(ids[k]))
+        cx = int((x1 + x2) / 2)
+        cv2.circle(canvas, (cx, int(y1 + 0.08 * h)), max(1, int(0.07 * h)), (150, 170, 200), -1)
+        cv2.rectangle(canvas, (int(x1 + 0.1 * w), int(y1 + 0.17 * h)), (int(x2 - 0.1 * w), int(y1 + 0.54 * h)), shirt, -1)
+        cv2.rectangle(canvas, (int(x1 + 0.25 * w), int(y1 + 0.54 * h)), (int(x2 - 0.25 * w), int(y2)), trousers, -1)
+    return canvas
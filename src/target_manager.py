@@ -1,6 +1,14 @@
+import math
 import numpy as np
 from .config import SAFE_ZONES
 from .identity_manager import IdentityManager
+from .frame_cache import FrameContext
+from .detections import Detections
+from .tracing import maybe_span
+
+def _kp_valid(kps, kp_idx):
+    """Keypoint present (YOLO reports missing joints as [0, 0])."""
+    return kps.shape[0] > kp_idx and kps[kp_idx, 0] != 0 and kps[kp_idx, 1] != 0
 
 class TargetManager:
     """
@@ -42,60 +50,84 @@ class TargetManager:
                 return True # In safe zone
         return False
 
+    def clear_targets(self):
+        """
+        Motion gate idle (static scene, nothing tracked): select_targets is skipped, so forget the
+        primary target and the manual selection here, as if everyone had left the frame.
+        """
+        self.primary_target = None
+        self.selected_id = None
+        self.id_manager.prune_tracks([])
+
     def select_targets(self, results, frame, aim_mode):
         """
         Process tracker output, filter unsafe, and select Primary.
-        Accepts full YOLO Results object to access Keypoints.
-        Updated: Pass 'frame' for facial recognition.
+        Accepts full YOLO Results object (or plain Detections) to access Keypoints.
+        Updated: Pass 'frame' for facial recognition (raw frame or a shared FrameContext).
         """
         valid_targets = []
+        ctx = frame if isinstance(frame, FrameContext) else FrameContext(frame)
         
-        boxes = results.boxes
-        keypoints = results.keypoints
+        # Apply finished identity jobs (main thread owns identity state)
+        with maybe_span(ctx.trace, 'identity.apply'):
+            self.id_manager.apply_results()
         
-        if boxes is None or boxes.id is None:
+        # Convert tensors to numpy ONCE for all persons
+        dets = results if isinstance(results, Detections) else Detections.from_results(results)
+        
+        if len(dets) == 0 or dets.ids is None:
             self.primary_target = None
+            self.id_manager.prune_tracks([])
             return []
 
+        # Primary from last frame gets identity priority
+        prev_primary_yolo_id = self.primary_target['yolo_id'] if self.primary_target else None
+        
+        # Drop queued identity work for tracks that left the frame (first: lost tracks become re-link candidates)
+        persons = dets.cls == 0
+        self.id_manager.prune_tracks(dets.ids[persons].tolist(), boxes=dets.xyxy[persons])
+
         # --- 1. Filter & Parse ---
-        for i, box in enumerate(boxes):
+        for i in range(len(dets)):
             # Check Class (Strict Person Only)
-            cls_id = int(box.cls[0])
+            cls_id = int(dets.cls[i])
             if cls_id != 0: 
                 continue 
             
             # Check Safety
-            xyxy = box.xyxy[0].cpu().numpy()
+            xyxy = dets.xyxy[i]
             is_safe_zone = self.is_safe(xyxy)
             # if is_safe_zone: continue  <-- OLD (Removed)
             
             # Extract Transient ID
-            yolo_id = int(box.id[0]) if box.id is not None else -1
+            yolo_id = int(dets.ids[i])
+            
+            # Keypoints for this person
+            kps = None
+            if dets.keypoints is not None and len(dets.keypoints) > i:
+                kps = dets.keypoints[i] # Shape (17, 2)
             
             # --- IDENTITY RESOLUTION ---
-            # Map YOLO ID -> Persistent PID
-            pid = self.id_manager.get_pid(frame, xyxy, yolo_id)
+            # Map YOLO ID -> Persistent PID (keypoints drive the face quality gate)
+            with maybe_span(ctx.trace, 'identity.handoff'):
+                pid = self.id_manager.get_pid(ctx, xyxy, yolo_id, keypoints=kps, is_primary=(yolo_id == prev_primary_yolo_id))
+            id_age = self.id_manager.label_age(yolo_id)
             
             # --- PRECISE TARGETING LOGIC (Keypoints) ---
             x1, y1, x2, y2 = map(int, xyxy)
             aim_x, aim_y = (x1 + x2) // 2, (y1 + y2) // 2 # Default to center
             
-            if keypoints is not None and len(keypoints) > i:
-                # Keypoints for this person
-                kps = keypoints[i].xy[0].cpu().numpy() # Shape (17, 2)
+            if kps is not None:
                 # Kps: 0=Nose, 5=LSh, 6=RSh, 11=LHip, 12=RHip, 13=LKnee, 14=RKnee
                 
                 # Check confidence of relevant keypoints (simplified: if not [0,0])
-                def is_valid(kp_idx):
-                    return kps.shape[0] > kp_idx and kps[kp_idx][0] != 0 and kps[kp_idx][1] != 0
-
                 if aim_mode == 1: # HEAD (Precise Forehead)
                     # Use Eyes (1, 2) and Nose (0) to vector to Forehead
-                    if is_valid(1) and is_valid(2): # Both Eyes
+                    if _kp_valid(kps, 1) and _kp_valid(kps, 2): # Both Eyes
                         mid_x = (kps[1][0] + kps[2][0]) / 2
                         mid_y = (kps[1][1] + kps[2][1]) / 2
                         
-                        if is_valid(0): # Nose available for vector
+                        if _kp_valid(kps, 0): # Nose available for vector
                             # Vector from Nose to EyeMid
                             vec_x = mid_x - kps[0][0]
                             vec_y = mid_y - kps[0][1]
@@ -111,7 +143,7 @@ class TargetManager:
                             # Move up (negative Y) by approx 0.8 * eye_dist
                             aim_y = mid_y - (eye_dist * 0.8)
                             
-                    elif is_valid(0): # Only Nose
+                    elif _kp_valid(kps, 0): # Only Nose
                         # Go up from nose by approx 1/6 of face height (estimated from box)
                         h = y2 - y1
                         aim_x = kps[0][0]
@@ -122,10 +154,10 @@ class TargetManager:
                         aim_y = y1 + (h * 0.08) # Top 8%
 
                 elif aim_mode == 3: # NON_LETHAL (Legs)
-                    if is_valid(13) and is_valid(14): # Knees Midpoint
+                    if _kp_valid(kps, 13) and _kp_valid(kps, 14): # Knees Midpoint
                         aim_x = (kps[13][0] + kps[14][0]) / 2
                         aim_y = (kps[13][1] + kps[14][1]) / 2
-                    elif is_valid(11) and is_valid(12): # Hips (aim lower than hips)
+                    elif _kp_valid(kps, 11) and _kp_valid(kps, 12): # Hips (aim lower than hips)
                         mid_x = (kps[11][0] + kps[12][0]) / 2
                         mid_y = (kps[11][1] + kps[12][1]) / 2
                         aim_x = mid_x
@@ -136,7 +168,7 @@ class TargetManager:
                         aim_y = y1 + (h * 0.75)
 
                 else: # UPPER_BODY
-                    if is_valid(5) and is_valid(6): # Shoulders Midpoint
+                    if _kp_valid(kps, 5) and _kp_valid(kps, 6): # Shoulders Midpoint
                         aim_x = (kps[5][0] + kps[6][0]) / 2
                         aim_y = (kps[5][1] + kps[6][1]) / 2
                         # Adjust slightly down for chest center
@@ -154,10 +186,11 @@ class TargetManager:
                 'center': ((x1+x2)//2, (y1+y2)//2), # Box Center
                 'keypoints': kps, # Store raw keypoints for advanced vis
                 'aim_point': (int(aim_x), int(aim_y)), # Precise Aim Point
-                'dist_to_center': np.sqrt(((x1+x2)//2 - self.cx)**2 + ((y1+y2)//2 - self.cy)**2),
+                'dist_to_center': math.hypot((x1+x2)//2 - self.cx, (y1+y2)//2 - self.cy),
                 'safe_check_point': ((x1+x2)//2, (y1+y2)//2), # The point used for IsSafe check
                 'safe': is_safe_zone,
-                'locked': False
+                'locked': False,
+                'id_age': id_age # Seconds since the identity label's source frame (None = no encoding yet)
             }
             valid_targets.append(target_data)
 
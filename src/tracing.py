@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from .config import TRACING
+
+_NO_SPAN = nullcontext()
+
+def maybe_span(trace, name):
+    """Span on an optional FrameTrace (no-op when tracing is off / not threaded through)."""
+    return trace.span(name) if trace is not None else _NO_SPAN
+
+class FrameTrace:
+    """
+    Timestamped spans of ONE frame, from capture to render. trace_id is the frame id.
+    All times are time.time() seconds (same clock as the identity scheduler timestamps).
+    """
+    __slots__ = ('trace_id', 't_capture', 'spans')
+
+    def __init__(self, trace_id, t_capture):
+        self.trace_id = trace_id
+        self.t_capture = t_capture
+        self.spans = [] # (name, t0, t1, thread name)
+
+    @contextmanager
+    def span(self, name):
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            self.spans.append((name, t0, time.time(), threading.current_thread().name))
+
+    def add(self, name, t0, t1, thread=None):
+        self.spans.append((name, t0, t1, thread or threading.current_thread().name))
+
+    def end_of(self, name):
+        """End time of the last span called `name`, or None."""
+        for span_name, _, t1, _ in reversed(self.spans):
+            if span_name == name:
+                return t1
+        return None
+
+class Tracer:
+    """
+    Rolling window of per-frame traces + asynchronous identity jobs.
+        begin(frame_id, t_capture) -> FrameTrace, end(trace) once the frame is done.
+        Capture-to-actuation latency = end of the 'control' span - capture time
+        (frames without a turret update have no actuation and are not counted).
+        identity_job(yolo_id, meta): identity results, linked to the frame their crop came from.
+        export(): Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev) of the window.
+    """
+    def __init__(self, window=None, out_dir=None, bins_ms=None):
+        window = window or TRACING['WINDOW_FRAMES']
+        self.out_dir = out_dir or TRACING['OUT_DIR']
+        self.bins_ms = np.array(bins_ms or TRACING['HISTOGRAM_MS'], dtype=float)
+        self.frames = deque(maxlen=window)
+        self.jobs = deque(maxlen=window)
+        self.latencies_ms = deque(maxlen=window)
+        self.label_ages_ms = deque(maxlen=window)
+
+    def begin(self, frame_id, t_capture):
+        return FrameTrace(frame_id, t_capture)
+
+    def end(self, trace):
+        self.frames.append(trace)
+        t_actuation = trace.end_of('control')
+        if t_actuation is not None:
+            self.latencies_ms.append((t_actuation - trace.t_capture) * 1000)
+
+    def identity_job(self, yolo_id, meta):
+        """
+        IdentityManager callback (main thread, when the result is applied).
+        meta: source frame id / capture time of the crop + scheduler timestamps.
+        """
+        applied = time.time()
+        job = dict(meta, yolo_id=yolo_id, applied_ts=applied)
+        self.jobs.append(job)
+        if meta.get('t_capture') is not None:
+            self.label_ages_ms.append((applied - meta['t_capture']) * 1000)
+
+    # --- Summaries ---
+
+    def latency_summary(self):
+        if not self.latencies_ms:
+            return "n/a"
+        p50, p95 = np.percentile(self.latencies_ms, (50, 95))
+        return f"{p50:.0f}/{p95:.0f}/{max(self.latencies_ms):.0f}ms p50/95/max"
+
+    def label_age_summary(self):
+        if not self.label_ages_ms:
+            return "n/a"
+        p50, p95 = np.percentile(self.label_ages_ms, (50, 95))
+        return f"{p50:.0f}/{p95:.0f}ms p50/95 at apply"
+
+    def histogram(self):
+        """
+        Capture-to-actuation latency histogram of the window.
+        Returns [(label, count)], last bin is open-ended.
+        """
+        edges = self.bins_ms
+        idx = np.searchsorted(edges, np.fromiter(self.latencies_ms, float, len(self.latencies_ms)), side='right')
+        counts = np.bincount(idx, minlength=len(edges) + 1)[1:]
+        labels = [f"<{int(e)}" for e in edges[1:]] + [f">{int(edges[-1])}"]
+        return list(zip(labels, counts.tolist()))
+
+    # --- Export ---
+
+    def export(self, path=None, background=True):
+        """
+        Write the window as Chrome trace-event JSON. Returns the path.
+        The window is snapshotted here; the JSON is written on a background thread.
+        """
+        if path is None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+        frames, jobs = list(self.frames), list(self.jobs)
+        if background:
+            threading.Thread(target=self._write, args=(path, frames, jobs), name="trace-writer", daemon=True).start()
+        else:
+            self._write(path, frames, jobs)
+        return path
+
+    def _write(self, path, frames, jobs):
+        t0 = min([f.t_capture for f in frames] + [j['submit_ts'] for j in jobs] or [time.time()])
+        us = lambda t: round((t - t0) * 1e6, 1)
+        tids = {}
+        def tid(name):
+            return tids.setdefault(name, len(tids) + 1)
+        events = []
+
+        for f in frames:
+            args = {'frame': f.trace_id}
+            t_end = max([s1 for _, _, s1, _ in f.spans] + [f.t_capture])
+            events.append({'name': f"frame {f.trace_id}", 'ph': 'X', 'ts': us(f.t_capture), 'dur': us(t_end) - us(f.t_capture),
+                           'pid': 1, 'tid': tid('frames'), 'args': args})
+            for name, s0, s1, thread in f.spans:
+                events.append({'name': name, 'ph': 'X', 'ts': us(s0), 'dur': us(s1) - us(s0), 'pid': 1, 'tid': tid(thread), 'args': args})
+            t_act = f.end_of('control')
+            if t_act is not None:
+                events.append({'name': 'capture->actuation', 'ph': 'X', 'ts': us(f.t_capture), 'dur': us(t_act) - us(f.t_capture),
+                               'pid': 1, 'tid': tid('latency'), 'args': args})
+
+        for k, j in enumerate(jobs):
+            start = j['submit_ts'] + j['wait_ms'] / 1000
+            end = start + j['run_ms'] / 1000
+            source_ts = j.get('t_capture')
+            args = {'track': j['yolo_id'], 'source_frame': j.get('frame_id'),
+                    'label_age_ms': round((j['applied_ts'] - source_ts) * 1000, 1) if source_ts else None}
+            events.append({'name': 'identity.wait', 'ph': 'X', 'ts': us(j['submit_ts']), 'dur': us(start) - us(j['submit_ts']),
+                           'pid': 1, 'tid': tid('identity-queue'), 'args': args})
+            events.append({'name': 'identity.encode', 'ph': 'X', 'ts': us(start), 'dur': us(end) - us(start),
+                           'pid': 1, 'tid': tid('identity-worker'), 'args': args})
+            # Flow arrows: source frame -> encode -> applied on the main thread
+            flow = {'name': 'identity', 'cat': 'identity', 'id': k, 'pid': 1}
+            events.append(dict(flow, ph='s', ts=us(source_ts or j['submit_ts']), tid=tid('frames')))
+            events.append(dict(flow, ph='t', ts=us(start), tid=tid('identity-worker')))
+            events.append(dict(flow, ph='f', bp='e', ts=us(j['applied_ts']), tid=tid('MainThread')))
+
+        for name, t in tids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': t, 'args': {'name': name}})
+
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"[TRACE] Wrote {len(frames)} frames, {len(jobs)} identity jobs to {path}")
@@ -0,0 +1,212 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from .config import TRACKING
+from .detections import Detections
+
+def box_iou(a, b):
+    """Vectorized IoU matrix between (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def greedy_match(iou, thresh):
+    """Greedy one-to-one matching on an IoU matrix. Returns list of (row, col)."""
+    rows, cols = np.nonzero(iou >= thresh)
+    if len(rows) == 0:
+        return []
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_r, used_c, pairs = set(), set(), []
+    for k in order:
+        r, c = rows[k], cols[k]
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        pairs.append((r, c))
+    return pairs
+
+class Tracker(ABC):
+    """
+    Tracker backend interface.
+    update(dets, frame) takes the frame's Detections (boxes, scores, classes, keypoints; ids ignored)
+    and returns the TRACKED subset as Detections with .ids filled in (keypoints kept aligned).
+    """
+    name = "base"
+
+    @abstractmethod
+    def update(self, dets, frame=None):
+        """Associate one frame's detections with the tracks. Returns the tracked Detections."""
+
+    @abstractmethod
+    def reset(self):
+        """Forget all tracks."""
+
+class _TrackerInput:
+    """
+    Minimal stand-in for ultralytics Boxes (numpy only): what BYTETracker/BOTSORT read.
+    """
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @property
+    def xywh(self):
+        xywh = self.xyxy.copy()
+        xywh[:, 2:] = self.xyxy[:, 2:] - self.xyxy[:, :2]
+        xywh[:, :2] = self.xyxy[:, :2] + xywh[:, 2:] / 2
+        return xywh
+
+    def __getitem__(self, idx):
+        return _TrackerInput(self.xyxy[idx], self.conf[idx], self.cls[idx])
+
+    def __len__(self):
+        return len(self.conf)
+
+class UltralyticsTracker(Tracker):
+    """
+    ByteTrack / BoT-SORT from ultralytics, driven directly (outside model.track).
+    cfg_path: Tracker YAML. ByteTrack defaults to our bytetrack.yaml so its settings still apply;
+    BoT-SORT defaults to the ultralytics botsort.yaml.
+    """
+    def __init__(self, tracker_type="bytetrack", cfg_path=None, frame_rate=None):
+        from ultralytics.trackers import BOTSORT, BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+        try:
+            from ultralytics.utils import YAML
+            load_yaml = YAML.load
+        except ImportError: # Older ultralytics
+            from ultralytics.utils import yaml_load as load_yaml
+
+        self.name = tracker_type
+        cfg_path = cfg_path or ("bytetrack.yaml" if tracker_type == "bytetrack" else "botsort.yaml")
+        cfg = load_yaml(check_yaml(cfg_path))
+        cfg['tracker_type'] = tracker_type
+        if tracker_type == "botsort":
+            cfg.setdefault('with_reid', False) # ReID needs a detector feature model; not used here
+        self.cfg = IterableSimpleNamespace(**cfg)
+        self.frame_rate = frame_rate if frame_rate is not None else TRACKING['FRAME_RATE']
+        self._cls = {"bytetrack": BYTETracker, "botsort": BOTSORT}[tracker_type]
+        self.reset()
+
+    def reset(self):
+        self.tracker = self._cls(args=self.cfg, frame_rate=self.frame_rate)
+
+    def update(self, dets, frame=None):
+        if len(dets) == 0:
+            tracks = self.tracker.update(_TrackerInput(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0)), frame)
+        else:
+            tracks = self.tracker.update(_TrackerInput(dets.xyxy, dets.conf, dets.cls), frame)
+        if len(tracks) == 0:
+            return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int), np.zeros(0, int),
+                              None if dets.keypoints is None else np.zeros((0,) + dets.keypoints.shape[1:], np.float32))
+
+        # tracks: [x1, y1, x2, y2, track_id, score, cls, det_index]
+        idx = tracks[:, -1].astype(int)
+        return Detections(
+            tracks[:, :4].astype(np.float32),
+            tracks[:, 5].astype(np.float32),
+            tracks[:, 6].astype(int),
+            tracks[:, 4].astype(int),
+            None if dets.keypoints is None else dets.keypoints[idx])
+
+class IoUTracker(Tracker):
+    """
+    Minimal vectorized IoU tracker: constant-velocity box prediction, greedy IoU association.
+    No Kalman filter, no second low-score stage: the cheap baseline.
+    """
+    name = "iou"
+
+    def __init__(self, iou_thresh=None, max_age=None, min_conf=None):
+        self.iou_thresh = iou_thresh if iou_thresh is not None else TRACKING['IOU_THRESH']
+        self.max_age = max_age if max_age is not None else TRACKING['MAX_AGE']
+        self.min_conf = min_conf if min_conf is not None else TRACKING['MIN_CONF']
+        self.reset()
+
+    def reset(self):
+        self.boxes = np.zeros((0, 4), np.float32)
+        self.vel = np.zeros((0, 4), np.float32)
+        self.ids = np.zeros(0, int)
+        self.age = np.zeros(0, int) # Frames since last match
+        self.next_id = 1
+
+    def update(self, dets, frame=None):
+        keep = dets.conf >= self.min_conf
+        xyxy, conf, cls = dets.xyxy[keep], dets.conf[keep], dets.cls[keep]
+        kps = dets.keypoints[keep] if dets.keypoints is not None else None
+
+        pred = self.boxes + self.vel * (self.age[:, None] + 1)
+        pairs = greedy_match(box_iou(xyxy, pred), self.iou_thresh)
+
+        out_ids = np.full(len(xyxy), -1, int)
+        matched_t = np.zeros(len(self.ids), bool)
+        if pairs:
+            d_idx, t_idx = (np.array(x) for x in zip(*pairs))
+            steps = (self.age[t_idx] + 1)[:, None]
+            self.vel[t_idx] = 0.7 * self.vel[t_idx] + 0.3 * (xyxy[d_idx] - self.boxes[t_idx]) / steps
+            self.boxes[t_idx] = xyxy[d_idx]
+            self.age[t_idx] = 0
+            out_ids[d_idx] = self.ids[t_idx]
+            matched_t[t_idx] = True
+        self.age[~matched_t] += 1
+
+        # Births
+        new = np.nonzero(out_ids < 0)[0]
+        if len(new):
+            new_ids = np.arange(self.next_id, self.next_id + len(new))
+            self.next_id += len(new)
+            out_ids[new] = new_ids
+            self.boxes = np.vstack([self.boxes, xyxy[new]])
+            self.vel = np.vstack([self.vel, np.zeros((len(new), 4), np.float32)])
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.age = np.concatenate([self.age, np.zeros(len(new), int)])
+
+        # Deaths
+        alive = self.age <= self.max_age
+        if not alive.all():
+            self.boxes, self.vel, self.ids, self.age = self.boxes[alive], self.vel[alive], self.ids[alive], self.age[alive]
+
+        return Detections(xyxy, conf, cls, out_ids, kps)
+
+TRACKER_BACKENDS = ("bytetrack", "botsort", "iou")
+SAVE_KWARGS = ('save', 'save_txt', 'save_conf', 'save_crop')
+_warned_untracked_save = False
+
+def create_tracker(name, cfg_path=None, frame_rate=None):
+    """Factory: 'bytetrack' | 'botsort' | 'iou'. 'builtin' returns None (model.track does the tracking)."""
+    if name == "builtin":
+        return None
+    if name == "iou":
+        return IoUTracker()
+    if name in ("bytetrack", "botsort"):
+        return UltralyticsTracker(name, cfg_path=cfg_path, frame_rate=frame_rate)
+    raise ValueError(f"Unknown tracker backend '{name}' (choose from {TRACKER_BACKENDS})")
+
+def detect_and_track(model, frame, tracker=None, **kwargs):
+    """
+    One frame of person detection + tracking. Returns (results, Detections with ids).
+    tracker=None: the built-in path, model.track with bytetrack.yaml.
+    Otherwise model.predict, then the given backend assigns the ids. Saved output (save=True,
+    save_txt=True, ...) then comes from model.predict: raw detections WITHOUT track ids.
+    """
+    if tracker is None:
+        results = model.track(frame, persist=True, tracker="bytetrack.yaml", verbose=False, classes=[0], **kwargs)
+        return results, (Detections.from_results(results[0]) if results else Detections.empty())
+
+    global _warned_untracked_save
+    if not _warned_untracked_save and any(kwargs.get(k) for k in SAVE_KWARGS):
+        _warned_untracked_save = True
+        print(f"[WARN] Tracker '{tracker.name}': saved images/labels are model.predict output "
+              "(untracked, no ids). Use --tracker builtin for tracked output.")
+    results = model.predict(frame, conf=TRACKING['DETECT_CONF'], verbose=False, classes=[0], **kwargs)
+    dets = Detections.from_results(results[0]) if results else Detections.empty()
+    return results, tracker.update(dets, frame)
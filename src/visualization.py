@@ -2,8 +2,25 @@ import cv2
 import numpy as np
 from .config import SAFE_ZONES, AIM_MODES
 
-def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
+def tint_rect(frame, x1, y1, x2, y2, color, alpha):
+    """
+    Translucent filled rectangle, blended IN PLACE on the rectangle only:
+        roi = (1 - alpha) * roi + alpha * color
+    (Same result as a filled rectangle on a frame.copy() + addWeighted, without the full-frame copy.)
+    """
     H, W = frame.shape[:2]
+    roi = frame[max(0, y1):min(H, y2 + 1), max(0, x1):min(W, x2 + 1)] # cv2.rectangle corners are inclusive
+    if roi.size == 0:
+        return
+    cv2.multiply(roi, (1 - alpha,) * 3 + (0,), dst=roi)
+    cv2.add(roi, tuple(alpha * c for c in color) + (0,), dst=roi)
+
+def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager, perf=None):
+    """
+    perf: Optional { 'LABEL': 'value text' } performance lines for the info panel.
+    """
+    H, W = frame.shape[:2]
+    perf = perf or {}
     cx, cy = W // 2, H // 2
     
     # --- 1. Safe Zones (Visualized) ---
@@ -13,9 +30,7 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
         x2 = int(zone[2] * W)
         y2 = int(zone[3] * H)
         
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 0, 50), -1) 
-        cv2.addWeighted(overlay, 0.3, frame, 0.7, 0, frame)
+        tint_rect(frame, x1, y1, x2, y2, (0, 0, 50), 0.3)
         cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 1)
         cv2.putText(frame, "SAFE ZONE", (x1+10, y1+25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
 
@@ -91,6 +106,9 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
     # --- 3. Targets (ALL) ---
     for t in targets:
         x1, y1, x2, y2 = t['box']
+        # Identity label staleness (age of the frame it was computed from)
+        age = t.get('id_age')
+        age_str = f" ~{age:.1f}s" if age is not None else ""
         
         # Custom Logic for visualization based on Status
         is_safe = t.get('safe', False)
@@ -98,18 +116,18 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
         if is_safe:
             color = (0, 165, 255) # Orange for Safe Zone
             thick = 2
-            label = f"ID:{t['id']} [SAFE]"
+            label = f"ID:{t['id']}{age_str} [SAFE]"
             cv2.putText(frame, "SAFE", (x1, y1-25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
         elif t['locked'] and t == primary:
             color = (0, 0, 255) # Red for Engaged
             thick = 3
-            label = f"ID:{t['id']} [ENGAGED]"
+            label = f"ID:{t['id']}{age_str} [ENGAGED]"
             # Line to Aim Point
             cv2.line(frame, (cx, cy), t['aim_point'], color, 2)
         else:
             color = (0, 255, 255) # Yellow for Others
             thick = 1
-            label = f"ID:{t['id']}"
+            label = f"ID:{t['id']}{age_str}"
             
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, thick)
         cv2.putText(frame, label, (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
@@ -124,7 +142,7 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
              cv2.circle(frame, (scx, scy), 4, (255, 0, 0), -1) # Blue Dot
              
     # --- 4. System Info Panel ---
-    panel_w, panel_h = 240, 280 # Increased height
+    panel_w, panel_h = 240, 320 + 20 * len(perf) # Increased height
     panel_x = W - panel_w - 10
     panel_y = 10
     
@@ -168,6 +186,18 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
         
     cv2.putText(frame, f"STATUS    : {status}", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_st, 1)
     sy += line_h
+
+    # Identity Queue Metrics
+    q = manager.id_manager.get_queue_stats()
+    cv2.putText(frame, f"ID QUEUE  : {q['depth']} drop:{q['dropped']} wait:{q['wait_ms']:.0f}ms", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+    sy += line_h
+    cv2.putText(frame, f"ID ENCODE : {q['encode_calls']} ({q['encodes_per_person']:.1f}/person) skip:{q['quality_skips']} relink:{q.get('relinks', 0)}/{q.get('relinks_wrong', 0)}x", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+    sy += line_h
+
+    # Performance Metrics
+    for label, value in perf.items():
+        cv2.putText(frame, f"{label:<10}: {value}", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+        sy += line_h
     
     # Legend
     cv2.putText(frame, "[LEGEND] Blue Dot: Safety Check", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
@@ -223,6 +253,28 @@ def draw_hud(frame, turret, targets, primary, aim_mode_idx, manager):
     sy += 15
     cv2.putText(frame, "[R] Register Face", (sx, sy), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
 
+def draw_latency_histogram(frame, hist, title="CAPTURE->ACTUATION ms"):
+    """
+    Small bar chart in the bottom-left corner.
+    hist: [(bin label, count)] (see Tracer.histogram()).
+    """
+    H, W = frame.shape[:2]
+    bar_w, plot_h = 26, 60
+    panel_w, panel_h = bar_w * len(hist) + 20, plot_h + 50
+    x0, y0 = 10, H - panel_h - 10
+    
+    cv2.rectangle(frame, (x0, y0), (x0 + panel_w, y0 + panel_h), (0, 0, 0), -1)
+    cv2.rectangle(frame, (x0, y0), (x0 + panel_w, y0 + panel_h), (0, 255, 0), 1)
+    cv2.putText(frame, title, (x0 + 10, y0 + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+    
+    peak = max([count for _, count in hist] + [1])
+    base_y = y0 + 25 + plot_h
+    for i, (label, count) in enumerate(hist):
+        bx = x0 + 10 + i * bar_w
+        top = base_y - int(plot_h * count / peak)
+        cv2.rectangle(frame, (bx + 2, top), (bx + bar_w - 3, base_y), (0, 200, 255), -1)
+        cv2.putText(frame, label, (bx, base_y + 12), cv2.FONT_HERSHEY_SIMPLEX, 0.3, (200, 200, 200), 1)
+
 def draw_skeleton(frame, keypoints):
     """
     Draw Pose Skeleton from YOLO keypoints.
@@ -267,15 +319,19 @@ def draw_face_landmarks(frame, landmarks):
 def draw_mediapipe_mesh(frame, face_landmarks_list):
     """
     Draw 468-point Face Mesh using Manual OpenCV (Robust to missing mp.solutions).
-    face_landmarks_list: List of list of NormalizedLandmark objects
+    face_landmarks_list: List of (N, 2) normalized landmark arrays (see face_mesh.detect_face_landmarks)
+                         or list of list of NormalizedLandmark objects
     """
     H, W = frame.shape[:2]
     
     for landmarks in face_landmarks_list:
+        if not isinstance(landmarks, np.ndarray):
+            landmarks = np.array([(lm.x, lm.y) for lm in landmarks], dtype=np.float32)
+        pts = (landmarks[:, :2] * (W, H)).astype(np.int32)
+        
         # Draw all points
-        for lm in landmarks:
-            cx, cy = int(lm.x * W), int(lm.y * H)
-            cv2.circle(frame, (cx, cy), 1, (255, 255, 255), -1, cv2.LINE_AA)
+        for cx, cy in pts:
+            cv2.circle(frame, (int(cx), int(cy)), 1, (255, 255, 255), -1, cv2.LINE_AA)
             
         # Draw specific Contours (Approximation since we don't have connection map)
         # Lips: 61, 146, 91, 181, 84, 17, 314, 405, 321, 375, 291
@@ -284,11 +340,9 @@ def draw_mediapipe_mesh(frame, face_landmarks_list):
         
         # Simple highlight of eyes (rough indices for iris center)
         # Left Iris: 468, Right Iris: 473 (if refined)
-        if len(landmarks) > 468:
-            l_iris = landmarks[468]
-            r_iris = landmarks[473]
-            cv2.circle(frame, (int(l_iris.x * W), int(l_iris.y * H)), 3, (0, 0, 255), -1)
-            cv2.circle(frame, (int(r_iris.x * W), int(r_iris.y * H)), 3, (0, 0, 255), -1)
+        if len(pts) > 473:
+            cv2.circle(frame, (int(pts[468][0]), int(pts[468][1])), 3, (0, 0, 255), -1)
+            cv2.circle(frame, (int(pts[473][0]), int(pts[473][1])), 3, (0, 0, 255), -1)
 
 def draw_registration_ui(frame, progress):
     """
@@ -297,10 +351,8 @@ def draw_registration_ui(frame, progress):
     """
     H, W = frame.shape[:2]
     
-    # Darken background slightly
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (W, H), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.4, frame, 0.6, 0, frame)
+    # Darken background slightly (in place: 0.6 * frame + 0.4 * black)
+    cv2.convertScaleAbs(frame, dst=frame, alpha=0.6)
     
     cx, cy = W // 2, H // 2
     
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the application modules as `src.*`, like the top-level scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+import tracemalloc
+
+import cv2
+import pytest
+
+from src.camera import open_source
+from src.config import SAFE_ZONES
+from src.frame_cache import FrameBuffers, FrameContext
+from src.motion_gate import MotionGate
+from src.stages import StageExecutor
+from src.synthetic import SyntheticCrowd, render_people
+from src.visualization import draw_skeleton, tint_rect
+
+W, H = 640, 360
+PEOPLE = 10
+FRAMES, WARMUP = 60, 10
+BUDGET_KB = 64          # Steady-state transient peak of one frame (a frame alone is 675 KB)
+PER_PERSON_KB = 4       # Target dicts, identity crops (same allowance as bench_crowd.py)
+
+@pytest.fixture(scope="module")
+def crowd_clip(tmp_path_factory):
+    """Synthetic crowd rendered to an MJPG clip, with the detections of every frame."""
+    path = str(tmp_path_factory.mktemp("replay") / "crowd.avi")
+    crowd = SyntheticCrowd(PEOPLE, W, H, motion='walk', seed=0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (W, H))
+    if not writer.isOpened():
+        pytest.skip("OpenCV build cannot write MJPG")
+    dets = []
+    for _ in range(FRAMES):
+        d = crowd.next_frame()
+        writer.write(render_people(crowd.background().copy(), d.ids, d.xyxy))
+        dets.append(d)
+    writer.release()
+    return path, dets
+
+def replay(path, dets, body):
+    """
+    Replay the clip through the reused-buffer path (FrameSource with reuse, FrameBuffers, StageExecutor,
+    motion gate) and return the transient allocation peak (KB) of every steady-state frame.
+    body(ctx, dets): the rest of the frame (selection, HUD).
+    Decoding is unthreaded so a frame decoded into a NEW buffer lands inside the measured frame
+    (on the decode thread it would race the release of the previous frame and may not raise the peak).
+    """
+    source = open_source(path, threaded=False, reuse=True)
+    buffers = FrameBuffers()
+    gate = MotionGate()
+    stages = StageExecutor(workers=2)
+    stages.add('inference', lambda f: f['dets']) # Stand-in: detections are precomputed
+    stages.add('rgb', lambda f: f['ctx'].rgb())
+    stages.add('thumb', lambda f: f['ctx'].thumb_gray())
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(FRAMES):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+            ok, frame, t_capture = source.read()
+            assert ok
+            ctx = FrameContext(frame, i, t_capture=t_capture, buffers=buffers)
+            gate.update(ctx, tracks_alive=PEOPLE)
+            out = stages.run({'ctx': ctx, 'dets': dets[i]})
+            body(ctx, out['inference'])
+            for zone in SAFE_ZONES:
+                tint_rect(frame, int(zone[0] * W), int(zone[1] * H), int(zone[2] * W), int(zone[3] * H), (0, 0, 50), 0.3)
+            for kps in out['inference'].keypoints:
+                draw_skeleton(frame, kps)
+
+            if i == WARMUP:
+                warm_allocations = buffers.allocations
+            if i >= WARMUP:
+                peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    finally:
+        tracemalloc.stop()
+        stages.close()
+        source.release()
+    assert buffers.allocations == warm_allocations, "FrameBuffers allocated after warm-up"
+    return peaks
+
+def test_frame_loop_alloc_budget(crowd_clip):
+    path, dets = crowd_clip
+    peaks = replay(path, dets, lambda ctx, d: None)
+    assert max(peaks) <= BUDGET_KB, f"steady-state frame allocated {max(peaks):.1f} KB (budget {BUDGET_KB} KB)"
+
+def test_frame_loop_with_selection_alloc_budget(crowd_clip):
+    pytest.importorskip("face_recognition")
+    from src.target_manager import TargetManager
+    from src.turret_controller import TurretController
+    from src.visualization import draw_hud
+
+    path, dets = crowd_clip
+    manager, turret = TargetManager(W, H), TurretController()
+    manager.id_manager.scheduler.worker_fn = lambda payload: ([], payload[1]) # No encodes: inference is out of scope
+
+    def body(ctx, d):
+        targets = manager.select_targets(d, ctx, 2)
+        draw_hud(ctx.frame, turret, targets, manager.primary_target, 2, manager)
+
+    try:
+        peaks = replay(path, dets, body)
+    finally:
+        manager.id_manager.scheduler.shutdown()
+    budget = BUDGET_KB + PER_PERSON_KB * PEOPLE
+    assert max(peaks) <= budget, f"steady-state frame allocated {max(peaks):.1f} KB (budget {budget} KB)"
@@ -0,0 +1,36 @@
+import time
+
+import numpy as np
+
+from src.camera import FrameSource
+
+W, H = 1280, 720
+FRAMES = 300
+
+class CounterSource(FrameSource):
+    """Readahead source that decodes as fast as it can, stamping the frame number into every pixel."""
+    def __init__(self, frames, reuse=True):
+        super().__init__("counter", threaded=True, buffer=2, reuse=reuse)
+        self.frames = frames
+        self.index = 0
+
+    def _next(self, dst=None):
+        if self.index >= self.frames:
+            return False, None, None
+        frame = dst if dst is not None else np.empty((H, W, 3), np.uint8)
+        frame.fill(self.index % 256)
+        self.index += 1
+        return True, frame, time.time()
+
+def test_readahead_into_dst_keeps_frames_whole():
+    source = CounterSource(FRAMES).start()
+    dst = np.empty((H, W, 3), np.uint8)
+    try:
+        for i in range(FRAMES):
+            ok, frame, _ = source.read(dst)
+            assert ok and frame is dst
+            # A buffer recycled before the copy finished is decoded into mid-copy: mixed frame numbers
+            assert frame.min() == frame.max() == i % 256, f"frame {i} torn: values {frame.min()}..{frame.max()}"
+        assert not source.read(dst)[0]
+    finally:
+        source.release()
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+from src.enrollment import select_diverse_samples
+
+def subject_samples(n, seed=0):
+    """Encodings of one person: a shared direction plus per-sample variation (~0.35 apart)."""
+    rng = np.random.default_rng(seed)
+    base = rng.normal(0, 1, 128)
+    base *= 0.9 / np.linalg.norm(base)
+    return base, [(base + rng.normal(0, 0.025, 128), 0.5, f"frame{i}") for i in range(n)]
+
+def test_foreign_encoding_is_not_enrolled():
+    base, samples = subject_samples(20)
+    rng = np.random.default_rng(1)
+    stranger = rng.normal(0, 1, 128)
+    stranger *= 0.9 / np.linalg.norm(stranger) # About 1.3 from the subject: a bystander's face
+    samples.insert(7, (stranger, 0.9, "bystander"))
+
+    kept = select_diverse_samples(samples, k=5)
+    assert len(kept) == 5
+    assert "bystander" not in [s[2] for s in kept]
+    # Without the outlier check, farthest-point selection picks it right after the best sample
+    assert "bystander" in [s[2] for s in select_diverse_samples(samples, k=5, max_dist=np.inf)]
+
+def test_small_sets_are_kept():
+    _, samples = subject_samples(2)
+    assert len(select_diverse_samples(samples, k=5)) == 2
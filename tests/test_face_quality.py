@@ -0,0 +1,25 @@
+import numpy as np
+
+from src.config import FACE_QUALITY
+from src.face_quality import score_face_quality
+
+def textured_frame(seed=0):
+    """Mid-grey noise: sharp and well exposed."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(60, 196, (480, 640, 3), dtype=np.uint8)
+
+def test_no_keypoints_box_crop_can_be_encoded():
+    q = score_face_quality(textured_frame(), (200, 100, 300, 400), None)
+    assert q['region'] == (200, 100, 300, 200) # Square on top of the box
+    assert FACE_QUALITY['MIN_SCORE'] <= q['score'] < FACE_QUALITY['GOOD_SCORE']
+
+def test_no_keypoints_flat_crop_is_rejected():
+    frame = np.full((480, 640, 3), 128, np.uint8) # No detail at all
+    assert score_face_quality(frame, (200, 100, 300, 400), None)['score'] < FACE_QUALITY['MIN_SCORE']
+
+def test_frontal_eyes_beat_box_crop():
+    kps = np.zeros((17, 2), np.float32)
+    kps[0], kps[1], kps[2] = (250, 160), (270, 140), (230, 140) # Nose, eyes 40 px apart
+    with_eyes = score_face_quality(textured_frame(), (200, 100, 300, 400), kps)
+    without = score_face_quality(textured_frame(), (200, 100, 300, 400), None)
+    assert with_eyes['score'] >= FACE_QUALITY['GOOD_SCORE'] > without['score']
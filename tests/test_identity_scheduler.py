@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from src.identity_scheduler import IdentityJobScheduler
+
+URGENT, NORMAL, LOW = IdentityJobScheduler.PRIORITY_URGENT, IdentityJobScheduler.PRIORITY_NORMAL, IdentityJobScheduler.PRIORITY_LOW
+
+class Worker:
+    """worker_fn that holds each job until released, so tests can observe every state."""
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.ran = []
+
+    def __call__(self, payload):
+        self.ran.append(payload)
+        self.started.release()
+        assert self.release.wait(5.0)
+        return payload
+
+@pytest.fixture
+def worker():
+    return Worker()
+
+@pytest.fixture
+def scheduler(worker):
+    scheduler = IdentityJobScheduler(worker, max_depth=3, num_workers=1)
+    yield scheduler
+    worker.release.set()
+    scheduler.shutdown()
+
+def occupy(scheduler, worker, track_id=0):
+    """Start a job and keep the only worker busy with it: later jobs stay queued."""
+    assert scheduler.submit(track_id, "busy", URGENT)
+    assert worker.started.acquire(timeout=5.0)
+
+def drain_all(scheduler, expected, timeout=5.0):
+    done = []
+    deadline = time.time() + timeout
+    while len(done) < expected and time.time() < deadline:
+        done.extend(scheduler.drain())
+        time.sleep(0.01)
+    return done
+
+def test_resubmit_replaces_queued_job(scheduler, worker):
+    occupy(scheduler, worker)
+    assert scheduler.submit(1, "old crop", LOW)
+    assert scheduler.submit(1, "new crop", NORMAL)
+    stats = scheduler.stats()
+    assert stats['depth'] == 1 and stats['replaced'] == 1
+
+    worker.release.set()
+    done = drain_all(scheduler, 2)
+    assert [(tid, result) for tid, result, _ in done] == [(0, "busy"), (1, "new crop")]
+    assert worker.ran == ["busy", "new crop"]
+
+def test_full_queue_evicts_least_urgent_oldest_or_rejects(scheduler, worker):
+    occupy(scheduler, worker)
+    assert scheduler.submit(1, "a", NORMAL)
+    assert scheduler.submit(2, "b", LOW)
+    assert scheduler.submit(3, "c", LOW)
+
+    # Not more urgent than the worst queued job: rejected
+    assert not scheduler.submit(4, "d", LOW)
+    assert not scheduler.is_pending(4)
+    # More urgent: the least urgent, oldest job (2) makes room
+    assert scheduler.submit(5, "e", URGENT)
+    assert not scheduler.is_pending(2)
+    assert all(scheduler.is_pending(t) for t in (1, 3, 5))
+    stats = scheduler.stats()
+    assert stats['depth'] == 3 and stats['dropped_full'] == 2
+
+    worker.release.set()
+    done = drain_all(scheduler, 4)
+    assert [tid for tid, _, _ in done] == [0, 5, 1, 3] # Priority order, then submit order
+
+def test_cancel_missing_drops_dead_tracks(scheduler, worker):
+    occupy(scheduler, worker)
+    for tid in (1, 2, 3):
+        assert scheduler.submit(tid, tid, NORMAL)
+
+    assert scheduler.cancel_missing([0, 2]) == 2
+    assert scheduler.is_pending(2)
+    assert not scheduler.is_pending(1) and not scheduler.is_pending(3)
+    assert scheduler.is_pending(0) # Running jobs are not cancelled
+    assert scheduler.stats()['dropped_stale'] == 2
+
+    worker.release.set()
+    assert sorted(tid for tid, _, _ in drain_all(scheduler, 2)) == [0, 2]
+    assert worker.ran == ["busy", 2]
+
+def test_pending_and_stats_through_running_unclaimed_drain(scheduler, worker):
+    assert scheduler.submit(7, "crop", URGENT, meta={'frame_id': 42})
+    assert worker.started.acquire(timeout=5.0)
+
+    # Running
+    stats = scheduler.stats()
+    assert scheduler.is_pending(7)
+    assert stats['running'] == 1 and stats['depth'] == 0 and stats['completed'] == 0
+    assert not scheduler.submit(7, "other crop", URGENT) # Never two jobs for one track
+
+    # Finished but not drained: still pending, still no second job
+    worker.release.set()
+    deadline = time.time() + 5.0
+    while scheduler.stats()['completed'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    stats = scheduler.stats()
+    assert stats['running'] == 0 and stats['completed'] == 1
+    assert scheduler.is_pending(7)
+    assert not scheduler.submit(7, "other crop", URGENT)
+
+    # Drained: free again
+    done = scheduler.drain()
+    assert len(done) == 1
+    tid, result, meta = done[0]
+    assert (tid, result, meta['frame_id']) == (7, "crop", 42)
+    assert {'submit_ts', 'wait_ms', 'run_ms'} <= set(meta)
+    assert not scheduler.is_pending(7)
+    assert scheduler.stats()['submitted'] == 1
+    assert scheduler.submit(7, "next crop", NORMAL)
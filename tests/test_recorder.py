@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.recorder import _PacedWriter
+
+class ListWriter:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        pass
+
+def frame(value):
+    return np.full((4, 4, 3), value, np.uint8)
+
+def test_slow_loop_plays_back_in_real_time():
+    # Loop at 5 FPS into a 15 FPS file: every frame is held for three output frames
+    out = ListWriter()
+    writer = _PacedWriter(out, 15)
+    for i in range(10):
+        writer.write(frame(i), 100.0 + i / 5)
+    assert len(out.frames) == 28 # 1.8 s at 15 FPS, plus the first frame
+    assert out.frames[:7] == [0, 0, 0, 1, 1, 1, 2]
+
+def test_fast_and_irregular_submits_keep_wall_clock_time():
+    out = ListWriter()
+    writer = _PacedWriter(out, 10)
+    stamps = [0.0, 0.02, 0.04, 0.06, 0.5, 0.52, 1.0] # Bursts, then a stall
+    for i, ts in enumerate(stamps):
+        writer.write(frame(i), ts)
+    assert len(out.frames) == 11 # 1.0 s at 10 FPS, plus the first frame
+    assert out.frames == [0, 3, 3, 3, 3, 4, 5, 5, 5, 5, 6]
@@ -0,0 +1,42 @@
+import http.client
+
+import pytest
+
+from src.service import HudStreamServer
+
+@pytest.fixture
+def server():
+    server = HudStreamServer(host="127.0.0.1", port=0).start()
+    yield server
+    server.stop()
+
+def post(server, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        conn.request("POST", path, headers=headers or {})
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+def test_local_command_is_accepted(server):
+    assert post(server, "/cmd/next") == 200 # curl: no Origin
+    assert post(server, "/cmd/aim/1", {'Origin': f"http://localhost:{server.port}"}) == 200
+    assert server.poll_commands() == ["next", "aim 1"]
+
+def test_cross_origin_command_is_refused(server):
+    # A page on another site POSTing to the turret from a browser on this host
+    assert post(server, "/cmd/quit", {'Origin': "http://evil.example"}) == 403
+    assert post(server, "/cmd/quit", {'Origin': "null"}) == 403
+    # DNS rebinding: same-origin for the browser, but the Host is the attacker's name
+    assert post(server, "/cmd/quit", {'Host': f"evil.example:{server.port}"}) == 403
+    assert server.poll_commands() == []
+
+def test_unsupported_command_is_refused():
+    server = HudStreamServer(host="127.0.0.1", port=0, unsupported=('profile', 'trace')).start()
+    try:
+        assert post(server, "/cmd/profile") == 501
+        assert post(server, "/cmd/trace") == 501
+        assert post(server, "/cmd/next") == 200
+        assert server.poll_commands() == ["next"]
+    finally:
+        server.stop()
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("face_recognition")
+from src.controls import apply_command
+from src.target_manager import TargetManager
+
+@pytest.fixture
+def manager():
+    manager = TargetManager(640, 360)
+    yield manager
+    manager.id_manager.scheduler.shutdown()
+
+def test_idle_gate_forgets_primary_before_manual_lock(manager):
+    manager.primary_target = {'id': "ID-01", 'yolo_id': 3}
+    manager.selected_id = "ID-01"
+
+    manager.clear_targets() # Motion gate went idle: select_targets is skipped
+    assert manager.primary_target is None and manager.selected_id is None
+
+    apply_command('manual', manager, [], 2)
+    assert manager.manual_mode and manager.selected_id is None # Nothing stale to lock onto